@@ -0,0 +1,86 @@
+# app/cache/__init__.py
+
+from collections import OrderedDict
+from typing import Any, Dict, Hashable
+
+# Returned by LRUCache.get when a key is not cached (None is a valid cached value).
+MISSING = object()
+
+class LRUCache:
+    """A bounded mapping that evicts the least recently used entry and counts hits, misses, and evictions."""
+
+    def __init__(self, max_size: int):
+        """
+        Initialize an empty cache.
+
+        Args:
+            max_size (int): The maximum number of entries kept.
+
+        Raises:
+            ValueError: If max_size is not positive.
+        """
+        if max_size < 1:
+            raise ValueError("Cache size must be at least 1.")
+        self.max_size = max_size
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        """Return the number of cached entries."""
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Any:
+        """
+        Look up a key, marking it as most recently used.
+
+        Args:
+            key (Hashable): The key to look up.
+
+        Returns:
+            Any: The cached value, or MISSING if the key is not cached.
+        """
+        value = self._entries.get(key, MISSING)
+        if value is MISSING:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """
+        Store a value, evicting the least recently used entry if the cache is full.
+
+        Args:
+            key (Hashable): The key to store.
+            value (Any): The value to store.
+        """
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        """Remove all entries and reset the counters."""
+        self._entries.clear()
+        self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Return the cache counters.
+
+        Returns:
+            Dict[str, int]: The current size, maximum size, hits, misses, and evictions.
+        """
+        return {"size": len(self._entries), "max_size": self.max_size,
+                "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+    def __str__(self) -> str:
+        """Return a one-line summary of the counters, including the hit rate."""
+        lookups = self.hits + self.misses
+        hit_rate = 100.0 * self.hits / lookups if lookups else 0.0
+        return (f"Cache: {len(self._entries)}/{self.max_size} entries, {self.hits} hits, {self.misses} misses, "
+                f"{self.evictions} evictions, {hit_rate:.1f}% hit rate")
@@ -1,9 +1,19 @@
-from typing import Union
+import math
+from array import array
+from itertools import chain, repeat
+from typing import Dict, Iterable, Iterator, NamedTuple, Optional, Sequence, Tuple, Union
+from app.expression import compile_expression
 from app.operations import Operation
+from app.reduction import REDUCTIONS
+
+# Cells a sweep evaluates per call to calculate_many: whole rows are grouped up to about this many.
+SWEEP_CHUNK_CELLS = 1 << 16
 
 class Calculation:
     """Represents a calculation with an operation and two operands."""
 
+    __slots__ = ("operation", "operand1", "operand2", "result")
+
     def __init__(self, operation: Operation, operand1: Union[int, float], operand2: Union[int, float]):
         """
         Initialize a Calculation instance with a specified operation and two operands.
@@ -39,4 +49,341 @@ class Calculation:
         result_display = self.result if self.result is not None else "Not calculated"
         return f"{self.operand1} {operation_name} {self.operand2} = {result_display}"
 
+    def __eq__(self, other: object) -> bool:
+        """
+        Compare two calculations by operation type, operands, and result.
+
+        Returns:
+            bool: True if both calculations describe the same computation.
+        """
+        if not isinstance(other, Calculation):
+            return NotImplemented
+        return (type(self.operation) is type(other.operation)
+                and (self.operand1, self.operand2, self.result) == (other.operand1, other.operand2, other.result))
+
+    __hash__ = None  # Calculations are mutable (result is set by execute)
+
+    def to_dict(self) -> dict:
+        """
+        Return a JSON-serializable representation of the calculation.
+
+        Returns:
+            dict: The operation class name, operands, and result.
+        """
+        return {
+            "operation": self.operation.__class__.__name__,
+            "operand1": self.operand1,
+            "operand2": self.operand2,
+            "result": self.result,
+        }
+
+class BatchCalculation:
+    """Represents one operation applied element-wise over two operand columns."""
+
+    def __init__(self, operation: Operation, operands1: Sequence[float], operands2: Sequence[float], **options):
+        """
+        Initialize a BatchCalculation with an operation and two operand columns.
+
+        Args:
+            operation (Operation): An instance of an Operation subclass.
+            operands1 (Sequence[float]): The first operand column.
+            operands2 (Sequence[float]): The second operand column.
+            **options: Extra keyword arguments forwarded to ``calculate_many`` (e.g. ``zero_policy``).
+        """
+        self.operation = operation
+        self.operands1 = operands1
+        self.operands2 = operands2
+        self.options = options
+        self.results: Optional[array] = None  # Results are None until the batch is executed
+
+    def execute(self) -> array:
+        """
+        Execute the batch in a single vectorized pass, storing the result column.
+
+        Returns:
+            array: The float64 result column.
+        """
+        self.results = self.operation.calculate_many(self.operands1, self.operands2, **self.options)
+        return self.results
+
+    def __len__(self) -> int:
+        """Return the number of operand pairs in the batch."""
+        return len(self.operands1)
+
+    def __repr__(self) -> str:
+        """
+        Return a short summary of the batch instead of every element.
+
+        Returns:
+            str: The operation name and batch size, with a status marker if not yet executed.
+        """
+        operation_name = self.operation.__class__.__name__.lower()
+        status = "" if self.results is not None else " (not calculated)"
+        return f"batch {operation_name} x {len(self)}{status}"
+
+    def to_dict(self) -> dict:
+        """
+        Return a JSON-serializable representation of the batch.
+
+        Returns:
+            dict: The operation class name, operand columns, options, and result column.
+        """
+        return {
+            "operation": self.operation.__class__.__name__,
+            "operands1": list(self.operands1),
+            "operands2": list(self.operands2),
+            "options": self.options,
+            "results": list(self.results) if self.results is not None else None,
+        }
+
+class ExpressionCalculation:
+    """Represents the evaluation of a compiled arithmetic expression with a set of variable bindings."""
+
+    def __init__(self, expression: str, bindings: Optional[Dict[str, Union[int, float]]] = None):
+        """
+        Initialize an ExpressionCalculation.
+
+        Args:
+            expression (str): The expression text, e.g. '(a + b) * c'.
+            bindings (Optional[Dict[str, Union[int, float]]]): The values of the expression's variables.
+        """
+        self.expression = expression
+        self.bindings = bindings or {}
+        self.result: Union[int, float, None] = None
+
+    def execute(self) -> Union[int, float]:
+        """
+        Evaluate the expression through its cached compiled plan, storing the result.
+
+        Returns:
+            Union[int, float]: The value of the expression.
+        """
+        self.result = compile_expression(self.expression).evaluate(**self.bindings)
+        return self.result
+
+    def __repr__(self) -> str:
+        """
+        Return the expression, its bindings, and its result.
+
+        Returns:
+            str: A formatted string such as '(a + b) * c [a=1, b=2, c=3] = 9'.
+        """
+        bindings = ", ".join(f"{name}={value}" for name, value in self.bindings.items())
+        bindings_display = f" [{bindings}]" if bindings else ""
+        result_display = self.result if self.result is not None else "Not calculated"
+        return f"{self.expression}{bindings_display} = {result_display}"
+
+    def to_dict(self) -> dict:
+        """
+        Return a JSON-serializable representation of the evaluation.
+
+        Returns:
+            dict: The expression text, bindings, and result.
+        """
+        return {"expression": self.expression, "bindings": self.bindings, "result": self.result}
+
+class ReductionCalculation:
+    """Represents a reduction (sum, product, mean, variance, min, or max) over a stream of values.
+
+    The values are consumed once by ``execute`` and not kept; only the count and result are stored,
+    so a reduction over millions of values is one small history entry.
+    """
+
+    def __init__(self, reduction: str, values: Iterable[Union[int, float]] = ()):
+        """
+        Initialize a ReductionCalculation.
+
+        Args:
+            reduction (str): The reduction name, a key of app.reduction.REDUCTIONS.
+            values (Iterable[Union[int, float]]): The values to reduce, e.g. a generator or a file reader.
+
+        Raises:
+            ValueError: If the reduction name is unknown.
+        """
+        if reduction not in REDUCTIONS:
+            raise ValueError(f"Unknown reduction '{reduction}'.")
+        self.reduction = reduction
+        self.values: Optional[Iterable[Union[int, float]]] = values
+        self.count = 0
+        self.result: Union[int, float, None] = None
+
+    def execute(self) -> Union[int, float]:
+        """
+        Reduce the values in one pass, storing the count and result and releasing the values.
+
+        Returns:
+            Union[int, float]: The result of the reduction.
+        """
+        reducer = REDUCTIONS[self.reduction]()
+        try:
+            reducer.update(self.values)
+        finally:
+            self.values = None
+            self.count = reducer.count
+        self.result = reducer.result()
+        return self.result
+
+    def __repr__(self) -> str:
+        """
+        Return the reduction, the number of values, and the result.
+
+        Returns:
+            str: A formatted string such as 'sum of 3 values = 6'.
+        """
+        plural = "value" if self.count == 1 else "values"
+        result_display = self.result if self.result is not None else "Not calculated"
+        return f"{self.reduction} of {self.count} {plural} = {result_display}"
+
+    def to_dict(self) -> dict:
+        """
+        Return a JSON-serializable representation of the reduction.
+
+        Returns:
+            dict: The reduction name, number of values, and result.
+        """
+        return {"reduction": self.reduction, "count": self.count, "result": self.result}
+
+class SweepRange(NamedTuple):
+    """An evenly spaced range of operands, from start to stop inclusive (if a step lands on it)."""
+    start: float
+    stop: float
+    step: float = 1.0
+
+    @classmethod
+    def parse(cls, text: str) -> "SweepRange":
+        """
+        Parse a range written as 'start:stop' or 'start:stop:step', e.g. '1:10' or '-1:1:0.25'.
+
+        Raises:
+            ValueError: If the text is not a range.
+        """
+        bounds = text.split(":")
+        if len(bounds) not in (2, 3):
+            raise ValueError(f"Invalid range '{text}'; expected start:stop or start:stop:step.")
+        return cls(*map(float, bounds))
+
+    @property
+    def count(self) -> int:
+        """
+        The number of values in the range.
+
+        Raises:
+            ValueError: If the step is zero or not finite, or points away from the stop.
+        """
+        if not self.step or not math.isfinite(self.step) or (self.stop - self.start) * self.step < 0:
+            raise ValueError(f"Empty range {self}; the step must lead from the start to the stop.")
+        # The tolerance keeps the stop when rounding puts it a hair past the last step
+        return math.floor((self.stop - self.start) / self.step + 1e-9) + 1
+
+    def values(self, first: int = 0, last: Optional[int] = None) -> array:
+        """
+        Return the values at positions [first, last) of the range.
+
+        Each value is start + i * step, so rounding errors do not accumulate along the range.
+
+        Returns:
+            array: A float64 array of the values.
+        """
+        last = self.count if last is None else last
+        return array("d", map(float(self.start).__add__, map(float(self.step).__mul__, range(first, last))))
+
+    def __str__(self) -> str:
+        """Return the range as written on the command line, e.g. '1:10' or '0:1:0.25'."""
+        bounds = (self.start, self.stop) if self.step == 1 else tuple(self)
+        return ":".join(map(_format_number, bounds))
+
+class SweepCalculation:
+    """Represents an operation over the outer product of two operand ranges, e.g. a multiplication table.
+
+    Only the ranges are stored, so a sweep over millions of cells is one small history entry, and
+    its table is computed again, lazily, whenever it is read.
+    """
+
+    def __init__(self, operation: Operation, range1: SweepRange, range2: SweepRange, **options):
+        """
+        Initialize a SweepCalculation.
+
+        Args:
+            operation (Operation): An instance of an Operation subclass that supports calculate_many.
+            range1 (SweepRange): The first operands, one per row of the table; a (start, stop, step)
+                or (start, stop) tuple is also accepted.
+            range2 (SweepRange): The second operands, one per column of the table.
+            **options: Extra keyword arguments forwarded to ``calculate_many`` (e.g. ``zero_policy``).
+
+        Raises:
+            ValueError: If a range is empty.
+        """
+        self.operation = operation
+        self.range1 = SweepRange(*map(float, range1))
+        self.range2 = SweepRange(*map(float, range2))
+        self.options = options
+        self.shape = (self.range1.count, self.range2.count)
+
+    def rows(self, chunk_cells: int = SWEEP_CHUNK_CELLS) -> Iterator[Tuple[float, array]]:
+        """
+        Lazily evaluate the table, row by row.
+
+        Rows are computed in chunks of about ``chunk_cells`` cells, each with one vectorized
+        ``calculate_many`` call, so memory use is bounded by the chunk and one row of operands
+        rather than by the size of the table.
+
+        Args:
+            chunk_cells (int): Cells per vectorized call. Defaults to SWEEP_CHUNK_CELLS.
+
+        Yields:
+            Tuple[float, array]: Each first operand and its row of float64 results.
+        """
+        height, width = self.shape
+        columns = self.range2.values()
+        rows_per_chunk = max(1, chunk_cells // width)
+        for first in range(0, height, rows_per_chunk):
+            operands1 = self.range1.values(first, min(first + rows_per_chunk, height))
+            left = array("d", chain.from_iterable(map(repeat, operands1, repeat(width, len(operands1)))))
+            results = self.operation.calculate_many(left, columns * len(operands1), **self.options)
+            for row, operand1 in enumerate(operands1):
+                yield operand1, results[row * width:(row + 1) * width]
+
+    def lines(self) -> Iterator[str]:
+        """
+        Lazily format the table: a header of the second operands, then one line per first operand.
+
+        Yields:
+            str: Each line, with tab-separated cells.
+        """
+        yield "\t".join(["", *map(_format_number, self.range2.values())])
+        for operand1, row in self.rows():
+            yield "\t".join([_format_number(operand1), *map(_format_number, row)])
+
+    def __len__(self) -> int:
+        """Return the number of cells in the table."""
+        return self.shape[0] * self.shape[1]
+
+    def __repr__(self) -> str:
+        """
+        Return the operation, the ranges, and the size of the table.
+
+        Returns:
+            str: A formatted string such as 'sweep multiplication 1:10 x 1:10 (100 cells)'.
+        """
+        operation_name = self.operation.__class__.__name__.lower()
+        return f"sweep {operation_name} {self.range1} x {self.range2} ({len(self):,} cells)"
+
+    def to_dict(self) -> dict:
+        """
+        Return a JSON-serializable representation of the sweep.
+
+        Returns:
+            dict: The operation class name, the (start, stop, step) of both ranges, and the options.
+        """
+        return {
+            "operation": self.operation.__class__.__name__,
+            "sweep": [list(self.range1), list(self.range2)],
+            "options": self.options,
+        }
 
+def _format_number(value: float) -> str:
+    """Format a table value compactly: whole numbers without '.0', others in full precision."""
+    value = float(value)
+    if value.is_integer() and abs(value) < 1e16:
+        return str(int(value))
+    return repr(value)
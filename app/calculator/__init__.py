@@ -1,33 +1,124 @@
-from app.operations.addition import Addition
-from app.operations.subtraction import Subtraction
-from app.operations.multiplication import Multiplication
-from app.operations.division import Division
-from app.history import History
-from app.calculation import Calculation
+import copy
+import json
+import math
+import re
+import time
+import zlib
+from app.operations.builtin import OPERATIONS
+from app.history import History, entry_from_dict
+from app.calculation import (
+    BatchCalculation, Calculation, ExpressionCalculation, ReductionCalculation, SweepCalculation, SweepRange,
+)
+from app.expression import compile_expression
+from app.graph import CalculationGraph, GraphError, bind
+from app.cache import MISSING, LRUCache
+from app.reduction import REDUCTIONS, read_values
+from app.stats import Instrumentation
+
+# Arguments that refer to an earlier result instead of giving a number: 'ans', '$3' (history entry 3), or '$x'.
+REFERENCE = re.compile(r"ans|\$\w+")
+# Names accepted by the 'let' command.
+VARIABLE = re.compile(r"[A-Za-z_]\w*")
+
+def _argument(word):
+    """Convert a command argument to a float, keeping references such as 'ans' or '$3' as text."""
+    try:
+        return float(word)
+    except ValueError:
+        if REFERENCE.fullmatch(word):
+            return word
+        raise
+
+def parse_command(line):
+    """Splits a command line into the command and its numeric arguments.
+
+    Args:
+        line (str): A line of user input, e.g. 'add 1 2'.
+
+    Returns:
+        tuple: The lower-cased command and a list of float arguments, with references ('ans', '$3',
+        '$x') kept as strings. For text commands such as 'eval', the list holds the rest of the line
+        as a single string instead.
+
+    Raises:
+        ValueError: If an argument is neither a number nor a reference.
+    """
+    parts = line.strip().split(maxsplit=1)
+    command, rest = parts[0].lower(), parts[1] if len(parts) > 1 else ""
+    if command in Calculator.TEXT_COMMANDS:
+        return command, [rest]
+    return command, [_argument(arg) for arg in rest.split()]
 
 class Calculator:
-    """A simple calculator class to perform basic arithmetic operations with history tracking."""
-
-    def __init__(self):
-        """Initialize the Calculator with command mappings and history."""
-        self.history = History()
-        self.commands = {
-            # Operation commands
-            'add': Addition(),
-            'subtract': Subtraction(),
-            'multiply': Multiplication(),
-            'divide': Division(),
-            #General commands
-            'help': self.show_help,
-            'exit': self.exit_calculator,
-            'quit': self.exit_calculator,
-            # History commands
-            'undo': self.history.undo,
-            'clear': self.history.clear,
-            'save': lambda: self.history.save(),
-            'load': lambda: self.history.load(),
-            'history': self.read_history  # New command to read history
-        }
+    """A simple calculator class to perform basic arithmetic operations with history tracking.
+
+    The command and operation tables are shared by every instance, and per-calculator state lives
+    in slots, so a process can hold many idle calculators cheaply (see app.session).
+    """
+
+    __slots__ = ("history", "record_history", "cache", "stats", "_graph")
+
+    # Commands whose arguments are passed through as text instead of being converted to numbers.
+    TEXT_COMMANDS = frozenset(['eval', 'let', 'history', 'summary', 'pipeline', 'sweep', *REDUCTIONS])
+    # Filters of the 'history' command, written name=value, and the History.query argument of each.
+    HISTORY_FILTERS = {
+        'min': 'min_result', 'max': 'max_result', 'operand_min': 'min_operand', 'operand_max': 'max_operand',
+        'since': 'since', 'until': 'until', 'offset': 'offset', 'limit': 'limit',
+    }
+
+    # Operation commands (shared, stateless instances, imported on first use)
+    operations = OPERATIONS
+    # Command name -> name of the method that runs it.
+    COMMANDS = {
+        #General commands
+        'help': 'show_help',
+        'exit': 'exit_calculator',
+        'quit': 'exit_calculator',
+        # History commands
+        'undo': 'undo',
+        'clear': 'clear',
+        'save': 'save',
+        'load': 'load',
+        'history': 'read_history',  # New command to read history
+        'summary': 'show_summary',
+        'cache': 'cache_stats',
+        'stats': 'show_stats',
+        # Expression commands
+        'eval': 'evaluate_text',
+        'let': 'let',
+        # Bulk commands
+        'pipeline': 'run_pipeline',
+        'sweep': 'sweep_command',
+        # Reduction commands (any number of values), run by reduce_command with the command name
+        **{name: 'reduce_command' for name in REDUCTIONS},
+    }
+
+    def __init__(self, cache_size=0, history=None, instrument=False):
+        """Initialize the Calculator with command mappings and history.
+
+        Args:
+            cache_size (int): Number of operation results to memoize, keyed by command and operands.
+                Defaults to 0, which disables the result cache.
+            history (History): The history to record calculations in. Defaults to a new History.
+            instrument (bool): Whether to record per-command counts, errors, and latencies (see the
+                'stats' command). Defaults to False, which adds no overhead.
+        """
+        self.history = history if history is not None else History()
+        self.record_history = True  # Set to False to skip logging calculations (e.g. bulk batch runs)
+        self.cache = LRUCache(cache_size) if cache_size > 0 else None
+        self._graph = None  # Created when a calculation first references another (see graph)
+        self.stats = Instrumentation() if instrument else None
+        if instrument:
+            # Switch this instance to the timing subclass, so uninstrumented calculators pay nothing
+            self.__class__ = _InstrumentedCalculator
+            self.history.io_observer = self.stats.record
+
+    @property
+    def graph(self):
+        """The CalculationGraph of the calculations that reference variables or other such calculations."""
+        if self._graph is None:
+            self._graph = CalculationGraph()
+        return self._graph
 
     def execute_command(self, command, *args):
         """Execute the command associated with the user input.
@@ -39,16 +130,28 @@ class Calculator:
         Returns:
             str or float: The result of the operation, or an error message if an error occurs.
         """
-        if command in self.commands:
+        if command in self.COMMANDS or command in self.operations:
             try:
-                if command in ['exit', 'quit', 'undo', 'clear', 'help', 'save', 'load', 'history']:
-                    return self.commands[command]()  # Directly return result for non-math commands
+                if command in ['exit', 'quit', 'undo', 'clear', 'help', 'save', 'load', 'cache', 'stats']:
+                    return getattr(self, self.COMMANDS[command])()  # Directly return result for non-math commands
+                if command in REDUCTIONS:
+                    return self.reduce_command(command, *args)
+                if command in self.TEXT_COMMANDS:
+                    return getattr(self, self.COMMANDS[command])(*args)
+
+                operation = self.operations[command]
+                references = {slot: arg for slot, arg in zip(('operand1', 'operand2'), args) if isinstance(arg, str)}
+                if references and all(map(REFERENCE.fullmatch, references.values())):
+                    # References to earlier results, e.g. 'add ans 1'; other strings fail as operands below
+                    return self._define(Calculation(operation, *args), references)
+                if self.cache is not None:
+                    return self._execute_cached(command, operation, args)
 
                 # Create a Calculation instance, perform the operation, and add to history
-                operation = self.commands[command]
                 calculation = Calculation(operation, *args)
                 result = calculation.execute()
-                self.history.add_calculation(calculation)  # Log calculation to history
+                if self.record_history:
+                    self.history.add_calculation(calculation)  # Log calculation to history
                 return result  # Return only the numeric result
 
             except TypeError:
@@ -58,14 +161,548 @@ class Calculator:
         else:
             return "Error: Unknown command."
 
+    def _execute_cached(self, command, operation, args):
+        """Execute an operation through the result cache, logging hits to history like computed results.
+
+        Args:
+            command (str): The operation command.
+            operation (Operation): The operation to perform on a cache miss.
+            args (tuple): The operands.
+
+        Returns:
+            float: The result of the operation.
+        """
+        key = (command, args, tuple(map(type, args)))  # Keeps 1 and 1.0 apart so result types match
+        if 0 in args:  # 0.0 == -0.0, but results such as 1 * -0.0 keep the sign
+            key += (tuple(math.copysign(1, arg) if isinstance(arg, float) else 1 for arg in args),)
+        result = self.cache.get(key)
+        if result is MISSING:
+            calculation = Calculation(operation, *args)
+            result = calculation.execute()
+            self.cache.put(key, result)
+            if self.record_history:
+                self.history.add_calculation(calculation)
+        elif self.record_history:
+            self.history.add_result(operation, *args, result)
+        return result
+
+    def show_stats(self):
+        """Report per-command counts, errors, and p50/p95/p99 latencies.
+
+        Returns:
+            str: A table of statistics, or a message if instrumentation is disabled.
+        """
+        if self.stats is None:
+            return "Instrumentation is disabled."
+        return self.stats.format()
+
+    def cache_stats(self):
+        """Report the hit, miss, and eviction counters of the result cache.
+
+        Returns:
+            str: A one-line summary, or a message if the cache is disabled.
+        """
+        if self.cache is None:
+            return "Result cache is disabled."
+        return str(self.cache)
+
+    def execute_batch(self, command, operands1, operands2, **options):
+        """Execute an operation command over two operand columns in one vectorized pass.
+
+        The whole batch is logged to history as a single BatchCalculation entry.
+
+        Args:
+            command (str): The operation command to execute (e.g., 'add', 'divide').
+            operands1: A buffer or iterable of first operands.
+            operands2: A buffer or iterable of second operands.
+            **options: Extra options for the operation (e.g., zero_policy='nan' for 'divide').
+
+        Returns:
+            array or str: The float64 result column, or an error message if an error occurs.
+        """
+        if command not in self.operations:
+            return "Error: Unknown command."
+        operation = self.operations[command]
+        try:
+            batch = BatchCalculation(operation, operands1, operands2, **options)
+            results = batch.execute()
+            if self.record_history:
+                self.history.add_calculation(batch)
+            return results
+        except Exception as e:
+            return f"Error: {str(e)}"
+
+    def sweep(self, command, range1, range2, **options):
+        """Tabulate an operation command over the outer product of two operand ranges.
+
+        The table is evaluated lazily, in vectorized chunks, as the returned sweep's rows or lines
+        are read, and the sweep is logged to history as a single entry holding just the ranges.
+
+        Args:
+            command (str): The operation command (e.g., 'multiply', 'divide').
+            range1: The first operands, one per row: a SweepRange or a (start, stop[, step]) tuple.
+            range2: The second operands, one per column.
+            **options: Extra options for the operation (e.g., zero_policy='nan' for 'divide').
+
+        Returns:
+            SweepCalculation or str: The sweep, or an error message if an error occurs.
+        """
+        if command not in self.operations:
+            return "Error: Unknown command."
+        try:
+            sweep = SweepCalculation(self.operations[command], range1, range2, **options)
+            # Evaluate one cell now, so an unsupported operation or a bad option fails before logging
+            self.operations[command].calculate_many([sweep.range1.start], [sweep.range2.start], **options)
+            if self.record_history:
+                self.history.add_calculation(sweep)
+            return sweep
+        except Exception as e:
+            return f"Error: {str(e)}"
+
+    def sweep_command(self, text=""):
+        """Run a 'sweep' command line such as 'multiply 1:10 1:10' or 'divide 1:5 -2:2:0.5 zero_policy=nan'.
+
+        The words are the operation and the ranges of the first and second operands, each written
+        start:stop or start:stop:step with the stop included; name=value words are options of the
+        operation.
+
+        Args:
+            text (str): The rest of the command line.
+
+        Returns:
+            SweepCalculation or str: The sweep, whose lines() stream the table, or an error message.
+        """
+        words, options = [], {}
+        for word in text.split():
+            name, separator, value = word.partition("=")
+            if separator:
+                options[name] = value
+            else:
+                words.append(word)
+        if len(words) != 3:
+            return "Error: Usage: sweep <operation> <start:stop[:step]> <start:stop[:step]> [option=value]"
+        try:
+            range1, range2 = SweepRange.parse(words[1]), SweepRange.parse(words[2])
+        except ValueError as e:
+            return f"Error: {str(e)}"
+        return self.sweep(words[0].lower(), range1, range2, **options)
 
-    def read_history(self):
-        """Retrieve and display the calculation history.
+    def execute_parallel(self, jobs, workers=None, chunk_size=10_000):
+        """Evaluate many (command, operand1, operand2) jobs across worker processes.
+
+        Outcomes come back in input order with a per-job error message where a job fails, and the
+        successful calculations are merged into history in that same order.
+
+        Args:
+            jobs: A list or stream of (command, operand1, operand2) tuples.
+            workers (int): Number of worker processes. Defaults to the number of CPUs.
+            chunk_size (int): Number of jobs sent to a worker at a time. Defaults to 10,000.
+
+        Returns:
+            list: The result of each job, or its "Error: ..." message.
+        """
+        from app.parallel import ParallelEngine  # Deferred: multiprocessing is slow to import at startup
+        engine = ParallelEngine(workers=workers, chunk_size=chunk_size)
+        outcomes = []
+        for chunk, chunk_outcomes in engine.map_chunks(jobs):
+            if self.record_history:
+                for (command, operand1, operand2), outcome in zip(chunk, chunk_outcomes):
+                    if not isinstance(outcome, str):
+                        self.history.add_result(self.operations[command], operand1, operand2, outcome)
+            outcomes.extend(chunk_outcomes)
+        return outcomes
+
+    def evaluate(self, expression, **bindings):
+        """Evaluate an arithmetic expression and log it to history as a single entry.
+
+        Expressions are compiled once and the plan is cached by its text, so evaluating the same
+        formula with new bindings skips parsing.
+
+        Args:
+            expression (str): The expression, e.g. '(a + b) * c / d'.
+            **bindings: A value for each variable in the expression.
 
         Returns:
-            str: A formatted string of the history of calculations.
+            float or str: The value of the expression, or an error message if an error occurs.
         """
-        return self.history.get_history()  # Assume `get_history` returns the formatted history
+        try:
+            calculation = ExpressionCalculation(expression, bindings)
+            variables = sorted(compile_expression(expression).variables)
+            references = {name: name for name in variables if name not in bindings}
+            if references:  # Variables, 'ans', or '$3' read from earlier results
+                return self._define(calculation, references)
+            result = calculation.execute()
+            if self.record_history:
+                self.history.add_calculation(calculation)
+            return result
+        except Exception as e:
+            return f"Error: {str(e)}"
+
+    def evaluate_text(self, text=""):
+        """Evaluate an 'eval' command line such as '(a + b) * c a=1 b=2 c=3'.
+
+        Words of the form name=value are variable bindings; the rest is the expression.
+
+        Args:
+            text (str): The expression followed by any bindings.
+
+        Returns:
+            float or str: The value of the expression, or an error message if an error occurs.
+        """
+        words, bindings = [], {}
+        for word in text.split():
+            name, separator, value = word.partition("=")
+            if not separator:
+                words.append(word)
+                continue
+            try:
+                bindings[name] = float(value)
+            except ValueError:
+                return f"Error: Invalid value for variable '{name}'."
+        return self.evaluate(" ".join(words), **bindings)
+
+    def let(self, text=""):
+        """Define or redefine a variable, e.g. 'x = 5', 'y = $x * 2', or 'z = add $y ans'.
+
+        The definition is an expression or an operation command. Calculations that use the variable
+        (by name in expressions, or as '$x') are recomputed when it is redefined. Without text, lists
+        the variables.
+
+        Args:
+            text (str): The variable name, '=', and its definition.
+
+        Returns:
+            float or str: The value of the variable, the list of variables, or an error message.
+        """
+        name, separator, definition = text.partition("=")
+        name = name.strip()
+        if not separator:
+            if name:
+                return "Error: Usage: let <name> = <expression or command>"
+            return self._variables()
+        if not VARIABLE.fullmatch(name) or name == 'ans':
+            return f"Error: Invalid variable name '{name}'."
+        words = definition.split()
+        try:
+            if words and words[0].lower() in self.operations:
+                args = [_argument(word) for word in words[1:]]
+                calculation = Calculation(self.operations[words[0].lower()], *args)
+                references = {slot: arg for slot, arg in zip(('operand1', 'operand2'), args) if isinstance(arg, str)}
+            else:
+                calculation = ExpressionCalculation(definition.strip())
+                variables = sorted(compile_expression(definition.strip()).variables)
+                references = {variable: variable for variable in variables}
+        except TypeError:
+            return "Error: Invalid number of arguments. Please provide two numbers."
+        except ValueError as e:
+            return f"Error: {str(e)}"
+        return self._define(calculation, references, name)
+
+    def _variables(self):
+        """List the variables defined with 'let' and their current values."""
+        lines = []
+        for key in self.graph:
+            if isinstance(key, str):
+                try:
+                    lines.append(f"{key} = {self.graph.value(key)}")
+                except GraphError as e:
+                    lines.append(f"{key} = Error: {e}")
+        return "\n".join(lines) if lines else "No variables defined."
+
+    def _resolve(self, reference):
+        """Resolve a reference to an earlier result.
+
+        Args:
+            reference (str): 'ans' (the last history entry), '$3' (history entry 3), or a variable
+                name, with or without '$'.
+
+        Returns:
+            tuple: The graph key to read the value from, or None and the (fixed) value itself.
+
+        Raises:
+            GraphError: If the reference does not resolve to a single result.
+        """
+        if reference == 'ans':
+            if not len(self.history):
+                raise GraphError("No previous result for 'ans'.")
+            reference = f"${len(self.history)}"
+        name = reference[1:] if reference.startswith("$") else reference
+        if not name.isdigit():
+            if self._graph is None or name not in self._graph:
+                raise GraphError(f"Unknown variable '{name}'.")
+            return name, None
+        number = int(name)
+        if self._graph is not None and number in self._graph:
+            return number, None
+        if not 1 <= number <= len(self.history):
+            raise GraphError(f"Unknown reference '${number}'.")
+        result = getattr(self.history.entry(number - 1), 'result', None)
+        if result is None:
+            raise GraphError(f"${number} has no single result.")
+        return None, result
+
+    def _define(self, calculation, references, name=None):
+        """Execute a calculation whose inputs reference earlier results, and log it to history.
+
+        A calculation that reads a variable (directly or through other such calculations) becomes a
+        cell of the graph, keyed by its history number or variable name, so it is recomputed when
+        the variable changes. History keeps the calculation as it was first computed.
+
+        Args:
+            calculation: A Calculation or ExpressionCalculation.
+            references (dict): The reference ('ans', '$3', 'x') feeding each input of the calculation.
+            name (str): The variable to define, if any.
+
+        Returns:
+            float or str: The result, or an error message if an error occurs.
+        """
+        try:
+            sources = {}
+            for slot, reference in references.items():
+                key, value = self._resolve(reference)
+                if key is None:
+                    bind(calculation, slot, value)
+                else:
+                    sources[slot] = key
+            key = name if name is not None else len(self.history) + 1 if sources and self.record_history else None
+            if key is None:
+                result = calculation.execute()
+            else:
+                self.graph.define(key, calculation, sources)
+                result = self.graph.value(key)
+            if self.record_history:
+                self.history.add_calculation(copy.copy(calculation))
+            return result
+        except Exception as e:
+            return f"Error: {str(e)}"
+
+    def undo(self):
+        """Undo the last calculation, dropping it from the graph if other calculations referenced it.
+
+        Returns:
+            str: Information about the undone calculation or a message if no history exists.
+        """
+        number = len(self.history)
+        message = self.history.undo()
+        if self._graph is not None and number in self._graph:
+            self._graph.remove(number)
+        return message
+
+    def clear(self):
+        """Clear the calculation history and the variables.
+
+        Returns:
+            str: A confirmation message.
+        """
+        if self._graph is not None:
+            self._graph.clear()
+        return self.history.clear()
+
+    def to_bytes(self):
+        """Serialize the calculator's history, variables, and settings into a compact form.
+
+        Only what cannot be recomputed is kept: cached results and instrumentation are dropped.
+
+        Returns:
+            bytes: The zlib-compressed state, for from_bytes.
+        """
+        cells = [[key, calculation.to_dict(), sources, error]
+                 for key, calculation, sources, error in (self._graph.cells() if self._graph else ())]
+        state = {"record_history": self.record_history,
+                 "cache_size": self.cache.max_size if self.cache is not None else 0, "cells": cells}
+        return zlib.compress(json.dumps(state).encode() + b"\n" + self.history.to_bytes())
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Recreate a calculator from the output of to_bytes.
+
+        Args:
+            data (bytes): The serialized state.
+
+        Returns:
+            Calculator: A new calculator; its history decodes entries only when they are read.
+        """
+        header, history = zlib.decompress(data).split(b"\n", 1)
+        state = json.loads(header)
+        calculator = cls(cache_size=state["cache_size"], history=History.from_bytes(history))
+        calculator.record_history = state["record_history"]
+        if state["cells"]:
+            calculator._graph = CalculationGraph.from_cells(
+                (key, entry_from_dict(calculation), sources, error)
+                for key, calculation, sources, error in state["cells"])
+        return calculator
+
+    def save(self):
+        """Save the history to the default file.
+
+        Returns:
+            str: A message describing the outcome.
+        """
+        return self.history.save()
+
+    def load(self):
+        """Load history from the default file, forgetting the variables (history numbers change).
+
+        Returns:
+            str: A message describing the outcome.
+        """
+        if self._graph is not None:
+            self._graph.clear()
+        return self.history.load()
+
+    def reduce(self, reduction, values):
+        """Reduce any number of values in one pass and log the reduction to history as a single entry.
+
+        Args:
+            reduction (str): 'sum', 'product', 'mean', 'variance', 'min', or 'max'.
+            values: An iterable of numbers, consumed once; generators and lazy file readers are not
+                materialized, so memory use does not depend on the number of values.
+
+        Returns:
+            float or str: The result of the reduction, or an error message if an error occurs.
+        """
+        try:
+            calculation = ReductionCalculation(reduction, values)
+            result = calculation.execute()
+            if self.record_history:
+                self.history.add_calculation(calculation)
+            return result
+        except Exception as e:
+            return f"Error: {str(e)}"
+
+    def reduce_command(self, reduction, *args):
+        """Run a reduction command on numbers, or on command line text such as '1 2 3' or '@values.txt'.
+
+        A '@' followed by a path streams the numbers from that file (separated by whitespace, commas,
+        or newlines) without reading it into memory.
+
+        Args:
+            reduction (str): The reduction name.
+            *args: The values, or a single string with the rest of the command line.
+
+        Returns:
+            float or str: The result of the reduction, or an error message if an error occurs.
+        """
+        if len(args) != 1 or not isinstance(args[0], str):
+            return self.reduce(reduction, args)
+        text = args[0].strip()
+        if not text.startswith("@"):
+            return self.reduce(reduction, read_values([text]))
+        path = text[1:].strip()
+        try:
+            with open(path, "r", encoding="utf-8") as file:
+                return self.reduce(reduction, read_values(file))
+        except OSError:
+            return f"Error: Could not read {path}."
+
+    def run_pipeline(self, text=""):
+        """Run a 'pipeline' command line such as 'divide in.npy out.npy zero_policy=nan'.
+
+        Applies an operation to every row of a numeric file (CSV, .npy, or raw float64) and streams
+        the results to another file, one chunk at a time. The words are the operation, the input
+        file, the output file, and optionally a second input file holding the second operands;
+        name=value words are 'columns' (e.g. columns=0,2) and options of the operation such as
+        zero_policy. The results are written to the file rather than logged to history.
+
+        Args:
+            text (str): The rest of the command line.
+
+        Returns:
+            str: A summary of the run, or an error message if an error occurs.
+        """
+        from app import pipeline  # Deferred: only needed for bulk file runs
+        words, options = [], {}
+        for word in text.split():
+            name, separator, value = word.partition("=")
+            if separator:
+                options[name] = value
+            else:
+                words.append(word)
+        if len(words) not in (3, 4):
+            return "Error: Usage: pipeline <operation> <input> <output> [input2] [columns=0,1] [option=value]"
+        command, path, output = words[0].lower(), words[1], words[2]
+        if command not in self.operations:
+            return f"Error: Unknown operation '{command}'."
+        try:
+            if 'columns' in options:
+                options['columns'] = tuple(int(column) for column in options['columns'].split(","))
+            count = pipeline.run(self.operations[command], path, output, words[3] if len(words) == 4 else None,
+                                 **options)
+        except OSError as e:
+            return f"Error: Could not read or write {e.filename or path}."
+        except Exception as e:
+            return f"Error: {str(e)}"
+        return f"Pipeline wrote {count} results to {output}."
+
+    def read_history(self, text=""):
+        """Retrieve and display the calculation history, optionally filtered.
+
+        Filters are an operation command name, 'newest' for newest-first order, and name=value words:
+        min/max (result range), operand_min/operand_max, since/until (seconds since the epoch),
+        last (entries added in the last N seconds), offset and limit. For example,
+        'history divide min=5 limit=10' lists the first ten divisions with a result of at least 5.
+
+        Args:
+            text (str): The filters. Defaults to none, which returns the whole history.
+
+        Returns:
+            HistoryView or list or str: The matching calculations, or an error message for a bad filter.
+        """
+        if not text.strip():
+            return self.history.get_history()
+        filters = {}
+        for word in text.lower().split():
+            name, separator, value = word.partition("=")
+            if not separator:
+                if name == 'newest':
+                    filters['newest_first'] = True
+                elif name in self.operations:
+                    filters['operation'] = self.operations[name]
+                else:
+                    return f"Error: Unknown history filter '{word}'."
+                continue
+            try:
+                if name == 'last':
+                    filters['since'] = time.time() - float(value)
+                elif name in ('offset', 'limit'):
+                    filters[name] = int(value)
+                else:
+                    filters[self.HISTORY_FILTERS[name]] = float(value)
+            except KeyError:
+                return f"Error: Unknown history filter '{name}'."
+            except ValueError:
+                return f"Error: Invalid value for history filter '{name}'."
+        return self.history.query(**filters)
+
+    def show_summary(self, text=""):
+        """Report entry counts per operation and the sum, mean, min, and max of the results.
+
+        The history keeps these aggregates up to date on every add and undo, so the summary takes
+        the same time however long the history is.
+
+        Args:
+            text (str): The number of newest entries to list. Defaults to 5.
+
+        Returns:
+            str: The summary, or an error message for a bad count.
+        """
+        try:
+            last = int(text) if text.strip() else 5
+        except ValueError:
+            return "Error: Usage: summary [number of newest entries to list]"
+        summary = self.history.summary(max(0, last))
+        if not summary["entries"]:
+            return "History is empty."
+        counts = ", ".join(f"{label} {count}" for label, count in
+                           sorted(summary["by_operation"].items(), key=lambda item: (-item[1], item[0])))
+        lines = [f"Entries: {summary['entries']} ({summary['results']} with a result)", f"By operation: {counts}"]
+        if summary["results"]:
+            lines.append(f"Sum: {summary['sum']}, mean: {summary['mean']}, "
+                         f"min: {summary['min']}, max: {summary['max']}")
+        if summary["last"]:
+            lines.append(f"Last {len(summary['last'])}:")
+            lines.extend(f"  {entry}" for entry in summary["last"])
+        return "\n".join(lines)
 
     def show_help(self):
         """Display available commands in a readable format.
@@ -81,11 +718,20 @@ class Calculator:
             "- subtract: Subtract the second number from the first\n"
             "- multiply: Multiply two numbers\n"
             "- divide: Divide the first number by the second\n"
+            "- eval: Evaluate an expression, e.g. eval (a + b) * c a=1 b=2 c=3\n"
+            "- let: Define a variable, e.g. let x = 5, then add $x ans or eval x * $3 (recomputed when x changes)\n"
+            f"{self._plugin_help()}"
+            "- sum/product/mean/variance/min/max: Reduce many values, e.g. mean 1 2 3 or sum @values.txt\n"
+            "- pipeline: Run an operation over a numeric file, e.g. pipeline divide in.npy out.npy zero_policy=nan\n"
+            "- sweep: Tabulate an operation over two ranges, e.g. sweep multiply 1:10 1:10\n"
             "\n"
             "History Commands:\n"
             "- undo: Undo the last calculation\n"
-            "- clear: Clear the calculation history\n"
-            "- history: Read the calculation history\n"
+            "- clear: Clear the calculation history and variables\n"
+            "- history: Read the calculation history, e.g. history divide min=5 limit=10\n"
+            "- summary: Show counts per operation and the sum, mean, min, and max of results, e.g. summary 10\n"
+            "- cache: Show result cache statistics\n"
+            "- stats: Show command counts, errors, and latencies\n"
             "\n"
             "File Commands:\n"
             "- save: Save the current history to a file\n"
@@ -97,10 +743,32 @@ class Calculator:
         )
         return help_text
 
+    def _plugin_help(self):
+        """List the operation commands registered beyond the built-in ones, without importing them.
+
+        Returns:
+            str: A help line, or an empty string if there are no other operations.
+        """
+        names = [name for name in self.operations if name not in ('add', 'subtract', 'multiply', 'divide')]
+        return f"- Also: {', '.join(names)}\n" if names else ""
+
     def exit_calculator(self):
         """Exit the calculator.
 
         Returns:
             str: A farewell message indicating the calculator is closing.
         """
-        return "Exiting the calculator. Goodbye!"
\ No newline at end of file
+        return "Exiting the calculator. Goodbye!"
+
+class _InstrumentedCalculator(Calculator):
+    """A Calculator that records the latency and outcome of every command (see Calculator(instrument=True))."""
+
+    __slots__ = ()
+
+    def execute_command(self, command, *args):
+        """Execute a command like Calculator.execute_command, recording its latency and outcome."""
+        start = time.perf_counter_ns()
+        result = Calculator.execute_command(self, command, *args)
+        error = isinstance(result, str) and result.startswith("Error")
+        self.stats.record(command, time.perf_counter_ns() - start, error)
+        return result
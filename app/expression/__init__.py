@@ -0,0 +1,193 @@
+# app/expression/__init__.py
+
+import re
+from functools import lru_cache
+from typing import Callable, Dict, FrozenSet, Union
+from app.operations.builtin import OPERATIONS
+
+# Maximum number of compiled plans kept in the cache, keyed by expression text.
+PLAN_CACHE_SIZE = 256
+
+# Binary operators, their precedence, and the command of the (stateless) Operation that implements each.
+_COMMANDS: Dict[str, str] = {"+": "add", "-": "subtract", "*": "multiply", "/": "divide"}
+_PRECEDENCE = {"+": 1, "-": 1, "*": 2, "/": 2}
+
+# Variable names include references to earlier results such as '$3' and '$x' (see app.graph).
+_TOKEN = re.compile(r"\s*(?:(\d+\.?\d*(?:[eE][+-]?\d+)?|\.\d+(?:[eE][+-]?\d+)?)|([A-Za-z_]\w*|\$\w+)|(\S))")
+
+Number = Union[int, float]
+Evaluator = Callable[[Dict[str, Number]], Number]
+
+class ExpressionError(ValueError):
+    """Raised when an expression cannot be parsed or evaluated."""
+
+def _tokenize(text: str) -> list:
+    """Split an expression into ('num', value), ('name', text) and ('op', char) tokens."""
+    tokens = []
+    position = 0
+    text = text.rstrip()
+    while position < len(text):
+        match = _TOKEN.match(text, position)
+        number, name, symbol = match.groups()
+        if number is not None:
+            tokens.append(("num", float(number) if any(c in number for c in ".eE") else int(number)))
+        elif name is not None:
+            tokens.append(("name", name))
+        elif symbol in "+-*/()":
+            tokens.append(("op", symbol))
+        else:
+            raise ExpressionError(f"Unexpected character '{symbol}' in expression.")
+        position = match.end()
+    return tokens
+
+class _Parser:
+    """A precedence-climbing parser that builds a tuple-based syntax tree."""
+
+    def __init__(self, tokens: list):
+        """Initialize the parser over a list of tokens."""
+        self.tokens = tokens
+        self.position = 0
+
+    def peek(self):
+        """Return the next token without consuming it, or (None, None) at the end."""
+        return self.tokens[self.position] if self.position < len(self.tokens) else (None, None)
+
+    def take(self):
+        """Consume and return the next token."""
+        token = self.peek()
+        self.position += 1
+        return token
+
+    def parse(self):
+        """Parse the whole token list as one expression."""
+        if not self.tokens:
+            raise ExpressionError("Empty expression.")
+        node = self.binary(1)
+        if self.position != len(self.tokens):
+            raise ExpressionError(f"Unexpected '{self.peek()[1]}' in expression.")
+        return node
+
+    def binary(self, min_precedence: int):
+        """Parse a chain of binary operators whose precedence is at least min_precedence."""
+        node = self.unary()
+        while True:
+            kind, symbol = self.peek()
+            if kind != "op" or symbol not in _PRECEDENCE or _PRECEDENCE[symbol] < min_precedence:
+                return node
+            self.take()
+            node = ("bin", symbol, node, self.binary(_PRECEDENCE[symbol] + 1))
+
+    def unary(self):
+        """Parse a number, variable, signed operand, or parenthesized expression."""
+        kind, value = self.take()
+        if kind == "num":
+            return ("num", value)
+        if kind == "name":
+            return ("var", value)
+        if value == "-":
+            return ("neg", self.unary())
+        if value == "+":
+            return self.unary()
+        if value == "(":
+            node = self.binary(1)
+            if self.take() != ("op", ")"):
+                raise ExpressionError("Missing ')' in expression.")
+            return node
+        raise ExpressionError("Unexpected end of expression." if kind is None else f"Unexpected '{value}' in expression.")
+
+def _fold(node):
+    """Replace constant sub-expressions by their value, keeping the runtime semantics of each operation."""
+    if node[0] == "neg":
+        operand = _fold(node[1])
+        return ("num", -operand[1]) if operand[0] == "num" else ("neg", operand)
+    if node[0] != "bin":
+        return node
+    symbol, left, right = node[1], _fold(node[2]), _fold(node[3])
+    if left[0] == "num" and right[0] == "num":
+        try:
+            return ("num", OPERATIONS[_COMMANDS[symbol]].calculate(left[1], right[1]))
+        except ValueError:
+            pass  # e.g. a constant division by zero: left to fail when the plan is evaluated
+    return ("bin", symbol, left, right)
+
+def _build(node) -> Evaluator:
+    """Turn a syntax tree into a tree of closures over the variable bindings."""
+    kind = node[0]
+    if kind == "num":
+        value = node[1]
+        return lambda bindings: value
+    if kind == "var":
+        name = node[1]
+
+        def variable(bindings):
+            try:
+                return bindings[name]
+            except KeyError:
+                raise ExpressionError(f"Unknown variable '{name}'.") from None
+        return variable
+    if kind == "neg":
+        operand = _build(node[1])
+        return lambda bindings: -operand(bindings)
+    calculate, left, right = OPERATIONS[_COMMANDS[node[1]]].calculate, _build(node[2]), _build(node[3])
+    return lambda bindings: calculate(left(bindings), right(bindings))
+
+def _variables(node) -> FrozenSet[str]:
+    """Return the names of the variables used in a syntax tree."""
+    if node[0] == "var":
+        return frozenset((node[1],))
+    if node[0] == "num":
+        return frozenset()
+    return frozenset().union(*(_variables(child) for child in node[1:] if isinstance(child, tuple)))
+
+class CompiledExpression:
+    """A parsed, constant-folded arithmetic expression that can be evaluated with new bindings."""
+
+    __slots__ = ("text", "variables", "_evaluate")
+
+    def __init__(self, text: str):
+        """
+        Parse and compile an expression.
+
+        Args:
+            text (str): An arithmetic expression using + - * / parentheses, numbers and variable names.
+
+        Raises:
+            ExpressionError: If the expression is malformed.
+        """
+        tree = _fold(_Parser(_tokenize(text)).parse())
+        self.text = text
+        self.variables = _variables(tree)
+        self._evaluate = _build(tree)
+
+    def evaluate(self, **bindings: Number) -> Number:
+        """
+        Evaluate the expression.
+
+        Args:
+            **bindings: A value for each variable in the expression.
+
+        Returns:
+            Union[int, float]: The value of the expression.
+
+        Raises:
+            ExpressionError: If a variable has no binding.
+            ValueError: If a division by zero occurs.
+        """
+        return self._evaluate(bindings)
+
+    def __repr__(self) -> str:
+        """Return the source text of the expression."""
+        return f"CompiledExpression({self.text!r})"
+
+@lru_cache(maxsize=PLAN_CACHE_SIZE)
+def compile_expression(text: str) -> CompiledExpression:
+    """
+    Compile an expression, reusing the cached plan if the same text was compiled recently.
+
+    Args:
+        text (str): The expression text.
+
+    Returns:
+        CompiledExpression: The compiled plan.
+    """
+    return CompiledExpression(text)
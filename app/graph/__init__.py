@@ -0,0 +1,244 @@
+# app/graph/__init__.py
+
+from collections import deque
+from typing import Dict, Hashable, Iterable, Iterator, List, Mapping, Optional, Tuple, Union
+
+Number = Union[int, float]
+# A cell as (key, calculation, sources, error), see CalculationGraph.cells.
+Cell = Tuple[Hashable, object, Dict[str, Hashable], Optional[str]]
+
+class GraphError(ValueError):
+    """Raised for a circular reference, or when reading a cell that has no value."""
+
+def label(key: Hashable) -> str:
+    """Return how a cell is written in commands: '$3' for numbered cells, the name for named ones."""
+    return f"${key}" if isinstance(key, int) else str(key)
+
+def bind(calculation, slot: str, value: Number) -> None:
+    """Set one input of a calculation: an operand attribute, or a variable of an expression."""
+    if hasattr(calculation, "bindings"):
+        calculation.bindings = {**calculation.bindings, slot: value}  # A new dict, so logged copies keep theirs
+    else:
+        setattr(calculation, slot, value)
+
+class Node:
+    """A cell of the graph: a calculation whose inputs are read from other cells."""
+
+    __slots__ = ("calculation", "sources", "dependents", "value", "error", "dirty")
+
+    def __init__(self, calculation, sources: Mapping[str, Hashable]):
+        """
+        Initialize a node.
+
+        Args:
+            calculation: A Calculation or ExpressionCalculation, with its constant inputs already set.
+            sources (Mapping[str, Hashable]): The key of the cell that feeds each remaining input,
+                by operand attribute ('operand1', 'operand2') or expression variable name.
+        """
+        self.calculation = calculation
+        self.sources = dict(sources)
+        self.dependents: Optional[List[Hashable]] = None  # Created on the first dependent
+        self.value: Optional[Number] = None
+        self.error: Optional[str] = None
+        self.dirty = False
+
+class CalculationGraph:
+    """A spreadsheet-like graph of calculations that reference the results of other calculations.
+
+    Cells are keyed by number (history entry ``$N``) or by variable name. Redefining a cell marks
+    its transitive dependents dirty and recomputes just those, in topological order, so the cost of
+    a change is proportional to the number of cells downstream of it rather than to the size of the
+    graph. A cell whose recomputation fails (or whose input does) keeps the error instead of a value.
+    """
+
+    def __init__(self):
+        """Initialize an empty graph."""
+        self._nodes: Dict[Hashable, Node] = {}
+
+    def __len__(self) -> int:
+        """Return the number of cells."""
+        return len(self._nodes)
+
+    def __contains__(self, key: Hashable) -> bool:
+        """Return True if a cell exists under a key."""
+        return key in self._nodes
+
+    def __iter__(self) -> Iterator[Hashable]:
+        """Iterate over the cell keys, in definition order."""
+        return iter(self._nodes)
+
+    def value(self, key: Hashable) -> Number:
+        """
+        Return the current value of a cell.
+
+        Raises:
+            KeyError: If there is no cell under the key.
+            GraphError: If the cell has no value because its calculation failed.
+        """
+        node = self._nodes[key]
+        if node.error is not None:
+            raise GraphError(node.error)
+        return node.value
+
+    def cells(self) -> Iterator[Cell]:
+        """Yield every cell as (key, calculation, sources, error), in definition order, e.g. to serialize the graph."""
+        for key, node in self._nodes.items():
+            yield key, node.calculation, node.sources, node.error
+
+    @classmethod
+    def from_cells(cls, cells: Iterable[Cell]) -> "CalculationGraph":
+        """
+        Rebuild a graph from the output of cells, without recomputing anything.
+
+        Args:
+            cells (Iterable[Cell]): The cells; each calculation holds its last result.
+
+        Returns:
+            CalculationGraph: The graph.
+        """
+        graph = cls()
+        for key, calculation, sources, error in cells:
+            node = graph._nodes[key] = Node(calculation, sources)
+            node.value, node.error = calculation.result, error
+        for key, node in graph._nodes.items():
+            for source in set(node.sources.values()):
+                source_node = graph._nodes.get(source)
+                if source_node is not None:
+                    if source_node.dependents is None:
+                        source_node.dependents = []
+                    source_node.dependents.append(key)
+        return graph
+
+    def calculation(self, key: Hashable):
+        """Return the calculation of a cell, holding its current inputs and result."""
+        return self._nodes[key].calculation
+
+    def define(self, key: Hashable, calculation, sources: Mapping[str, Hashable]) -> List[Hashable]:
+        """
+        Define or redefine a cell, then recompute every cell that depends on it.
+
+        The cell's own value is computed first, so a definition that fails or would create a
+        circular reference leaves the graph unchanged.
+
+        Args:
+            key (Hashable): The cell's number or name.
+            calculation: A Calculation or ExpressionCalculation, with its constant inputs already set.
+            sources (Mapping[str, Hashable]): The key of the cell that feeds each remaining input.
+
+        Returns:
+            List[Hashable]: The keys of the dependent cells that were recomputed, in the order they were.
+
+        Raises:
+            GraphError: If a source is missing, has no value, or depends on the cell being defined.
+        """
+        for source in set(sources.values()):
+            if source not in self._nodes:
+                raise GraphError(f"Unknown reference '{label(source)}'.")
+        if key in self._nodes and self._reaches(key, set(sources.values())):
+            raise GraphError(f"Circular reference: {label(key)} would depend on itself.")
+        node = Node(calculation, sources)
+        self._compute(node)
+        if node.error is not None:
+            raise GraphError(node.error)
+        old = self._nodes.get(key)
+        if old is not None:
+            self._unlink(key, old)
+            node.dependents = old.dependents
+        self._nodes[key] = node
+        for source in set(sources.values()):
+            source_node = self._nodes[source]
+            if source_node.dependents is None:
+                source_node.dependents = []
+            source_node.dependents.append(key)
+        return self._propagate(key)
+
+    def remove(self, key: Hashable) -> List[Hashable]:
+        """
+        Remove a cell; cells that depend on it are recomputed into an error.
+
+        Returns:
+            List[Hashable]: The keys of the dependent cells that were recomputed.
+
+        Raises:
+            KeyError: If there is no cell under the key.
+        """
+        node = self._nodes.pop(key)
+        self._unlink(key, node)
+        self._nodes[key] = Node(None, {})  # A placeholder, so the dependents can be scheduled from it
+        self._nodes[key].dependents = node.dependents
+        try:
+            return self._propagate(key)
+        finally:
+            del self._nodes[key]
+
+    def clear(self) -> None:
+        """Remove every cell."""
+        self._nodes.clear()
+
+    def _unlink(self, key: Hashable, node: Node) -> None:
+        """Remove the edges from a node's sources to the node."""
+        for source in set(node.sources.values()):
+            source_node = self._nodes.get(source)
+            if source_node is not None and key in (source_node.dependents or ()):
+                source_node.dependents.remove(key)  # Absent if the source was removed and defined again
+
+    def _reaches(self, start: Hashable, targets: set) -> bool:
+        """Return True if a target is the start cell or one of its transitive dependents."""
+        if start in targets:
+            return True
+        seen, stack = {start}, [start]
+        while stack:
+            for dependent in self._nodes[stack.pop()].dependents or ():
+                if dependent in targets:
+                    return True
+                if dependent not in seen:
+                    seen.add(dependent)
+                    stack.append(dependent)
+        return False
+
+    def _compute(self, node: Node) -> None:
+        """Bind the current values of a node's sources and execute its calculation, recording any error."""
+        node.value = node.error = None
+        if node.calculation is None:
+            return
+        for slot, source in node.sources.items():
+            source_node = self._nodes.get(source)
+            if source_node is None or source_node.calculation is None:
+                node.error = f"{label(source)} no longer exists."
+                return
+            if source_node.error is not None:
+                node.error = source_node.error
+                return
+            bind(node.calculation, slot, source_node.value)
+        try:
+            node.value = node.calculation.execute()
+        except Exception as e:  # The error is kept on the cell, like a spreadsheet's #DIV/0!
+            node.error = str(e)
+
+    def _propagate(self, key: Hashable) -> List[Hashable]:
+        """Mark the transitive dependents of a cell dirty and recompute them in topological order."""
+        dirty, stack = [], [key]
+        while stack:
+            for dependent in self._nodes[stack.pop()].dependents or ():
+                node = self._nodes[dependent]
+                if not node.dirty:
+                    node.dirty = True
+                    dirty.append(dependent)
+                    stack.append(dependent)
+        # Kahn's algorithm over the dirty cells: a cell is ready once none of its sources is dirty
+        waiting = {dependent: sum(source in self._nodes and self._nodes[source].dirty
+                                  for source in set(self._nodes[dependent].sources.values()))
+                   for dependent in dirty}
+        ready = deque(dependent for dependent in dirty if not waiting[dependent])
+        order = []
+        while ready:
+            current = ready.popleft()
+            node = self._nodes[current]
+            self._compute(node)
+            node.dirty = False
+            order.append(current)
+            for dependent in node.dependents or ():
+                waiting[dependent] -= 1
+                if not waiting[dependent]:
+                    ready.append(dependent)
+        return order
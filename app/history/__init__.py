@@ -1,13 +1,177 @@
+import functools
 import json
-from typing import List
-from app.calculation import Calculation
+import os
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Sequence
+from itertools import islice
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
+from app.calculation import (
+    BatchCalculation, Calculation, ExpressionCalculation, ReductionCalculation, SweepCalculation,
+)
+from app.history.columns import (
+    CODE_MASK, HAS_RESULT, OBJECT_CODE, ColumnStore, code_for_operation, decode, encode, encode_values,
+    operation_for_code,
+)
+from app.history import archive, binary, wal
+from app.history.aggregates import HistoryAggregates
+from app.history.concurrent import AppendBuffers
+from app.history.index import HistoryIndexes
+from app.history.spill import RECORD_BYTES, SpillStore
+from app.operations import Operation
+from app.operations.builtin import OPERATIONS
+
+# Buffered appends a thread accumulates before it tries to merge them into the history.
+MERGE_THRESHOLD = 1024
+# Add times are recorded as sparse checkpoints, at most one per this many seconds.
+TIME_RESOLUTION = 0.001
+
+class HistoryView(Sequence):
+    """A live, read-only sequence over a History that materializes Calculation objects on access."""
+
+    __slots__ = ("_history",)
+
+    def __init__(self, history: "History"):
+        """
+        Initialize a view over a History.
+
+        Args:
+            history (History): The history to expose.
+        """
+        self._history = history
+
+    def __len__(self) -> int:
+        """Return the number of entries in the history."""
+        return len(self._history)
+
+    def __getitem__(self, index: Union[int, slice]):
+        """
+        Materialize the entry (or list of entries) at the given index or slice.
+
+        Raises:
+            IndexError: If the index is out of range.
+        """
+        if isinstance(index, slice):
+            return [self._history.entry(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("history index out of range")
+        return self._history.entry(index)
+
+    def __iter__(self) -> Iterator:
+        """Iterate over the entries, materializing one at a time."""
+        entry = self._history.entry
+        return (entry(i) for i in range(len(self)))
+
+    def __repr__(self) -> str:
+        """Return a list-like representation of the materialized entries."""
+        return repr(list(self))
+
+def _synchronized(method):
+    """Run a History method under the history lock, after merging buffered appends (thread-safe mode only)."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self._pending is None:
+            return method(self, *args, **kwargs)
+        with self._lock:
+            self._merge_pending()
+            return method(self, *args, **kwargs)
+    return wrapper
+
+def _observed(name: str):
+    """Report the latency of a History I/O method to ``io_observer``, if one is set."""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if self.io_observer is None:
+                return method(self, *args, **kwargs)
+            start = time.perf_counter_ns()
+            result = method(self, *args, **kwargs)
+            self.io_observer(name, time.perf_counter_ns() - start, result.startswith("Error"))
+            return result
+        return wrapper
+    return decorator
+
+def _close_store(store) -> None:
+    """Close a store that is being replaced, if it holds an open archive (threads and file descriptors)."""
+    if isinstance(store, archive.ArchiveStore):
+        store.close()
 
 class History:
-    """Manages the history of calculations with functionality to add, undo, clear, save, and load calculations."""
+    """Manages the history of calculations with functionality to add, undo, clear, save, and load calculations.
+
+    Plain calculations are stored in typed columns (see app.history.columns) and only materialized
+    as Calculation objects when read; other entries, such as batches, are kept as objects.
 
-    def __init__(self):
-        """Initialize an empty history list to store Calculation instances."""
-        self._history: List[Calculation] = []
+    Add times are kept as sparse (position, time) checkpoints, one per TIME_RESOLUTION at most, so
+    bulk appends cost no per-entry memory for them. The first call to query builds an index of
+    positions per operation and a sorted result index, which are then kept up to date on every add
+    and undo, so later queries only visit matching entries.
+
+    With a memory cap (``max_entries`` or ``max_bytes``), the oldest entries spill into segment
+    files on disk (see app.history.spill) and are read back transparently. Their time checkpoints
+    spill with them, and the query indexes only cover the entries still in memory: queries scan the
+    spilled records instead.
+
+    With ``thread_safe=True``, threads append to private buffers without taking a lock. Every other
+    operation (reads, undo, clear, save, load) takes the history lock and first merges the buffered
+    appends in the order they were made, so it sees every append that completed before it started.
+    """
+
+    __slots__ = ("_objects", "_store", "_wal", "_snapshot_path", "_compact_every", "_compaction", "_pending",
+                 "_log_generation", "_time_positions", "_times", "_indexes", "_aggregates", "_publisher", "_archived",
+                 "_lock", "io_observer")
+
+    def __init__(self, thread_safe: bool = False, max_entries: Optional[int] = None,
+                 max_bytes: Optional[int] = None, spill_directory: Optional[str] = None):
+        """
+        Initialize empty history columns.
+
+        Args:
+            thread_safe (bool): Whether the history may be shared between threads. Defaults to False.
+            max_entries (Optional[int]): Entries kept in memory before the oldest spill to disk.
+                Defaults to no limit.
+            max_bytes (Optional[int]): Like max_entries, as bytes of in-memory columns. Defaults to no limit.
+            spill_directory (Optional[str]): Where spilled segments are written. Defaults to a
+                temporary directory.
+        """
+        self._objects: Dict[int, object] = {}  # Position -> entry for OBJECT_CODE records in memory
+        if max_bytes is not None:
+            by_bytes = max(2, max_bytes // RECORD_BYTES)
+            max_entries = by_bytes if max_entries is None else min(max_entries, by_bytes)
+        if max_entries is None:
+            self._store = ColumnStore()
+        else:
+            self._store = SpillStore(self._objects, max_entries, spill_directory)
+            self._store.on_spill = self._on_spill
+        self._wal: Optional[wal.WriteAheadLog] = None
+        self._snapshot_path: Optional[str] = None
+        self._compact_every = 0
+        self._compaction: Optional[threading.Thread] = None  # Folding a rotated log into the snapshot
+        self._log_generation = 0  # The newest write-ahead log generation the entries include, as of the last read
+        self._pending: Optional[AppendBuffers] = AppendBuffers() if thread_safe else None
+        # Entries from _time_positions[k] up to the next checkpoint were added at _times[k]; entries
+        # before the first checkpoint were restored from a file and have no known add time.
+        self._time_positions = array("q")
+        self._times = array("d")
+        self._indexes: Optional[HistoryIndexes] = None  # Built by the first query
+        # Built by the first summary, then kept up to date on every add and undo
+        self._aggregates: Optional[HistoryAggregates] = None
+        self._publisher = None  # A shared.HistoryPublisher while publishing (see publish)
+        # After a spilled history is saved to an archive: the archive's real path, and how many of its
+        # first records are still the history's (undo lowers it, clear forgets the archive)
+        self._archived: Optional[Tuple[str, int]] = None
+        self._lock = threading.RLock() if thread_safe else None  # Only taken in thread-safe mode
+        # Called as io_observer(name, nanoseconds, error) after each save/load, e.g. Instrumentation.record
+        self.io_observer: Optional[Callable[[str, int, bool], None]] = None
+
+    @_synchronized
+    def __len__(self) -> int:
+        """Return the number of entries in the history."""
+        return len(self._store)
 
     def add_calculation(self, calculation: Calculation) -> None:
         """
@@ -16,8 +180,114 @@ class History:
         Args:
             calculation (Calculation): A Calculation object to record in the history.
         """
-        self._history.append(calculation)
+        if self._pending is not None:
+            self._buffer(encode(calculation), calculation)
+        else:
+            self._add_now(calculation)
+
+    def _add_now(self, calculation) -> None:
+        """Append a calculation directly to the columns (or the object table) and log it."""
+        record = encode(calculation)
+        if record is None:
+            self._append_object(calculation)
+        else:
+            self._append_record(record)
+
+    def add_result(self, operation: Operation, operand1: Union[int, float], operand2: Union[int, float],
+                   result: Union[int, float]) -> None:
+        """
+        Add a performed calculation to the history from its parts, without building a Calculation.
+
+        The entry is stored exactly as add_calculation would store the equivalent Calculation.
+
+        Args:
+            operation (Operation): The operation that was performed.
+            operand1 (Union[int, float]): The first operand.
+            operand2 (Union[int, float]): The second operand.
+            result (Union[int, float]): The result of the calculation.
+        """
+        record = encode_values(operation, operand1, operand2, result)
+        calculation = None
+        if record is None:
+            calculation = Calculation(operation, operand1, operand2)
+            calculation.result = result
+        if self._pending is not None:
+            self._buffer(record, calculation)
+        elif record is None:
+            self._append_object(calculation)
+        else:
+            self._append_record(record)
+
+    def _buffer(self, record, entry) -> None:
+        """Queue an append from any thread, merging once this thread's buffer is full and the lock is free."""
+        if self._pending.push((record, entry)) >= MERGE_THRESHOLD and self._lock.acquire(blocking=False):
+            try:
+                self._merge_pending()
+            finally:
+                self._lock.release()
+
+    def _merge_pending(self) -> None:
+        """Apply the buffered appends of all threads in order. Must be called with the lock held."""
+        for record, entry in self._pending.drain():
+            if record is None:
+                self._append_object(entry)
+            else:
+                self._append_record(record)
+
+    def _append_record(self, record) -> None:
+        """Append a column record, index it, and log it."""
+        if self._indexes is not None:
+            self._indexes.add(len(self._store), record[0], record[3], bool(record[0] & HAS_RESULT))
+        if self._aggregates is not None:
+            self._aggregates.add(len(self._store), record[0], record[3])
+        if self._publisher is not None:
+            self._publisher.add(len(self._store), *record)
+        self._stamp()
+        self._store.append(*record)
+        if self._wal is not None:
+            self._wal.append(wal.ADD, *record)
+            self._maybe_compact()
+
+    def _append_object(self, entry) -> None:
+        """Append an entry that is stored as an object, index it, and log it."""
+        if self._indexes is not None:
+            self._indexes.add(len(self._store), OBJECT_CODE, 0.0, False)
+        if self._aggregates is not None:
+            self._aggregates.add_object(len(self._store), entry)
+        if self._publisher is not None:
+            self._publisher.add_object(len(self._store), entry)
+        self._stamp()
+        self._objects[len(self._store)] = entry
+        self._store.append(OBJECT_CODE, 0.0, 0.0, 0.0)
+        if self._wal is not None:
+            self._wal.append(wal.OBJECT, entry.to_dict())
+            self._maybe_compact()
+
+    def _stamp(self) -> None:
+        """Record a time checkpoint for the entry about to be appended, unless a recent one covers it."""
+        now = time.time()
+        if not self._times or now - self._times[-1] >= TIME_RESOLUTION:
+            self._time_positions.append(len(self._store))
+            self._times.append(now)
+
+    @_synchronized
+    def entry(self, index: int):
+        """
+        Materialize the entry at a position.
+
+        Args:
+            index (int): The non-negative position of the entry.
+
+        Returns:
+            Calculation: The entry at that position.
+        """
+        record = self._store.record(index)
+        if record[0] == OBJECT_CODE:
+            entry = self._objects.get(index)
+            return entry if entry is not None else entry_from_dict(self._store.spilled_object(index))
+        return decode(record)
 
+    @_synchronized
     def undo(self) -> str:
         """
         Remove and return the last calculation from history.
@@ -25,11 +295,53 @@ class History:
         Returns:
             str: Information about the undone calculation or a message if no history exists.
         """
-        if not self._history:
+        if not self._store:
             return "No history to undo."
-        last_calculation = self._history.pop()
+        last_calculation = self.entry(len(self._store) - 1)
+        self._pop()
+        if self._publisher is not None:
+            self._publisher.undo(len(self._store))
+        if self._wal is not None:
+            self._wal.append(wal.UNDO)
+            self._maybe_compact()
         return f"Undone: {last_calculation}"
 
+    def _pop(self) -> None:
+        """Remove the last entry without logging it."""
+        code, _, _, result = self._store.pop()
+        self._objects.pop(len(self._store), None)
+        if self._time_positions:
+            if self._time_positions[-1] == len(self._store):
+                self._time_positions.pop()
+                self._times.pop()
+        elif isinstance(self._store, SpillStore):
+            self._store.drop_checkpoints(len(self._store))
+        if self._indexes is not None:
+            self._indexes.remove_last(len(self._store), code, result, bool(code & HAS_RESULT))
+        if self._aggregates is not None:
+            self._aggregates.remove_last(len(self._store), code, result, self._result_at)
+        if self._archived is not None and self._archived[1] > len(self._store):
+            self._archived = (self._archived[0], len(self._store))
+
+    def _reset_indexes(self) -> None:
+        """Forget all timestamps, indexes, and aggregates, treating the current entries as restored from a file."""
+        self._time_positions = array("q")
+        self._times = array("d")
+        if isinstance(self._store, SpillStore):
+            self._store.clear_checkpoints()
+        self._indexes = None
+        self._aggregates = None
+
+    def _on_spill(self, spilled: int) -> None:
+        """Move the time checkpoints and index entries of entries that just spilled to disk out of memory."""
+        count = bisect_left(self._time_positions, spilled)
+        if count:
+            self._store.spill_checkpoints(self._time_positions[:count], self._times[:count])
+            del self._time_positions[:count], self._times[:count]
+        if self._indexes is not None:
+            self._indexes.remove_before(spilled)
+
+    @_synchronized
     def clear(self) -> str:
         """
         Remove all calculations from history.
@@ -37,12 +349,210 @@ class History:
         Returns:
             str: Confirmation that history has been cleared.
         """
-        self._history.clear()
+        self._store.clear()
+        self._objects.clear()
+        self._reset_indexes()
+        self._archived = None
+        if self._publisher is not None:
+            self._publisher.clear()
+        if self._wal is not None:
+            self._wal.append(wal.CLEAR)
+            self._maybe_compact()
         return "History cleared."
 
+    @_synchronized
+    def publish(self, name: Optional[str] = None, capacity: Optional[int] = None) -> str:
+        """
+        Publish every change of the history into shared memory, for readers in other processes.
+
+        Each add, undo, and clear is written to a ring of fixed-size records that any process can
+        tail with app.history.shared.HistoryReader, without serialization. Publishing starts with a
+        clear followed by the current entries, so a reader that starts from the oldest event can
+        rebuild the history if it fits in the ring.
+
+        Args:
+            name (Optional[str]): The shared memory name. Defaults to a unique generated name.
+            capacity (Optional[int]): Changes the ring holds before the oldest are overwritten.
+                Defaults to shared.DEFAULT_CAPACITY.
+
+        Returns:
+            str: The name readers attach to.
+        """
+        from app.history import shared  # Deferred: multiprocessing is slow to import at startup
+        self.stop_publishing()
+        self._publisher = shared.HistoryPublisher(name, capacity or shared.DEFAULT_CAPACITY)
+        self._publish_snapshot()
+        return self._publisher.name
+
+    @_synchronized
+    def stop_publishing(self) -> None:
+        """Stop publishing and remove the shared memory; attached readers see it closed."""
+        if self._publisher is not None:
+            self._publisher.close()
+            self._publisher = None
+
+    def _publish_snapshot(self) -> None:
+        """Publish a clear and then every entry, after the history was replaced wholesale (e.g. loaded)."""
+        if self._publisher is None:
+            return
+        self._publisher.clear()
+        for position, record in enumerate(self._store.records()):
+            if record[0] == OBJECT_CODE:
+                self._publisher.add_object(position, self.entry(position))
+            else:
+                self._publisher.add(position, *record)
+
+    @_synchronized
+    def enable_autosave(self, filename: str = "history.json", batch_size: int = 1, fsync: bool = False,
+                        compact_every: int = 10_000) -> str:
+        """
+        Recover history from a snapshot and its write-ahead log, then log every change incrementally.
+
+        Each add, undo, or clear appends one small record to ``<filename>.wal``. The log is compacted
+        into the snapshot once it holds ``compact_every`` records and at least as many records as the
+        history has entries, so the cost of compaction stays constant per logged change. Compaction
+        runs on a background thread: the log is rotated to ``<filename>.wal.1`` and folded into the
+        snapshot from the files, so the add that triggers it does not wait for the snapshot.
+
+        Args:
+            filename (str): The snapshot file. Defaults to 'history.json'.
+            batch_size (int): Records buffered before each write to the log. Defaults to 1.
+            fsync (bool): Whether every log write is fsynced. Defaults to False.
+            compact_every (int): Minimum number of log records before compaction. Defaults to 10,000.
+
+        Returns:
+            str: Confirmation that autosave is enabled, or an error message if recovery fails.
+        """
+        self.disable_autosave()
+        if os.path.exists(filename):
+            message = self.load(filename)
+            if message.startswith("Error"):
+                return message
+        else:
+            self.clear()
+            self._log_generation = self._replay(filename)
+            self._reset_indexes()
+        try:
+            # Start from a clean snapshot and an empty log of the next generation
+            self._write_snapshot(filename, self._log_generation)
+            self._wal = wal.WriteAheadLog(wal.log_path(filename), batch_size=batch_size, fsync=fsync,
+                                          generation=self._log_generation)
+            self._truncate_logs(filename)
+        except IOError:
+            self._wal = None
+            return f"Error: Could not enable autosave to {filename}."
+        self._snapshot_path = filename
+        self._compact_every = compact_every
+        return f"Autosave enabled to {filename}."
+
+    @_synchronized
+    def disable_autosave(self) -> None:
+        """Flush and close the write-ahead log, if autosave is enabled, after any compaction in progress."""
+        self._finish_compaction()
+        if self._wal is not None:
+            self._wal.close()
+            self._wal = None
+            self._snapshot_path = None
+
+    @_synchronized
+    def flush(self) -> None:
+        """Write any buffered autosave records to the log."""
+        if self._wal is not None:
+            self._wal.flush()
+
+    def _maybe_compact(self) -> None:
+        """Start folding the write-ahead log into the snapshot once it has grown past the history size."""
+        if self._wal.records < max(self._compact_every, len(self._store)):
+            return
+        if self._compaction is not None and self._compaction.is_alive():
+            return  # The log keeps growing until the running compaction is done
+        rotated = wal.rotated_log_path(self._snapshot_path)
+        if not os.path.exists(rotated):  # Otherwise an earlier compaction failed: fold that log first
+            self._wal.rotate(rotated)
+        self._compaction = threading.Thread(target=_compact_log, args=(self._snapshot_path, rotated),
+                                            name="history-compaction")
+        self._compaction.start()
+
+    def _finish_compaction(self) -> None:
+        """Wait for a background compaction, so the snapshot and the logs can be used again."""
+        if self._compaction is not None:
+            self._compaction.join()
+            self._compaction = None
+
+    def _truncate_logs(self, filename: str) -> None:
+        """
+        Empty the write-ahead log and remove a rotated one, once the snapshot covers everything in them.
+
+        A crash before they are gone is harmless: the snapshot records their generations, so they
+        are not replayed on top of it.
+        """
+        self._wal.truncate()
+        rotated = wal.rotated_log_path(filename)
+        if os.path.exists(rotated):
+            os.remove(rotated)
+
+    def _write_snapshot(self, filename: str, log_generation: int) -> None:
+        """Atomically replace a snapshot file with the current history, which includes the logs up to a generation."""
+        if binary.is_binary_filename(filename):
+            binary.write(filename, self._store.records(), len(self._store), self._serialized_objects(), log_generation)
+            return
+        temporary = filename + ".tmp"
+        with open(temporary, "w") as file:
+            json.dump({"log_generation": log_generation, "history": [calc.to_dict() for calc in self.get_history()]},
+                      file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary, filename)
+
+    def _replay(self, filename: str, logs: Optional[List[str]] = None, log_generation: int = 0) -> int:
+        """
+        Apply the records of the write-ahead logs that belong to a snapshot (by default, those that exist).
+
+        Args:
+            filename (str): The snapshot file.
+            logs (Optional[List[str]]): The logs, in order. Defaults to the existing logs of the snapshot.
+            log_generation (int): The newest log generation the snapshot includes; such logs are skipped.
+
+        Returns:
+            int: The newest generation among the snapshot and the logs.
+        """
+        logs = wal.existing_logs(filename) if logs is None else logs
+        if not logs:
+            return log_generation
+        self._aggregates = None  # Log records are applied to the store directly
+        publisher, self._publisher = self._publisher, None
+        for path in logs:
+            for tag, *fields in wal.read_records(path):
+                if tag == wal.GENERATION:
+                    if fields[0] <= log_generation:
+                        break  # Folded into the snapshot before a crash kept the log from being removed
+                    log_generation = fields[0]
+                elif tag == wal.ADD:
+                    self._store.append(*fields)
+                elif tag == wal.OBJECT:
+                    self._objects[len(self._store)] = entry_from_dict(fields[0])
+                    self._store.append(OBJECT_CODE, 0.0, 0.0, 0.0)
+                elif tag == wal.UNDO and self._store:
+                    self._pop()
+                elif tag == wal.CLEAR:
+                    self._store.clear()
+                    self._objects.clear()
+        self._publisher = publisher
+        self._publish_snapshot()
+        return log_generation
+
+    @_observed("history.save")
+    @_synchronized
     def save(self, filename: str = "history.json") -> str:
         """
-        Save the current history to a JSON file.
+        Save the current history to a JSON file, to the binary format if the name ends in '.bin',
+        or to a compressed archive directory if it ends in '.archive'.
+
+        Archives are append-only: saving appends the entries the archive does not hold yet (those
+        added since the history was loaded from or last saved to it). Entries undone or cleared
+        since then are truncated from the archive first, and a history that came from elsewhere
+        replaces the archive's entries. Full segments are compressed on a background thread; see
+        app.history.archive.
 
         Args:
             filename (str): The filename to save the history. Defaults to 'history.json'.
@@ -51,15 +561,105 @@ class History:
             str: Confirmation message that the history has been saved.
         """
         try:
-            with open(filename, "w") as file:
-                json.dump([calc.__dict__ for calc in self._history], file)
+            snapshot = self._wal is not None and filename == self._snapshot_path
+            if snapshot:
+                self._finish_compaction()  # It would replace the snapshot with an older one
+            if snapshot:
+                self._write_snapshot(filename, self._wal.generation)
+            elif binary.is_binary_filename(filename):
+                self._write_binary(filename)
+            elif archive.is_archive_filename(filename):
+                self._write_archive(filename)
+            else:
+                with open(filename, "w") as file:
+                    json.dump([calc.to_dict() for calc in self.get_history()], file)
+            if snapshot:
+                self._truncate_logs(filename)  # The snapshot now covers everything in the logs
             return f"History saved to {filename}."
         except IOError:
             return f"Error: Could not save history to {filename}."
 
+    def _write_binary(self, filename: str) -> None:
+        """Write the history in the fixed-width binary format."""
+        binary.write(filename, self._store.records(), len(self._store), self._serialized_objects())
+
+    def _write_archive(self, filename: str) -> None:
+        """Append the entries an archive does not hold yet (truncating any it no longer has), and flush it."""
+        store = self._store
+        if (isinstance(store, archive.ArchiveStore) and os.path.isdir(filename)
+                and os.path.samefile(store.archive.directory, filename)):
+            store.save(self._serialized_objects())
+            return
+        path = os.path.realpath(filename)
+        target = archive.HistoryArchive(filename)
+        # What the archive already holds of this history: a prefix if this spilled history was saved to it, else nothing
+        keep = self._archived[1] if self._archived is not None and self._archived[0] == path else 0
+        try:
+            if keep > len(target):
+                keep = 0  # Changed by someone else since; rewrite it
+            if keep < len(target):
+                target.truncate(keep)
+            objects = self._serialized_objects()
+            target.extend(store.records(keep) if keep else store.records(),
+                          {position - keep: entry for position, entry in objects.items() if position >= keep})
+            target.flush()
+        except BaseException:
+            target.close()
+            raise
+        if isinstance(store, SpillStore):
+            target.close()
+            self._archived = (path, len(store))
+        else:  # Read the entries back from the archive from now on, so later saves only append new ones
+            self._store = archive.ArchiveStore(target)
+            _close_store(store)
+
+    def _serialized_objects(self) -> Dict[int, dict]:
+        """Return every object entry, spilled or in memory, serialized and keyed by position."""
+        objects = dict(self._store.spilled_objects()) if isinstance(self._store, SpillStore) else {}
+        objects.update((position, entry.to_dict()) for position, entry in self._objects.items())
+        return objects
+
+    @_synchronized
+    def to_bytes(self) -> bytes:
+        """
+        Return the history in the binary format, as bytes rather than a file (see from_bytes).
+
+        Returns:
+            bytes: The binary history; add times and indexes are not included.
+        """
+        return binary.dumps(self._store.records(), len(self._store), self._serialized_objects())
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "History":
+        """
+        Create a history from the output of to_bytes, decoding its records only when they are read.
+
+        Args:
+            data (bytes): A binary history.
+
+        Returns:
+            History: A new history holding the entries.
+
+        Raises:
+            ValueError: If the data is not a binary history.
+        """
+        history = cls()
+        history._store, objects = binary.loads(data)
+        history._objects.update((position, entry_from_dict(entry)) for position, entry in objects.items())
+        history._reset_indexes()
+        return history
+
+    @_observed("history.load")
+    @_synchronized
     def load(self, filename: str = "history.json") -> str:
         """
-        Load calculation history from a JSON file.
+        Load calculation history from a JSON file, a binary ('.bin') file, or an '.archive' directory.
+
+        Binary files are memory-mapped (or, with a memory cap, read in place) and their records are
+        only decoded when read, so loading takes constant time regardless of file size. Archives are
+        read lazily too, one compressed block at a time. If a write-ahead log (``<filename>.wal``)
+        exists next to the file, its records are replayed on top, after those of a log rotated for
+        a compaction that did not finish (``<filename>.wal.1``).
 
         Args:
             filename (str): The filename to load history from. Defaults to 'history.json'.
@@ -68,23 +668,299 @@ class History:
             str: Confirmation that history has been loaded, or an error message if file issues occur.
         """
         try:
-            with open(filename, "r") as file:
-                data = json.load(file)
-                self._history = [Calculation(**entry) for entry in data]
+            self._finish_compaction()
+            self._read(filename, wal.existing_logs(filename))
+            if self._wal is not None:
+                self._write_snapshot(self._snapshot_path, self._wal.generation)
+                self._truncate_logs(self._snapshot_path)
             return f"History loaded from {filename}."
         except FileNotFoundError:
             return f"Error: {filename} not found."
-        except json.JSONDecodeError:
+        except (json.JSONDecodeError, ValueError):
             return f"Error: Failed to decode history data from {filename}."
         except TypeError:
             return "Error: Loaded data format is incorrect."
 
-    def get_history(self) -> List[Calculation]:
+    def _read(self, filename: str, logs: List[str]) -> None:
+        """
+        Replace the history with the entries of a file, then apply the records of write-ahead logs
+        (those not included in the file already, when it is an autosave snapshot).
+        """
+        log_generation = 0
+        if binary.is_binary_filename(filename) or archive.is_archive_filename(filename):
+            if binary.is_binary_filename(filename):
+                log_generation = binary.read_log_generation(filename)
+            opened = binary.open_mapped if binary.is_binary_filename(filename) else archive.open_archive
+            store, objects = opened(filename)
+            objects = {position: entry_from_dict(entry) for position, entry in objects.items()}
+        else:
+            with open(filename, "r") as file:
+                data = json.load(file)
+                if isinstance(data, dict):  # An autosave snapshot
+                    log_generation, data = data.get("log_generation", 0), data.get("history")
+                entries = [entry_from_dict(entry) for entry in data]
+        wal_enabled, self._wal = self._wal, None  # Loading replaces history; it is not logged
+        publisher, self._publisher = self._publisher, None  # Nor published entry by entry
+        try:
+            self.clear()
+            if binary.is_binary_filename(filename) or archive.is_archive_filename(filename):
+                self._objects.update(objects)  # First, so entries spilled while appending keep theirs
+                if isinstance(self._store, SpillStore) and isinstance(store, archive.ArchiveStore):
+                    for record in store.records():
+                        self._store.append(*record)
+                    store.close()
+                    self._archived = (os.path.realpath(filename), len(self._store))
+                elif isinstance(self._store, SpillStore):
+                    self._store.attach(filename, len(store))
+                else:
+                    store, self._store = self._store, store
+                    _close_store(store)
+            else:
+                for entry in entries:
+                    self._add_now(entry)
+            self._log_generation = self._replay(filename, logs, log_generation)
+            self._reset_indexes()
+        finally:
+            self._wal = wal_enabled
+            self._publisher = publisher
+            self._publish_snapshot()
+
+    def get_history(self) -> HistoryView:
         """
         Retrieve the complete calculation history.
 
         Returns:
-            List[Calculation]: A list containing all Calculation instances in the history.
+            HistoryView: A live sequence of the Calculation instances in the history.
+        """
+        return HistoryView(self)
+
+    def iter_history(self, start: int = 0, stop: Optional[int] = None, reverse: bool = False) -> Iterator[str]:
+        """
+        Lazily yield history entries as formatted lines.
+
+        Each entry is materialized and formatted only when the iterator reaches it, so the first
+        lines of even a very large history are available in constant time.
+
+        Args:
+            start (int): The first position; negative values count from the end. Defaults to 0.
+            stop (Optional[int]): The position after the last one. Defaults to the end of the history.
+            reverse (bool): Whether to yield the range newest first. Defaults to False.
+
+        Yields:
+            str: Each entry as formatted by str().
+        """
+        positions = range(*slice(start, stop).indices(len(self)))
+        entry = self.entry
+        for position in reversed(positions) if reverse else positions:
+            yield str(entry(position))
+
+    @_synchronized
+    def query(self, operation: Union[Operation, str, None] = None, min_result: Optional[float] = None,
+              max_result: Optional[float] = None, min_operand: Optional[float] = None,
+              max_operand: Optional[float] = None, since: Optional[float] = None, until: Optional[float] = None,
+              offset: int = 0, limit: Optional[int] = None, newest_first: bool = False) -> List:
+        """
+        Return the entries that match every given filter, oldest first.
+
+        Candidates come from the narrowest available index (the result index for a result range, the
+        operation's position list, or the time column), so a query touches the matching entries rather
+        than the whole history. Batch, sweep, and expression entries have no single operation, operands,
+        or result; they only match queries without those filters. Entries restored from a file have no
+        add time and never match a time filter.
+
+        Args:
+            operation (Union[Operation, str, None]): An operation, or its class name (e.g. 'Division').
+            min_result (Optional[float]): Smallest result to include.
+            max_result (Optional[float]): Largest result to include.
+            min_operand (Optional[float]): Smallest value both operands must have.
+            max_operand (Optional[float]): Largest value both operands may have.
+            since (Optional[float]): Earliest add time to include, in seconds since the epoch.
+            until (Optional[float]): Latest add time to include, in seconds since the epoch.
+            offset (int): Number of matching entries to skip. Defaults to 0.
+            limit (Optional[int]): Maximum number of entries to return. Defaults to all.
+            newest_first (bool): Whether to return the newest matches first. Defaults to False.
+
+        Returns:
+            List: The matching entries.
+
+        Raises:
+            TypeError: If the operation is unknown.
+        """
+        code = None
+        if operation is not None:
+            code = code_for_operation(operation)
+            if code == OBJECT_CODE:
+                raise TypeError("Unknown operation in history query.")
+        if self._indexes is None:
+            self._build_indexes()
+
+        # Time filter: checkpoint times are non-decreasing, so it maps to a range of positions
+        start, stop = 0, len(self._store)
+        if since is not None or until is not None:
+            checkpoints, times = self._checkpoints()
+            start = self._checkpoint_position(checkpoints, 0 if since is None else bisect_left(times, since))
+            if until is not None:
+                stop = self._checkpoint_position(checkpoints, bisect_right(times, until))
+
+        # Entries before indexes.start were spilled to disk and are scanned rather than indexed
+        indexed = max(start, min(stop, self._indexes.start))
+        by_result = min_result is not None or max_result is not None
+        if by_result:
+            low = float("-inf") if min_result is None else min_result
+            high = float("inf") if max_result is None else max_result
+            positions = self._scan(start, indexed, lambda code_word, value: code_word & HAS_RESULT
+                                   and low <= value <= high)
+            positions.extend(sorted(position for position in self._indexes.by_result.positions_between(low, high)
+                                    if indexed <= position < stop))
+        elif code is not None:
+            positions = self._scan(start, indexed, lambda code_word, _: code_word & CODE_MASK == code)
+            indexed_positions = self._indexes.by_code.get(code, array("q"))
+            positions.extend(indexed_positions[bisect_left(indexed_positions, indexed):
+                                               bisect_left(indexed_positions, stop)])
+        else:
+            positions = range(start, stop)
+        if newest_first:
+            positions = reversed(positions)
+
+        if code is not None or by_result or min_operand is not None or max_operand is not None:
+            low = float("-inf") if min_operand is None else min_operand
+            high = float("inf") if max_operand is None else max_operand
+            record = self._store.record
+            positions = (position for position in positions
+                         for entry_code, operand1, operand2, _ in (record(position),)
+                         if entry_code != OBJECT_CODE and (code is None or entry_code & CODE_MASK == code)
+                         and low <= operand1 <= high and low <= operand2 <= high)
+        stop = None if limit is None else offset + limit
+        return [self.entry(position) for position in islice(positions, offset, stop)]
+
+    def _checkpoints(self):
+        """Return the positions and times of all time checkpoints, including those spilled to disk."""
+        if not isinstance(self._store, SpillStore):
+            return self._time_positions, self._times
+        positions, times = self._store.checkpoints()
+        return positions + self._time_positions, times + self._times
+
+    def _checkpoint_position(self, checkpoints: array, checkpoint: int) -> int:
+        """Return the first position covered by a time checkpoint, or the history length past the last one."""
+        if checkpoint < len(checkpoints):
+            return checkpoints[checkpoint]
+        return len(self._store)
+
+    def _scan(self, start: int, stop: int, keep: Callable[[int, float], bool]) -> array:
+        """Return the positions in [start, stop) whose code word and result pass a test, reading their records."""
+        positions = array("q")
+        if start < stop:  # Only spilled positions are scanned, so the store is a SpillStore
+            for position, (code, _, _, result) in enumerate(islice(self._store.records(start), stop - start), start):
+                if keep(code, result):
+                    positions.append(position)
+        return positions
+
+    @_synchronized
+    def summary(self, last: int = 5) -> dict:
+        """
+        Return running aggregates of the history, in constant time whatever its size.
+
+        The aggregates are built by the first call, in one pass over the entries (and again after a
+        load or clear), then updated on every add and undo rather than computed here.
+
+        Args:
+            last (int): The number of newest entries to include. Defaults to 5.
+
+        Returns:
+            dict: 'entries' (the number of entries), 'results' (how many have a numeric result),
+            'by_operation' (entries per operation, expression, reduction, 'batch', or 'sweep'), the 'sum',
+            'mean', 'min', and 'max' of the results (None for the last three without results), and
+            'last' (the newest entries, oldest first).
         """
-        return self._history
+        if self._aggregates is None:
+            self._aggregates = HistoryAggregates.build(self._store.records(), self.entry)
+        aggregates = self._aggregates
+        by_operation = {}
+        for key, count in aggregates.counts.items():
+            label = key if isinstance(key, str) else operation_for_code(key).__class__.__name__.lower()
+            by_operation[label] = by_operation.get(label, 0) + count
+        count = len(self._store)
+        return {
+            "entries": count, "results": aggregates.results, "by_operation": by_operation,
+            "sum": aggregates.total(), "mean": aggregates.mean(),
+            "min": aggregates.minimum, "max": aggregates.maximum,
+            "last": [self.entry(position) for position in range(max(0, count - last), count)],
+        }
 
+    def _result_at(self, position: int):
+        """Return the result of the entry at a position."""
+        record = self._store.record(position)
+        return self.entry(position).result if record[0] == OBJECT_CODE else record[3]
+
+    def _build_indexes(self) -> None:
+        """Index every entry in memory in one pass; from then on the indexes are updated on each add and undo."""
+        if isinstance(self._store, SpillStore):
+            self._indexes = HistoryIndexes.build(self._store.records(self._store.spilled), self._store.spilled)
+        else:
+            self._indexes = HistoryIndexes.build(self._store.records())
+
+def _compact_log(snapshot_path: str, log: str) -> None:
+    """
+    Fold a rotated write-ahead log into its snapshot, then remove the log (the compaction thread).
+
+    Works from the files alone, so the live history keeps changing meanwhile: its new records go
+    to the log that replaced the rotated one.
+
+    Args:
+        snapshot_path (str): The snapshot file.
+        log (str): The rotated log, whose records follow the snapshot.
+    """
+    history = History()
+    history._read(snapshot_path, [log])  # pylint: disable=protected-access
+    # Records the rotated log's generation, so the log is skipped if it outlives the new snapshot
+    history._write_snapshot(snapshot_path, history._log_generation)  # pylint: disable=protected-access
+    _close_store(history._store)  # pylint: disable=protected-access
+    os.remove(log)
+
+def entry_from_dict(entry: dict):
+    """
+    Rebuild a history entry from its saved dictionary form.
+
+    Args:
+        entry (dict): A dictionary produced by ``to_dict`` on a history entry.
+
+    Returns:
+        Calculation, BatchCalculation, ExpressionCalculation, ReductionCalculation, or SweepCalculation:
+        The rebuilt entry.
+
+    Raises:
+        TypeError: If the entry is malformed or names an unknown operation.
+    """
+    entry = dict(entry)
+    if "expression" in entry:
+        calculation = ExpressionCalculation(entry["expression"], entry.get("bindings"))
+        calculation.result = entry.get("result")
+        return calculation
+    if "reduction" in entry:
+        try:
+            calculation = ReductionCalculation(entry["reduction"])
+        except ValueError:
+            raise TypeError("Unknown reduction in history entry.") from None
+        calculation.count, calculation.result = entry.get("count", 0), entry.get("result")
+        return calculation
+    name = entry.pop("operation", None)
+    code = code_for_operation(name)
+    if code != OBJECT_CODE:
+        operation = operation_for_code(code)
+    else:
+        operation = OPERATIONS.find(name) if isinstance(name, str) else None  # A registered plugin
+        if operation is None:
+            raise TypeError("Unknown operation in history entry.")
+    if "sweep" in entry:
+        range1, range2 = entry["sweep"]
+        return SweepCalculation(operation, range1, range2, **entry.get("options", {}))
+    if "operands1" in entry:
+        results = entry.pop("results", None)
+        batch = BatchCalculation(operation, entry.pop("operands1"), entry.pop("operands2"),
+                                 **entry.pop("options", {}))
+        batch.results = results
+        return batch
+    result = entry.pop("result", None)
+    calculation = Calculation(operation, **entry)
+    calculation.result = result
+    return calculation
@@ -0,0 +1,194 @@
+# app/history/aggregates.py
+
+import math
+from array import array
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+from app.history.columns import CODE_MASK, HAS_RESULT, OBJECT_CODE
+
+Number = Union[int, float]
+
+def _push(runs: array, position: int) -> None:
+    """Push a position onto a stack of runs of consecutive positions, stored as (start, stop) pairs."""
+    if runs and runs[-1] == position:
+        runs[-1] = position + 1
+    else:
+        runs.append(position)
+        runs.append(position + 1)
+
+def _pop(runs: array, position: int) -> bool:
+    """Pop a position if it is on top of a stack of runs, and return whether it was."""
+    if not runs or runs[-1] != position + 1:
+        return False
+    runs[-1] = position
+    if runs[-1] == runs[-2]:
+        del runs[-2:]
+    return True
+
+class HistoryAggregates:
+    """Running aggregates over the entries of a history: counts per operation, and the exact sum, mean,
+    minimum, and maximum of the results.
+
+    Each add and undo updates them in constant time, and reading them costs constant time whatever
+    the history size. The sum of the finite results is kept exactly, as an integer over a power of
+    two that grows to the finest result seen, so an undo subtracts exactly what the add added and
+    the reported sum is correctly rounded; infinite and NaN results are counted apart.
+
+    The minimum and maximum survive undo through monotonic stacks of the positions where the running
+    extreme was exceeded: undoing the newest entry pops it if it is on top, and the previous extreme
+    is read back from the history. A result that only ties the extreme is not pushed, since undoing
+    it leaves the extreme as it was. The stacks hold runs of consecutive positions, so monotonic
+    results take one run rather than an entry each. NaN results are left out of both.
+    """
+
+    __slots__ = ("counts", "results", "minimum", "maximum", "_scaled_sum", "_scale", "_positive_infinities",
+                 "_negative_infinities", "_nans", "_minima", "_maxima", "_objects")
+
+    def __init__(self):
+        """Initialize empty aggregates."""
+        self.counts: Dict[Union[int, str], int] = {}  # Entries by operation code, or by label for object entries
+        self.results = 0
+        self.minimum: Optional[Number] = None
+        self.maximum: Optional[Number] = None
+        self._scaled_sum = 0  # The sum of the finite results times 2 ** _scale
+        self._scale = 0
+        self._positive_infinities = self._negative_infinities = self._nans = 0
+        self._minima = array("q")  # Monotonic stacks of (start, stop) runs of positions
+        self._maxima = array("q")
+        # (label, result) of each object entry, newest last, to reverse its undo; created by the first one
+        self._objects: Optional[List[Tuple[str, Optional[Number]]]] = None
+
+    @classmethod
+    def build(cls, records: Iterable[tuple], entry_at: Callable[[int], object]) -> "HistoryAggregates":
+        """
+        Aggregate existing history records in one pass.
+
+        Args:
+            records (Iterable[tuple]): The (code, operand1, operand2, result) records, in position order.
+            entry_at (Callable[[int], object]): Returns the entry at a position, for object entries.
+
+        Returns:
+            HistoryAggregates: The aggregates.
+        """
+        aggregates = cls()
+        for position, (code, _, _, result) in enumerate(records):
+            if code == OBJECT_CODE:
+                aggregates.add_object(position, entry_at(position))
+            else:
+                aggregates.add(position, code, result)
+        return aggregates
+
+    def add(self, position: int, code: int, result: float) -> None:
+        """Account for a column entry appended at a position."""
+        operation = code & CODE_MASK
+        self.counts[operation] = self.counts.get(operation, 0) + 1
+        if code & HAS_RESULT:
+            self._add_result(position, result)
+
+    def add_object(self, position: int, entry) -> None:
+        """Account for an object entry (e.g. an expression or a batch) appended at a position."""
+        label, result = object_label(entry), getattr(entry, "result", None)
+        if isinstance(result, bool) or not isinstance(result, (int, float)):
+            result = None  # A batch's result column, or not calculated
+        if self._objects is None:
+            self._objects = []
+        self._objects.append((label, result))
+        self.counts[label] = self.counts.get(label, 0) + 1
+        if result is not None:
+            self._add_result(position, result)
+
+    def remove_last(self, position: int, code: int, result: float, result_at: Callable[[int], Number]) -> None:
+        """
+        Account for the undo of the newest entry.
+
+        Args:
+            position (int): The position of the entry.
+            code (int): The code word of its record.
+            result (float): The result of its record.
+            result_at (Callable[[int], Number]): Returns the result at an earlier position, to read back
+                the previous minimum or maximum.
+        """
+        if code == OBJECT_CODE:
+            key, result = self._objects.pop()
+        else:
+            key = code & CODE_MASK
+            if not code & HAS_RESULT:
+                result = None
+        self.counts[key] -= 1
+        if not self.counts[key]:
+            del self.counts[key]
+        if result is not None:
+            self._remove_result(position, result, result_at)
+
+    def _add_result(self, position: int, result: Number) -> None:
+        """Add a result to the sum and the running extremes."""
+        self.results += 1
+        if result - result == 0:  # Finite; scaled exactly, with the scale raised to the result's if finer
+            numerator, denominator = result.as_integer_ratio()  # The denominator is a power of two
+            scale = denominator.bit_length() - 1
+            if scale > self._scale:
+                self._scaled_sum <<= scale - self._scale
+                self._scale = scale
+            self._scaled_sum += numerator << (self._scale - scale)
+        elif result != result:
+            self._nans += 1
+            return
+        elif result > 0:
+            self._positive_infinities += 1
+        else:
+            self._negative_infinities += 1
+        if self.minimum is None or result < self.minimum:
+            self.minimum = result
+            _push(self._minima, position)
+        if self.maximum is None or result > self.maximum:
+            self.maximum = result
+            _push(self._maxima, position)
+
+    def _remove_result(self, position: int, result: Number, result_at: Callable[[int], Number]) -> None:
+        """Remove the newest result from the sum and the running extremes."""
+        self.results -= 1
+        if result - result == 0:
+            numerator, denominator = result.as_integer_ratio()
+            self._scaled_sum -= numerator << (self._scale - denominator.bit_length() + 1)
+        elif result != result:
+            self._nans -= 1
+            return
+        elif result > 0:
+            self._positive_infinities -= 1
+        else:
+            self._negative_infinities -= 1
+        if _pop(self._minima, position):
+            self.minimum = result_at(self._minima[-1] - 1) if self._minima else None
+        if _pop(self._maxima, position):
+            self.maximum = result_at(self._maxima[-1] - 1) if self._maxima else None
+
+    def total(self) -> float:
+        """Return the sum of the results, correctly rounded (0.0 for none)."""
+        if self._nans or (self._positive_infinities and self._negative_infinities):
+            return math.nan
+        if self._positive_infinities or self._negative_infinities:
+            return math.inf if self._positive_infinities else -math.inf
+        try:
+            return self._scaled_sum / (1 << self._scale)  # True division of ints rounds correctly
+        except OverflowError:
+            return math.inf if self._scaled_sum > 0 else -math.inf
+
+    def mean(self) -> Optional[float]:
+        """Return the mean of the results, or None if there are none."""
+        if not self.results:
+            return None
+        total = self.total()
+        if not math.isfinite(total):
+            return total
+        return self._scaled_sum / (self.results << self._scale)  # No larger than the total, so it cannot overflow
+
+def object_label(entry) -> str:
+    """Return how an object entry is counted: its operation, 'batch', 'sweep', 'expression', or its reduction."""
+    if hasattr(entry, "reduction"):
+        return entry.reduction
+    if hasattr(entry, "expression"):
+        return "expression"
+    if hasattr(entry, "results"):
+        return "batch"
+    if hasattr(entry, "range1"):
+        return "sweep"
+    return entry.operation.__class__.__name__.lower()
@@ -0,0 +1,566 @@
+# app/history/archive.py
+
+import json
+import lzma
+import os
+import struct
+import sys
+import threading
+import zlib
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from app.history import binary
+from app.history.columns import OBJECT_CODE, ColumnStore, Record
+
+# Directory names that select the archive format in History.save and History.load.
+ARCHIVE_EXTENSION = ".archive"
+# Entries in the active segment before it is sealed and compressed (8 MiB of raw records).
+SEGMENT_ENTRIES = 1 << 18
+# Entries per independently compressed block: the unit of decompression for a random read.
+BLOCK_ENTRIES = 1024
+# Decoded blocks kept per archive for repeated and sequential reads.
+CACHED_BLOCKS = 16
+
+MAGIC = b"CALCARCH"
+VERSION = 1
+# magic, version, codec, block entries, entries, blocks, index offset, objects offset
+HEADER = struct.Struct("<8sHBxIQQQQ")
+BLOCK_HEADER = struct.Struct("<IH")  # entries, palette size (0: codes stored as raw 16-bit words)
+ACTIVE_FILE = "active.bin"
+
+# Codec name -> (id stored in the header, compress, decompress).
+CODECS = {
+    "zlib": (1, lambda data: zlib.compress(data, 6), zlib.decompress),
+    "lzma": (2, lambda data: lzma.compress(data, preset=6), lzma.decompress),
+}
+_CODEC_NAMES = {codec_id: name for name, (codec_id, _, _) in CODECS.items()}
+_LITTLE_ENDIAN = sys.byteorder == "little"
+
+def is_archive_filename(filename: str) -> bool:
+    """Return True if a history filename selects the archive format."""
+    return filename.rstrip("/\\").endswith(ARCHIVE_EXTENSION)
+
+def _little_endian(values: array) -> bytes:
+    """Return the bytes of an array in little-endian order."""
+    if _LITTLE_ENDIAN:
+        return values.tobytes()
+    swapped = array(values.typecode, values)
+    swapped.byteswap()
+    return swapped.tobytes()
+
+def _native(typecode: str, data: bytes) -> array:
+    """Return an array of a type from little-endian bytes."""
+    values = array(typecode, data)
+    if not _LITTLE_ENDIAN:
+        values.byteswap()
+    return values
+
+def encode_block(codes: array, columns: Tuple[array, array, array]) -> bytes:
+    """
+    Encode a block of records for compression.
+
+    Code words are dictionary encoded (one byte per entry when a block uses at most 256 distinct
+    words, which is almost always). Each float64 column is delta encoded by XOR-ing the bits of
+    consecutive values, which turns repeated and slowly changing values into runs of zero bits,
+    then byte-shuffled (all first bytes, then all second bytes, ...) so those runs are contiguous.
+    The XORs are done on the whole column as one integer, so neither direction loops per value.
+
+    Args:
+        codes (array): The 'H' code words.
+        columns (Tuple[array, array, array]): The 'd' operand1, operand2, and result columns.
+
+    Returns:
+        bytes: The encoded block.
+    """
+    palette = sorted(set(codes))
+    if len(palette) <= 256:
+        lookup = {code: index for index, code in enumerate(palette)}
+        parts = [BLOCK_HEADER.pack(len(codes), len(palette)), _little_endian(array("H", palette)),
+                 bytes(map(lookup.__getitem__, codes))]
+    else:
+        parts = [BLOCK_HEADER.pack(len(codes), 0), _little_endian(codes)]
+    size = 8 * len(codes)
+    for column in columns:
+        bits = int.from_bytes(_little_endian(column), "little")  # Value k in bits 64k to 64k + 63
+        raw = (bits ^ (bits << 64)).to_bytes(size + 8, "little")[:size]
+        parts.extend(raw[byte::8] for byte in range(8))
+    return b"".join(parts)
+
+def decode_block(data: bytes) -> Tuple[array, array, array, array]:
+    """
+    Decode a block produced by encode_block.
+
+    Returns:
+        Tuple[array, array, array, array]: The code, operand1, operand2, and result columns.
+    """
+    count, palette_size = BLOCK_HEADER.unpack_from(data)
+    offset = BLOCK_HEADER.size
+    if palette_size:
+        palette = data[offset:offset + 2 * palette_size]
+        offset += 2 * palette_size
+        indexes, words = data[offset:offset + count], bytearray(2 * count)
+        # Translate each index to the low and the high byte of its little-endian word
+        words[0::2] = indexes.translate(palette[0::2].ljust(256, b"\0"))
+        words[1::2] = indexes.translate(palette[1::2].ljust(256, b"\0"))
+        codes = _native("H", words)
+        offset += count
+    else:
+        codes = _native("H", data[offset:offset + 2 * count])
+        offset += 2 * count
+    columns, mask = [], (1 << 64 * count) - 1
+    for _ in range(3):
+        raw = bytearray(8 * count)
+        for byte in range(8):
+            raw[byte::8] = data[offset:offset + count]
+            offset += count
+        # Undo the delta with a prefix XOR over the whole column, doubling the span each step
+        bits, shift = int.from_bytes(raw, "little"), 64
+        while shift < 64 * count:
+            bits ^= (bits << shift) & mask
+            shift *= 2
+        columns.append(_native("d", bits.to_bytes(8 * count, "little")))
+    return (codes, *columns)
+
+class Segment:
+    """A sealed run of archived records: in memory while it is being compressed, then in a file."""
+
+    __slots__ = ("path", "start", "count", "columns", "objects", "descriptor", "index", "header")
+
+    def __init__(self, path: str, start: int, count: int, columns: Optional[ColumnStore] = None,
+                 objects: Optional[Dict[int, dict]] = None):
+        """
+        Initialize a segment.
+
+        Args:
+            path (str): The segment file.
+            start (int): The archive position of the first record.
+            count (int): The number of records.
+            columns (Optional[ColumnStore]): The records, until the file is written.
+            objects (Optional[Dict[int, dict]]): Serialized object entries keyed by offset, if known.
+        """
+        self.path = path
+        self.start = start
+        self.count = count
+        self.columns = columns
+        self.objects = objects
+        self.descriptor: Optional[int] = None
+        self.index: Optional[array] = None  # Block offsets, read with the header
+        self.header: Optional[tuple] = None
+
+def write_segment(path: str, columns: ColumnStore, objects: Dict[int, dict], codec: str,
+                  block_entries: int = BLOCK_ENTRIES) -> int:
+    """
+    Encode, compress, and atomically write a segment file.
+
+    Args:
+        path (str): The destination file.
+        columns (ColumnStore): The records.
+        objects (Dict[int, dict]): Serialized object entries keyed by offset in the segment.
+        codec (str): 'zlib' or 'lzma'.
+        block_entries (int): Entries per block. Defaults to BLOCK_ENTRIES.
+
+    Returns:
+        int: The size of the file in bytes.
+    """
+    codec_id, compress, _ = CODECS[codec]
+    count = len(columns)
+    blocks, offsets = [], array("Q", [HEADER.size])
+    for first in range(0, count, block_entries):
+        last = min(first + block_entries, count)
+        block = compress(encode_block(columns.codes[first:last], (columns.operands1[first:last],
+                                      columns.operands2[first:last], columns.results[first:last])))
+        blocks.append(block)
+        offsets.append(offsets[-1] + len(block))
+    index_offset = offsets[-1]
+    objects_offset = index_offset + 8 * len(offsets) if objects else 0
+    temporary = path + ".tmp"
+    with open(temporary, "wb") as file:
+        file.write(HEADER.pack(MAGIC, VERSION, codec_id, block_entries, count, len(blocks), index_offset,
+                               objects_offset))
+        file.writelines(blocks)
+        file.write(_little_endian(offsets))
+        if objects:
+            file.write(compress(json.dumps({str(offset): entry for offset, entry in objects.items()}).encode()))
+        size = file.tell()
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary, path)
+    return size
+
+class HistoryArchive:
+    """An append-only, compressed history archive stored as a directory of segments.
+
+    Records are appended to an active segment. Once it holds ``segment_entries`` records it is
+    sealed: encoded (see encode_block), compressed with zlib or lzma, and written on a background
+    thread while appends continue. Sealed segments are read while they are being compressed from
+    memory, and afterwards from their files. Each segment file is a series of independently
+    compressed blocks with an index of their offsets, so reading a record by position decompresses
+    one block rather than the archive. The active segment is written uncompressed (in the binary
+    history format) by flush, and picked up again when the archive is reopened. Only one archive
+    object should write to a directory at a time.
+    """
+
+    def __init__(self, directory: str, segment_entries: int = SEGMENT_ENTRIES, codec: str = "zlib"):
+        """
+        Open an archive, creating the directory if needed.
+
+        Args:
+            directory (str): The archive directory.
+            segment_entries (int): Records per sealed segment. Defaults to SEGMENT_ENTRIES.
+            codec (str): 'zlib' (faster) or 'lzma' (smaller) for new segments. Defaults to 'zlib'.
+
+        Raises:
+            ValueError: If the codec is unknown, or a segment file is not an archive segment.
+        """
+        if codec not in CODECS:
+            raise ValueError(f"Unknown codec '{codec}'. Expected one of {', '.join(CODECS)}.")
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.segment_entries = segment_entries
+        self.codec = codec
+        self._segments: List[Segment] = []
+        self._starts: List[int] = []
+        self._sealed = 0                                     # Records in sealed segments
+        self._active = ColumnStore()
+        self._active_objects: Dict[int, dict] = {}           # Keyed by offset in the active segment
+        self._blocks: "OrderedDict[Tuple[int, int], tuple]" = OrderedDict()  # Decoded block cache
+        self._lock = threading.Lock()                        # Guards descriptors shared with readers
+        self._executor: Optional[ThreadPoolExecutor] = None  # Started by the first seal
+        self._pending: List[Future] = []
+        for name in sorted(os.listdir(directory)):
+            if name.startswith("segment-") and not name.endswith(".tmp"):
+                segment = Segment(os.path.join(directory, name), self._sealed, 0)
+                segment.count = self._header(segment)[4]
+                self._add_segment(segment)
+        active = os.path.join(directory, ACTIVE_FILE)
+        if os.path.exists(active):
+            store, objects = binary.open_mapped(active)
+            for record in store.records():
+                self._active.append(*record)
+            self._active_objects.update(objects)
+            del store
+
+    def __len__(self) -> int:
+        """Return the number of archived records."""
+        return self._sealed + len(self._active)
+
+    def __enter__(self) -> "HistoryArchive":
+        """Return the archive."""
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        """Close the archive."""
+        self.close()
+
+    def append(self, record: Record, entry: Optional[dict] = None) -> None:
+        """
+        Append one record, sealing the active segment when it is full.
+
+        Args:
+            record (Record): The (code, operand1, operand2, result) record.
+            entry (Optional[dict]): The serialized entry of an OBJECT_CODE record.
+        """
+        if record[0] == OBJECT_CODE:
+            self._active_objects[len(self._active)] = entry
+        self._active.append(*record)
+        if len(self._active) >= self.segment_entries:
+            self._seal()
+
+    def extend(self, records: Iterable[Record], objects: Dict[int, dict]) -> None:
+        """
+        Append records in bulk.
+
+        Args:
+            records (Iterable[Record]): The records.
+            objects (Dict[int, dict]): Serialized object entries, keyed by position within ``records``.
+        """
+        for position, record in enumerate(records):
+            self.append(record, objects.get(position) if record[0] == OBJECT_CODE else None)
+
+    def truncate(self, length: int) -> None:
+        """
+        Remove the records from a position on, e.g. those undone or cleared since the last save.
+
+        Sealed segments after the position are deleted, and the records kept from the segment it
+        falls in become the active segment again, so only that segment is rewritten.
+
+        Args:
+            length (int): The number of records to keep.
+
+        Raises:
+            ValueError: If the length is negative or beyond the end of the archive.
+        """
+        if not 0 <= length <= len(self):
+            raise ValueError(f"Cannot truncate an archive of {len(self)} records to {length}.")
+        if length >= self._sealed:
+            keep = length - self._sealed
+            while len(self._active) > keep:
+                self._active.pop()
+            self._active_objects = {offset: entry for offset, entry in self._active_objects.items() if offset < keep}
+            return
+        for future in self._pending:
+            future.result()
+        self._pending.clear()
+        first = bisect_right(self._starts, length) - 1
+        segment = self._segments[first]
+        keep = length - segment.start
+        active = ColumnStore()
+        for record in islice(self.records(segment.start), keep):
+            active.append(*record)
+        objects = {offset: entry for offset, entry in self._segment_objects(segment).items() if offset < keep}
+        with self._lock:
+            for dropped in self._segments[first:]:
+                if dropped.descriptor is not None:
+                    os.close(dropped.descriptor)
+                    dropped.descriptor = None
+                os.remove(dropped.path)
+        del self._segments[first:], self._starts[first:]
+        self._sealed = segment.start
+        self._active, self._active_objects = active, objects
+        self._blocks.clear()
+
+    def seal(self) -> None:
+        """Seal the active segment now, before it is full, e.g. to rotate an archive daily."""
+        if self._active:
+            self._seal()
+
+    def _seal(self) -> None:
+        """Hand the active segment to a background thread for compression and start a new one."""
+        sequence = len(self._segments) + 1
+        path = os.path.join(self.directory, f"segment-{sequence:06d}.hza")
+        segment = Segment(path, self._sealed, len(self._active), self._active, self._active_objects)
+        self._add_segment(segment)
+        self._active, self._active_objects = ColumnStore(), {}
+        if self._executor is None:
+            # One thread, so segment files are written in order
+            self._executor = ThreadPoolExecutor(1, thread_name_prefix="history-archive")
+        self._pending = [future for future in self._pending if not future.done()]
+        self._pending.append(self._executor.submit(self._compress, segment))
+
+    def _compress(self, segment: Segment) -> None:
+        """Write a sealed segment's file, then release its in-memory records (background thread)."""
+        write_segment(segment.path, segment.columns, segment.objects, self.codec)
+        segment.columns = None  # Readers now go to the file
+        active = os.path.join(self.directory, ACTIVE_FILE)
+        if os.path.exists(active):
+            os.remove(active)  # Written by an earlier flush, so its records are all in this segment
+
+    def _add_segment(self, segment: Segment) -> None:
+        """Register a sealed segment after the existing ones."""
+        self._segments.append(segment)
+        self._starts.append(segment.start)
+        self._sealed += segment.count
+
+    def _header(self, segment: Segment) -> tuple:
+        """Read (once) a segment file's header and block index, opening its descriptor."""
+        if segment.header is None:
+            with self._lock:
+                if segment.descriptor is None:
+                    segment.descriptor = os.open(segment.path, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+                header = HEADER.unpack(os.pread(segment.descriptor, HEADER.size, 0))
+                if header[0] != MAGIC or header[1] != VERSION or header[2] not in _CODEC_NAMES:
+                    raise ValueError(f"{segment.path} is not a history archive segment")
+                index_size = 8 * (header[5] + 1)
+                segment.index = _native("Q", os.pread(segment.descriptor, index_size, header[6]))
+                segment.header = header
+        return segment.header
+
+    def _block(self, segment: Segment, block: int) -> tuple:
+        """Return the decoded columns of one block of a segment file, through the block cache."""
+        key = (segment.start, block)
+        columns = self._blocks.get(key)
+        if columns is not None:
+            self._blocks.move_to_end(key)
+            return columns
+        header = self._header(segment)
+        decompress = CODECS[_CODEC_NAMES[header[2]]][2]
+        first, last = segment.index[block], segment.index[block + 1]
+        columns = decode_block(decompress(os.pread(segment.descriptor, last - first, first)))
+        self._blocks[key] = columns
+        if len(self._blocks) > CACHED_BLOCKS:
+            self._blocks.popitem(last=False)
+        return columns
+
+    def record(self, index: int) -> Record:
+        """
+        Return the record at a position, decompressing only the block that holds it.
+
+        Raises:
+            IndexError: If the position is out of range.
+        """
+        if not 0 <= index < len(self):
+            raise IndexError("archive index out of range")
+        if index >= self._sealed:
+            return self._active.record(index - self._sealed)
+        segment = self._segments[bisect_right(self._starts, index) - 1]
+        offset = index - segment.start
+        columns = segment.columns
+        if columns is not None:  # Still being compressed
+            return columns.record(offset)
+        block_entries = self._header(segment)[3]
+        codes, operands1, operands2, results = self._block(segment, offset // block_entries)
+        offset %= block_entries
+        return codes[offset], operands1[offset], operands2[offset], results[offset]
+
+    def records(self, start: int = 0) -> Iterator[Record]:
+        """Iterate over the records from a position on, decoding each block once."""
+        for segment in list(self._segments):
+            if segment.start + segment.count <= start:
+                continue
+            columns = segment.columns
+            if columns is not None:
+                yield from islice(columns.records(), max(0, start - segment.start), None)
+                continue
+            block_entries = self._header(segment)[3]
+            first_block = max(0, start - segment.start) // block_entries
+            for block in range(first_block, self._header(segment)[5]):
+                codes, operands1, operands2, results = self._block(segment, block)
+                skip = max(0, start - segment.start - block * block_entries)
+                yield from islice(zip(codes, operands1, operands2, results), skip, None)
+        yield from islice(self._active.records(), max(0, start - self._sealed), None)
+
+    def serialized_objects(self) -> Iterator[Tuple[int, dict]]:
+        """Yield the (position, serialized entry) pairs of all object entries."""
+        for segment in list(self._segments):
+            objects = segment.objects if segment.columns is not None else self._segment_objects(segment)
+            for offset, entry in sorted(objects.items()):
+                yield segment.start + offset, entry
+        for offset, entry in sorted(self._active_objects.items()):
+            yield self._sealed + offset, entry
+
+    def _segment_objects(self, segment: Segment) -> Dict[int, dict]:
+        """Read the object entries of a segment file, keyed by offset within the segment."""
+        header = self._header(segment)
+        if not header[7]:
+            return {}
+        size = os.fstat(segment.descriptor).st_size - header[7]
+        data = CODECS[_CODEC_NAMES[header[2]]][2](os.pread(segment.descriptor, size, header[7]))
+        return {int(offset): entry for offset, entry in json.loads(data).items()}
+
+    def flush(self) -> None:
+        """Wait for background compression, then write the active segment, so the archive is complete on disk."""
+        for future in self._pending:
+            future.result()
+        self._pending.clear()
+        active = os.path.join(self.directory, ACTIVE_FILE)
+        if self._active:
+            binary.write(active, self._active.records(), len(self._active), self._active_objects)
+        elif os.path.exists(active):
+            os.remove(active)
+
+    def close(self) -> None:
+        """Flush the archive, stop the background threads, and close the segment files."""
+        try:
+            self.flush()
+        finally:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+            for segment in self._segments:
+                if segment.descriptor is not None:
+                    os.close(segment.descriptor)
+                    segment.descriptor = None
+
+    def disk_bytes(self) -> int:
+        """Return the size of the archive's files on disk (call flush first for a complete figure)."""
+        return sum(entry.stat().st_size for entry in os.scandir(self.directory) if entry.is_file())
+
+def open_archive(filename: str) -> Tuple["ArchiveStore", Dict[int, dict]]:
+    """
+    Open an existing archive for lazy reading.
+
+    Returns:
+        Tuple[ArchiveStore, Dict[int, dict]]: A store over the records, and the serialized object
+        entries keyed by position.
+
+    Raises:
+        FileNotFoundError: If the archive directory does not exist.
+        ValueError: If a segment file is not an archive segment.
+    """
+    if not os.path.isdir(filename):
+        raise FileNotFoundError(filename)
+    archive = HistoryArchive(filename)
+    return ArchiveStore(archive), dict(archive.serialized_objects())
+
+class ArchiveStore:
+    """A record store over an archive for History.load: records are decoded only when read.
+
+    New records go to an in-memory ColumnStore tail until save appends them to the archive.
+    """
+
+    __slots__ = ("archive", "_start", "_count", "_tail")
+
+    def __init__(self, archive: HistoryArchive, start: int = 0):
+        """
+        Initialize the store over the records of an open archive.
+
+        Args:
+            archive (HistoryArchive): The archive, kept open for reads.
+            start (int): The archive position of the store's first record. Defaults to 0.
+        """
+        self.archive = archive
+        self._start = start                 # Archive position of the first record
+        self._count = len(archive) - start  # Records read from the archive
+        self._tail = ColumnStore()
+
+    def __len__(self) -> int:
+        """Return the number of records, archived and in memory."""
+        return self._count + len(self._tail)
+
+    def append(self, code: int, operand1: float, operand2: float, result: float) -> None:
+        """Append one record to the in-memory tail."""
+        self._tail.append(code, operand1, operand2, result)
+
+    def record(self, index: int) -> Record:
+        """Return the record at a (non-negative) position, decoding its archive block if needed."""
+        if index < self._count:
+            return self.archive.record(self._start + index)
+        return self._tail.record(index - self._count)
+
+    def records(self) -> Iterator[Record]:
+        """Iterate over all records in order, archived records first."""
+        yield from islice(self.archive.records(self._start), self._count)
+        yield from self._tail.records()
+
+    def pop(self) -> Record:
+        """Remove and return the last record; archived records stay in the archive until the next save."""
+        if self._tail:
+            return self._tail.pop()
+        self._count -= 1
+        return self.archive.record(self._start + self._count)
+
+    def clear(self) -> None:
+        """Remove all records."""
+        self._count = 0
+        self._tail.clear()
+
+    def save(self, objects: Dict[int, dict]) -> None:
+        """
+        Append the records that are not in the archive yet, and flush it.
+
+        Normally that is the tail. Archived records that were popped or cleared are truncated from
+        the archive first (see HistoryArchive.truncate), so it holds exactly the store's records.
+
+        Args:
+            objects (Dict[int, dict]): Serialized object entries of the store, keyed by position.
+        """
+        archive, count, start = self.archive, len(self), self._count
+        if self._start + start < len(archive):
+            archive.truncate(self._start + start)
+        archive.extend(self._tail.records(), {position - start: entry for position, entry in objects.items()
+                                              if position >= start})
+        archive.flush()
+        self._count = count
+        self._tail.clear()
+
+    def close(self) -> None:
+        """Close the archive (see HistoryArchive.close); records that were not saved are not written."""
+        self.archive.close()
+
+    def nbytes(self) -> int:
+        """Return the number of bytes held in memory (archived records stay compressed on disk)."""
+        return self._tail.nbytes()
@@ -0,0 +1,172 @@
+# app/history/binary.py
+
+import itertools
+import json
+import mmap
+import os
+import struct
+from typing import Dict, Iterable, Iterator, Tuple
+from app.history.columns import ColumnStore, Record
+
+# File layout: a fixed header, `count` fixed-width records, then an optional JSON block holding
+# the entries that are stored as objects (keyed by position).
+MAGIC = b"CALCHIST"
+VERSION = 1
+# magic, version, record size, log generation (of an autosave snapshot, see History.enable_autosave),
+# count, objects offset
+HEADER = struct.Struct("<8sHHIQQ")
+RECORD = struct.Struct("<H6xddd")   # code word, padding, operand1, operand2, result
+
+def is_binary_filename(filename: str) -> bool:
+    """Return True if a history filename selects the binary format."""
+    return filename.endswith(".bin")
+
+def write(filename: str, records: Iterable[Record], count: int, objects: Dict[int, dict],
+          log_generation: int = 0) -> None:
+    """
+    Atomically write history records in the binary format.
+
+    The file is written to a temporary path and renamed into place, so readers that still map the
+    previous file keep a consistent view.
+
+    Args:
+        filename (str): The destination file.
+        records (Iterable[Record]): Exactly ``count`` records in history order.
+        count (int): The number of records.
+        objects (Dict[int, dict]): Serialized object entries keyed by position.
+        log_generation (int): The newest write-ahead log generation the records include. Defaults to 0.
+    """
+    temporary = filename + ".tmp"
+    with open(temporary, "wb") as file:
+        file.writelines(_serialize(records, count, objects, log_generation))
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary, filename)
+
+def dumps(records: Iterable[Record], count: int, objects: Dict[int, dict]) -> bytes:
+    """Return the binary format of history records as bytes; the arguments are as for write."""
+    return b"".join(_serialize(records, count, objects))
+
+def _serialize(records: Iterable[Record], count: int, objects: Dict[int, dict],
+               log_generation: int = 0) -> Iterator[bytes]:
+    """Yield the header, the records, and the object block of the binary format."""
+    objects_offset = HEADER.size + count * RECORD.size if objects else 0
+    yield HEADER.pack(MAGIC, VERSION, RECORD.size, log_generation, count, objects_offset)
+    pack = RECORD.pack
+    yield from (pack(*record) for record in records)
+    if objects:
+        yield json.dumps({str(position): entry for position, entry in objects.items()}).encode()
+
+def open_mapped(filename: str) -> Tuple["MappedStore", Dict[int, dict]]:
+    """
+    Map a binary history file without decoding its records.
+
+    Args:
+        filename (str): The file to open.
+
+    Returns:
+        Tuple[MappedStore, Dict[int, dict]]: A store over the mapped records and the serialized
+        object entries keyed by position.
+
+    Raises:
+        ValueError: If the file is not a binary history file.
+    """
+    with open(filename, "rb") as file:
+        mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    return loads(mapped)
+
+def read_log_generation(filename: str) -> int:
+    """
+    Return the write-ahead log generation recorded in a binary history file's header (0 if none).
+
+    Raises:
+        ValueError: If the file is not a binary history file.
+    """
+    with open(filename, "rb") as file:
+        header = file.read(HEADER.size)
+    if len(header) < HEADER.size:
+        raise ValueError("file is too short")
+    return HEADER.unpack(header)[3]
+
+def loads(data) -> Tuple["MappedStore", Dict[int, dict]]:
+    """
+    Read history records in the binary format from a buffer, without decoding them.
+
+    Args:
+        data: The bytes (or mapped file) holding the binary format.
+
+    Returns:
+        Tuple[MappedStore, Dict[int, dict]]: A store over the buffer and the serialized object
+        entries keyed by position.
+
+    Raises:
+        ValueError: If the buffer does not hold a binary history.
+    """
+    mapped = data
+    if len(mapped) < HEADER.size:
+        raise ValueError("file is too short")
+    magic, version, record_size, _, count, objects_offset = HEADER.unpack_from(mapped)
+    if magic != MAGIC or version != VERSION or record_size != RECORD.size:
+        raise ValueError("not a binary history file")
+    if HEADER.size + count * RECORD.size > len(mapped):
+        raise ValueError("file is truncated")
+    objects = {}
+    if objects_offset:
+        objects = {int(position): entry for position, entry in json.loads(mapped[objects_offset:]).items()}
+    return MappedStore(mapped, count), objects
+
+class MappedStore:
+    """A record store whose oldest records are decoded on demand from a memory-mapped file (or bytes).
+
+    New records are appended to an in-memory ColumnStore tail; the mapped file is never written.
+    """
+
+    __slots__ = ("_mapped", "_count", "_tail")
+
+    def __init__(self, mapped, count: int):
+        """
+        Initialize the store over a mapped file.
+
+        Args:
+            mapped: The mapped file contents, or bytes in the same format.
+            count (int): The number of records in the file.
+        """
+        self._mapped = mapped
+        self._count = count
+        self._tail = ColumnStore()
+
+    def __len__(self) -> int:
+        """Return the number of records, mapped and in memory."""
+        return self._count + len(self._tail)
+
+    def append(self, code: int, operand1: float, operand2: float, result: float) -> None:
+        """Append one record to the in-memory tail."""
+        self._tail.append(code, operand1, operand2, result)
+
+    def record(self, index: int) -> Record:
+        """Return the record at a (non-negative) position, decoding it from the file if needed."""
+        if index < self._count:
+            return RECORD.unpack_from(self._mapped, HEADER.size + index * RECORD.size)
+        return self._tail.record(index - self._count)
+
+    def records(self) -> Iterator[Record]:
+        """Iterate over all records in order, mapped records first."""
+        mapped = RECORD.iter_unpack(memoryview(self._mapped)[HEADER.size:HEADER.size + self._count * RECORD.size])
+        return itertools.chain(mapped, self._tail.records())
+
+    def pop(self) -> Record:
+        """Remove and return the last record; mapped records are dropped from view, not from the file."""
+        if self._tail:
+            return self._tail.pop()
+        record = self.record(self._count - 1)
+        self._count -= 1
+        return record
+
+    def clear(self) -> None:
+        """Remove all records."""
+        self._count = 0
+        self._tail.clear()
+
+    def nbytes(self) -> int:
+        """Return the number of bytes held in memory (mapped pages are backed by the file)."""
+        return self._tail.nbytes()
@@ -0,0 +1,186 @@
+# app/history/columns.py
+
+import importlib
+from array import array
+from typing import Dict, Iterator, Optional, Tuple, Union
+from app.operations import Operation
+from app.calculation import Calculation
+
+# Operation classes that can be stored in columns, as 'module:Class'; the code of each is its index + 1.
+# They are imported when first encoded or decoded, so importing the history does not import them.
+# Code 0 marks an entry that is kept as a whole object (e.g. a BatchCalculation).
+OPERATION_TYPES = ("app.operations.addition:Addition", "app.operations.subtraction:Subtraction",
+                   "app.operations.multiplication:Multiplication", "app.operations.division:Division")
+OBJECT_CODE = 0
+
+# Flags stored in the high byte of each code word.
+CODE_MASK = 0x00FF
+HAS_RESULT = 0x0100
+INT_OPERAND1 = 0x0200
+INT_OPERAND2 = 0x0400
+INT_RESULT = 0x0800
+
+# Integers beyond this magnitude cannot round-trip through a float64 column.
+_MAX_EXACT_INT = 2 ** 53
+
+Record = Tuple[int, float, float, float]
+
+_codes_by_name = {target.partition(":")[2]: code for code, target in enumerate(OPERATION_TYPES, start=1)}
+_codes_by_type: Dict[type, int] = {}  # Filled as operation types are first encoded
+_shared_operations = {}
+
+def _operation_type(code: int) -> type:
+    """Import and return the operation class of a column operation code (without flags)."""
+    module, _, name = OPERATION_TYPES[code - 1].partition(":")
+    return getattr(importlib.import_module(module), name)
+
+def operation_for_code(code: int) -> Operation:
+    """
+    Return the shared (stateless) Operation instance for an operation code.
+
+    Args:
+        code (int): The operation code, with or without flags.
+
+    Returns:
+        Operation: The Operation instance for the code.
+    """
+    code &= CODE_MASK
+    operation = _shared_operations.get(code)
+    if operation is None:
+        operation = _shared_operations[code] = _operation_type(code)()
+    return operation
+
+def code_for_operation(operation: Union[Operation, str]) -> int:
+    """
+    Return the operation code of an Operation instance or class name.
+
+    Args:
+        operation (Union[Operation, str]): The operation or its class name (e.g. 'Addition').
+
+    Returns:
+        int: The operation code, or OBJECT_CODE if the operation cannot be stored in columns.
+    """
+    if isinstance(operation, str):
+        return _codes_by_name.get(operation, OBJECT_CODE)
+    operation_type = type(operation)
+    code = _codes_by_type.get(operation_type)
+    if code is None:
+        # Only the built-in class itself, not another class of the same name (e.g. a plugin's)
+        code = _codes_by_name.get(operation_type.__name__, OBJECT_CODE)
+        if code != OBJECT_CODE and _operation_type(code) is not operation_type:
+            code = OBJECT_CODE
+        _codes_by_type[operation_type] = code
+    return code
+
+def _is_exact_int(value) -> bool:
+    """Return True for ints (not bools) that survive a float64 round trip."""
+    return type(value) is int and -_MAX_EXACT_INT <= value <= _MAX_EXACT_INT
+
+def encode(calculation) -> Optional[Record]:
+    """
+    Encode a Calculation as a column record.
+
+    Args:
+        calculation: The calculation to encode.
+
+    Returns:
+        Optional[Record]: A (code word, operand1, operand2, result) tuple, or None if the entry
+        cannot be represented in columns and must be stored as an object.
+    """
+    if type(calculation) is not Calculation:
+        return None
+    return encode_values(calculation.operation, calculation.operand1, calculation.operand2, calculation.result)
+
+def encode_values(operation: Operation, operand1, operand2, result) -> Optional[Record]:
+    """
+    Encode the parts of a calculation as a column record, without a Calculation object.
+
+    Args:
+        operation (Operation): The operation that was performed.
+        operand1: The first operand.
+        operand2: The second operand.
+        result: The result, or None if the calculation has not been performed.
+
+    Returns:
+        Optional[Record]: A (code word, operand1, operand2, result) tuple, or None if the values
+        cannot be represented in columns.
+    """
+    code = code_for_operation(operation)
+    if code == OBJECT_CODE:
+        return None
+    for value, int_flag in ((operand1, INT_OPERAND1), (operand2, INT_OPERAND2)):
+        if _is_exact_int(value):
+            code |= int_flag
+        elif type(value) is not float:
+            return None
+    if result is None:
+        return code, operand1, operand2, 0.0
+    if _is_exact_int(result):
+        code |= INT_RESULT
+    elif type(result) is not float:
+        return None
+    return code | HAS_RESULT, operand1, operand2, result
+
+def decode(record: Record) -> Calculation:
+    """
+    Materialize a column record as a Calculation.
+
+    Args:
+        record (Record): A (code word, operand1, operand2, result) tuple.
+
+    Returns:
+        Calculation: The calculation the record was encoded from.
+    """
+    code, operand1, operand2, result = record
+    calculation = Calculation(
+        operation_for_code(code),
+        int(operand1) if code & INT_OPERAND1 else operand1,
+        int(operand2) if code & INT_OPERAND2 else operand2,
+    )
+    if code & HAS_RESULT:
+        calculation.result = int(result) if code & INT_RESULT else result
+    return calculation
+
+class ColumnStore:
+    """Stores calculation records as parallel typed arrays instead of one object per entry."""
+
+    __slots__ = ("codes", "operands1", "operands2", "results")
+
+    def __init__(self):
+        """Initialize empty code and float64 operand/result columns."""
+        self.codes = array("H")
+        self.operands1 = array("d")
+        self.operands2 = array("d")
+        self.results = array("d")
+
+    def __len__(self) -> int:
+        """Return the number of stored records."""
+        return len(self.codes)
+
+    def append(self, code: int, operand1: float, operand2: float, result: float) -> None:
+        """Append one record to the columns."""
+        self.codes.append(code)
+        self.operands1.append(operand1)
+        self.operands2.append(operand2)
+        self.results.append(result)
+
+    def record(self, index: int) -> Record:
+        """Return the record at a (non-negative) position."""
+        return self.codes[index], self.operands1[index], self.operands2[index], self.results[index]
+
+    def records(self) -> Iterator[Record]:
+        """Iterate over all records in order."""
+        return zip(self.codes, self.operands1, self.operands2, self.results)
+
+    def pop(self) -> Record:
+        """Remove and return the last record."""
+        return self.codes.pop(), self.operands1.pop(), self.operands2.pop(), self.results.pop()
+
+    def clear(self) -> None:
+        """Remove all records, releasing the column buffers."""
+        self.__init__()
+
+    def nbytes(self) -> int:
+        """Return the number of bytes used by the stored records."""
+        return sum(len(column) * column.itemsize
+                   for column in (self.codes, self.operands1, self.operands2, self.results))
@@ -0,0 +1,66 @@
+# app/history/concurrent.py
+
+import itertools
+import threading
+from collections import deque
+from operator import itemgetter
+from typing import Any, List
+
+class AppendBuffers:
+    """Per-thread append buffers whose items are merged back in global sequence order.
+
+    Each thread appends to its own deque, tagging every item with a number drawn from a shared
+    counter, so concurrent appends never wait on a lock. drain() collects the buffered items of all
+    threads in the order their sequence numbers were drawn.
+    """
+
+    def __init__(self):
+        """Initialize with no thread buffers."""
+        self._local = threading.local()
+        self._sequence = itertools.count()
+        self._buffers: List[tuple] = []  # (thread, deque) pairs
+        self._register_lock = threading.Lock()
+
+    def push(self, item: Any) -> int:
+        """
+        Append an item to the calling thread's buffer.
+
+        Args:
+            item (Any): The item to buffer.
+
+        Returns:
+            int: The number of items now buffered by the calling thread.
+        """
+        buffer = getattr(self._local, "buffer", None)
+        if buffer is None:
+            buffer = self._local.buffer = deque()
+            with self._register_lock:
+                self._buffers.append((threading.current_thread(), buffer))
+        buffer.append((next(self._sequence), item))
+        return len(buffer)
+
+    def drain(self) -> List[Any]:
+        """
+        Remove and return every buffered item, ordered by sequence number.
+
+        Callers must serialize calls to drain; pushes may run concurrently with it.
+
+        Returns:
+            List[Any]: The buffered items in the order they were pushed.
+        """
+        items = []
+        with self._register_lock:
+            buffers = list(self._buffers)
+        for _, buffer in buffers:
+            for _ in range(len(buffer)):
+                items.append(buffer.popleft())
+        if len(buffers) > 1:
+            items.sort(key=itemgetter(0))
+        self._forget_finished_threads()
+        return [item for _, item in items]
+
+    def _forget_finished_threads(self) -> None:
+        """Drop the (empty) buffers of threads that have exited."""
+        with self._register_lock:
+            self._buffers = [(thread, buffer) for thread, buffer in self._buffers
+                             if thread.is_alive() or buffer]
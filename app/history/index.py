@@ -0,0 +1,156 @@
+# app/history/index.py
+
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterator, List
+from app.history.columns import CODE_MASK, HAS_RESULT
+
+# Maximum entries per block of a SortedIndex before the block is split in two.
+BLOCK_SIZE = 1024
+
+class SortedIndex:
+    """(key, position) pairs kept sorted by key in fixed-size blocks of typed arrays.
+
+    Inserting moves at most one block of memory instead of the whole index, and a range lookup is a
+    bisection over block bounds followed by a scan of the matching entries only. Equal keys are kept
+    in insertion order, so the newest position of a key is always the last one stored for it.
+    """
+
+    __slots__ = ("_keys", "_positions", "_maxes")
+
+    def __init__(self):
+        """Initialize an empty index."""
+        self._keys: List[array] = []       # Sorted float64 keys, per block
+        self._positions: List[array] = []  # Positions matching _keys, per block
+        self._maxes: List[float] = []      # Largest key of each block
+
+    @classmethod
+    def from_pairs(cls, pairs) -> "SortedIndex":
+        """Build an index from (key, position) pairs with ascending positions, in one sort."""
+        index = cls()
+        pairs = sorted(pairs, key=lambda pair: pair[0])  # Stable, so equal keys keep position order
+        for start in range(0, len(pairs), BLOCK_SIZE // 2):
+            block = pairs[start:start + BLOCK_SIZE // 2]
+            index._keys.append(array("d", [key for key, _ in block]))
+            index._positions.append(array("q", [position for _, position in block]))
+            index._maxes.append(block[-1][0])
+        return index
+
+    def __len__(self) -> int:
+        """Return the number of indexed entries."""
+        return sum(len(block) for block in self._keys)
+
+    def insert(self, key: float, position: int) -> None:
+        """Insert a key for a history position, after any equal keys."""
+        if not self._keys:
+            self._keys.append(array("d", [key]))
+            self._positions.append(array("q", [position]))
+            self._maxes.append(key)
+            return
+        block = min(bisect_right(self._maxes, key), len(self._maxes) - 1)
+        keys, positions = self._keys[block], self._positions[block]
+        index = bisect_right(keys, key)
+        keys.insert(index, key)
+        positions.insert(index, position)
+        self._maxes[block] = keys[-1]
+        if len(keys) > BLOCK_SIZE:
+            half = len(keys) // 2
+            self._keys[block + 1:block + 1] = [keys[half:]]
+            self._positions[block + 1:block + 1] = [positions[half:]]
+            del keys[half:], positions[half:]
+            self._maxes[block:block + 1] = [keys[-1], self._keys[block + 1][-1]]
+
+    def remove_newest(self, key: float) -> None:
+        """Remove the newest entry stored for a key (the one an undo removes)."""
+        block = min(bisect_right(self._maxes, key), len(self._maxes) - 1)
+        if self._keys[block][0] > key:
+            block -= 1  # Equal keys may span blocks; the newest is in the last block holding the key
+        keys, positions = self._keys[block], self._positions[block]
+        index = bisect_right(keys, key) - 1
+        del keys[index], positions[index]
+        if keys:
+            self._maxes[block] = keys[-1]
+        else:
+            del self._keys[block], self._positions[block], self._maxes[block]
+
+    def remove_before(self, start: int) -> None:
+        """Remove the entries of positions before ``start``, re-packing the remaining ones into blocks."""
+        pairs = [(key, position) for keys, positions in zip(self._keys, self._positions)
+                 for key, position in zip(keys, positions) if position >= start]
+        packed = SortedIndex.from_pairs(pairs)  # Already in key order, so the sort is a single pass
+        self._keys, self._positions, self._maxes = packed._keys, packed._positions, packed._maxes
+
+    def positions_between(self, low: float, high: float) -> Iterator[int]:
+        """Yield the positions whose key lies in [low, high], in key order."""
+        for block in range(bisect_left(self._maxes, low), len(self._maxes)):
+            keys, positions = self._keys[block], self._positions[block]
+            start, stop = bisect_left(keys, low), bisect_right(keys, high)
+            yield from positions[start:stop]
+            if stop < len(keys):
+                return
+
+class HistoryIndexes:
+    """Secondary indexes over a history: ascending positions per operation code and a sorted result index.
+
+    The indexes cover the positions from ``start`` on. A history that spills its oldest entries to
+    disk moves ``start`` up with them (see remove_before), so the indexes stay as small as the part
+    of the history held in memory; queries scan the spilled records instead.
+    """
+
+    __slots__ = ("by_code", "by_result", "start")
+
+    def __init__(self, start: int = 0):
+        """Initialize empty indexes covering the positions from ``start`` on."""
+        self.by_code: Dict[int, array] = {}
+        self.by_result = SortedIndex()
+        self.start = start
+
+    @classmethod
+    def build(cls, records, start: int = 0) -> "HistoryIndexes":
+        """
+        Index existing history records.
+
+        Args:
+            records: The (code, operand1, operand2, result) records of a history, in position order.
+            start (int): The position of the first record. Defaults to 0.
+
+        Returns:
+            HistoryIndexes: The indexes.
+        """
+        indexes = cls(start)
+        pairs = []
+        for position, (code, _, _, result) in enumerate(records, start):
+            positions = indexes.by_code.get(code & CODE_MASK)
+            if positions is None:
+                positions = indexes.by_code[code & CODE_MASK] = array("q")
+            positions.append(position)
+            if code & HAS_RESULT and result == result:
+                pairs.append((result, position))
+        indexes.by_result = SortedIndex.from_pairs(pairs)
+        return indexes
+
+    def add(self, position: int, code: int, result: float, has_result: bool) -> None:
+        """Index a newly appended entry by operation (code word without flags) and result."""
+        code &= CODE_MASK
+        positions = self.by_code.get(code)
+        if positions is None:
+            positions = self.by_code[code] = array("q")
+        positions.append(position)
+        if has_result and result == result:  # NaN results cannot be ordered
+            self.by_result.insert(result, position)
+
+    def remove_last(self, position: int, code: int, result: float, has_result: bool) -> None:
+        """Un-index the newest entry, at a position, which an undo removed."""
+        if position < self.start:  # Spilled, so not indexed; the indexes now cover no positions
+            self.start = position
+            return
+        self.by_code[code & CODE_MASK].pop()
+        if has_result and result == result:
+            self.by_result.remove_newest(result)
+
+    def remove_before(self, start: int) -> None:
+        """Un-index the positions before ``start``, e.g. those spilled to disk."""
+        for positions in self.by_code.values():
+            del positions[:bisect_left(positions, start)]
+        self.by_result.remove_before(start)
+        self.start = start
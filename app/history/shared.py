@@ -0,0 +1,256 @@
+# app/history/shared.py
+
+import math
+import struct
+import time
+from multiprocessing import shared_memory
+from typing import Iterator, List, NamedTuple, Optional, Set
+from app.history.columns import HAS_RESULT, OBJECT_CODE, decode
+
+# Events a region holds; a reader that falls further behind than this loses the oldest ones.
+DEFAULT_CAPACITY = 1 << 16
+
+MAGIC = b"CALCSHRD"
+VERSION = 1
+HEADER = struct.Struct("<8sHHI")  # magic, version, slot size, capacity
+CLOSED = struct.Struct("<B")      # at CLOSED_OFFSET: 1 once the publisher has stopped
+CLOSED_OFFSET = HEADER.size
+SLOTS_OFFSET = 64
+# Event n goes to slot n % capacity, between two copies of its sequence number n + 1: kind, code
+# word, position, operand1, operand2, result, and publish time (time.time()). The writer stores the
+# fields in order and readers load them in reverse (see HistoryReader.poll). There is no shared
+# head counter: readers find new events by their sequence numbers, so publishing is one store.
+SLOT = struct.Struct("<QBxH4xqddddQ")
+SEQUENCE = struct.Struct("<Q")
+BODY = struct.Struct("<BxH4xqdddd")
+SLOT_SIZE = SLOT.size  # 64 bytes, one cache line
+END_OFFSET = SLOT_SIZE - SEQUENCE.size
+
+# Event kinds.
+ADD = 1     # A column entry was appended at position
+OBJECT = 2  # An object entry (batch, expression, ...) was appended; only its numeric result is published
+UNDO = 3    # The entry at position was removed
+CLEAR = 4   # Every entry was removed
+
+# Regions created by this process, which must stay registered with the resource tracker (see _attach).
+_created: Set[str] = set()
+
+class Event(NamedTuple):
+    """A history change read from a shared region."""
+    sequence: int    # The event number, counting from 0 since publishing started
+    kind: int        # ADD, OBJECT, UNDO, or CLEAR
+    code: int        # The code word of an added entry (see app.history.columns)
+    position: int    # The history position the change applies to
+    operand1: float
+    operand2: float
+    result: float    # NaN if the entry has no numeric result
+    time: float      # When the change was published, as time.time()
+
+    def calculation(self):
+        """Return the Calculation of an ADD event (None for other events)."""
+        return decode((self.code, self.operand1, self.operand2, self.result)) if self.kind == ADD else None
+
+class HistoryPublisher:
+    """Publishes the changes of a history into a shared memory ring, for readers in other processes.
+
+    Every add, undo, and clear is written as one fixed-size slot, so readers copy plain numbers
+    out of shared memory instead of deserializing anything. The single writer wraps around the
+    ring; readers detect both events they were too slow to read and slots overwritten while they
+    read them (see HistoryReader).
+    """
+
+    def __init__(self, name: Optional[str] = None, capacity: int = DEFAULT_CAPACITY):
+        """
+        Create a shared memory region.
+
+        Args:
+            name (Optional[str]): The name readers attach to. Defaults to a unique generated name.
+            capacity (int): Events held before the oldest are overwritten. Defaults to DEFAULT_CAPACITY.
+
+        Raises:
+            ValueError: If the capacity is less than 1.
+            FileExistsError: If a region with the name already exists.
+        """
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1.")
+        self._memory = shared_memory.SharedMemory(name, create=True, size=SLOTS_OFFSET + capacity * SLOT_SIZE)
+        _created.add(self._memory._name)  # pylint: disable=protected-access
+        self._buffer = self._memory.buf
+        self.capacity = capacity
+        self.head = 0  # Events published
+        HEADER.pack_into(self._buffer, 0, MAGIC, VERSION, SLOT_SIZE, capacity)
+        CLOSED.pack_into(self._buffer, CLOSED_OFFSET, 0)
+
+    @property
+    def name(self) -> str:
+        """The name readers attach to."""
+        return self._memory.name
+
+    def add(self, position: int, code: int, operand1: float, operand2: float, result: float) -> None:
+        """Publish a column entry appended at a position."""
+        self._write(ADD, code, position, operand1, operand2, result if code & HAS_RESULT else math.nan)
+
+    def add_object(self, position: int, entry) -> None:
+        """Publish an object entry appended at a position, with its numeric result if it has one."""
+        result = getattr(entry, "result", None)
+        if isinstance(result, bool) or not isinstance(result, (int, float)):
+            self._write(OBJECT, OBJECT_CODE, position, math.nan, math.nan, math.nan)
+        else:
+            self._write(OBJECT, OBJECT_CODE | HAS_RESULT, position, math.nan, math.nan, result)
+
+    def undo(self, position: int) -> None:
+        """Publish the removal of the newest entry, at a position."""
+        self._write(UNDO, 0, position, math.nan, math.nan, math.nan)
+
+    def clear(self) -> None:
+        """Publish the removal of every entry."""
+        self._write(CLEAR, 0, 0, math.nan, math.nan, math.nan)
+
+    def _write(self, kind: int, code: int, position: int, operand1: float, operand2: float, result: float) -> None:
+        """Write one event into the next slot."""
+        self.head = head = self.head + 1
+        offset = SLOTS_OFFSET + (head - 1) % self.capacity * SLOT_SIZE
+        # One pack, which stores the fields in order (ordered stores also rely on the CPU: x86 keeps
+        # them in order for other processes, weaker memory models may not)
+        SLOT.pack_into(self._buffer, offset, head, kind, code, position, operand1, operand2, result, time.time(), head)
+
+    def close(self) -> None:
+        """Mark the region closed, so following readers stop, and unlink it; attached readers keep their view."""
+        if self._buffer is None:
+            return
+        CLOSED.pack_into(self._buffer, CLOSED_OFFSET, 1)
+        self._buffer = None
+        self._memory.close()
+        self._memory.unlink()
+        _created.discard(self._memory._name)  # pylint: disable=protected-access
+
+class HistoryReader:
+    """Tails the changes a HistoryPublisher writes, from any process on the same machine.
+
+    The writer stores a slot's leading sequence number, then the event, then the trailing sequence
+    number; a reader loads the trailing number, then the event, then the leading number, and keeps
+    the event only if both numbers are the one it expects. If the writer rewrote any part of the
+    slot during the copy, the leading number has already changed by the time it is loaded, so a
+    slot is never returned half old and half new. Events the writer overwrote before the reader got to them are skipped
+    and counted in ``lost``.
+    """
+
+    def __init__(self, name: str, from_start: bool = False):
+        """
+        Attach to a published history.
+
+        Args:
+            name (str): The name of the region (HistoryPublisher.name, or the value History.publish returns).
+            from_start (bool): Whether to start from the oldest event still in the ring rather than
+                from the next one published. Defaults to False.
+
+        Raises:
+            FileNotFoundError: If there is no region with the name.
+            ValueError: If the region was not written by a HistoryPublisher of this version.
+        """
+        self._memory = _attach(name)
+        self._buffer = self._memory.buf
+        magic, version, slot_size, self.capacity = HEADER.unpack_from(self._buffer, 0)
+        if magic != MAGIC or version != VERSION or slot_size != SLOT_SIZE:
+            self.close()
+            raise ValueError(f"{name} is not a published history.")
+        published = self._published()
+        self.cursor = max(0, published - self.capacity) if from_start else published  # The next event to read
+        self.lost = 0
+
+    @property
+    def closed(self) -> bool:
+        """Whether the publisher has stopped."""
+        return bool(CLOSED.unpack_from(self._buffer, CLOSED_OFFSET)[0])
+
+    def poll(self, limit: Optional[int] = None) -> List[Event]:
+        """
+        Return the events published since the last poll, without waiting.
+
+        Args:
+            limit (Optional[int]): The most events to return. Defaults to all that are available.
+
+        Returns:
+            List[Event]: The new events, oldest first.
+        """
+        buffer, capacity, events = self._buffer, self.capacity, []
+        while limit is None or len(events) < limit:
+            offset = SLOTS_OFFSET + self.cursor % capacity * SLOT_SIZE
+            expected = self.cursor + 1
+            if SEQUENCE.unpack_from(buffer, offset + END_OFFSET)[0] == expected:
+                body = BODY.unpack_from(buffer, offset + SEQUENCE.size)
+                begin = SEQUENCE.unpack_from(buffer, offset)[0]
+                if begin == expected:
+                    events.append(Event(self.cursor, *body))
+                    self.cursor += 1
+                    continue
+            else:
+                begin = SEQUENCE.unpack_from(buffer, offset)[0]
+                if begin <= expected:
+                    break  # Not published yet, or still being written
+            # The writer has lapped us: event begin - 1 is in this slot, so skip to the oldest event left
+            self.lost += begin - capacity - self.cursor
+            self.cursor = begin - capacity
+        return events
+
+    def follow(self, interval: float = 0.001) -> Iterator[Event]:
+        """
+        Yield events as they are published, polling every ``interval`` seconds while there are none,
+        until the publisher closes and every event before that has been yielded.
+
+        Yields:
+            Event: Each event, oldest first.
+        """
+        while True:
+            closed = self.closed
+            events = self.poll()
+            yield from events
+            if not events:
+                if closed:
+                    return
+                time.sleep(interval)
+
+    def _published(self) -> int:
+        """Return the number of events published so far, by binary search over the slots' sequence numbers."""
+        buffer, capacity = self._buffer, self.capacity
+        first = SEQUENCE.unpack_from(buffer, SLOTS_OFFSET)[0]
+        if not first:
+            return 0
+        # The slots before the writer's hold the current lap, numbered from the first slot's on;
+        # the rest hold the previous lap, or nothing
+        low, high = 1, capacity
+        while low < high:
+            middle = (low + high) // 2
+            if SEQUENCE.unpack_from(buffer, SLOTS_OFFSET + middle * SLOT_SIZE)[0] >= first:
+                low = middle + 1
+            else:
+                high = middle
+        return SEQUENCE.unpack_from(buffer, SLOTS_OFFSET + (low - 1) * SLOT_SIZE)[0]
+
+    def close(self) -> None:
+        """Detach from the region."""
+        if self._buffer is not None:
+            self._buffer = None
+            self._memory.close()
+
+    def __enter__(self) -> "HistoryReader":
+        """Return the reader."""
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        """Detach the reader."""
+        self.close()
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """Attach to an existing region without making this process responsible for unlinking it."""
+    try:
+        return shared_memory.SharedMemory(name, track=False)  # Python 3.13+
+    except TypeError:
+        pass
+    memory = shared_memory.SharedMemory(name)
+    if memory._name not in _created:  # pylint: disable=protected-access
+        # Before 3.13 attaching registers the region, and the resource tracker would unlink it when
+        # this process exits, under the publisher's feet
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(memory._name, "shared_memory")  # pylint: disable=protected-access
+    return memory
@@ -0,0 +1,289 @@
+# app/history/spill.py
+
+import itertools
+import json
+import os
+import shutil
+import struct
+import tempfile
+import weakref
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from app.history import binary
+from app.history.columns import OBJECT_CODE, ColumnStore, Record
+
+# Bytes one record occupies in the in-memory columns (code word plus three float64 values).
+RECORD_BYTES = 26
+# Segment files kept open for random reads; older ones are closed and reopened on demand.
+OPEN_SEGMENTS = 8
+# Records read from a segment file at a time while iterating.
+READ_RECORDS = 64 * 1024
+# A spilled time checkpoint of the history: position, add time.
+CHECKPOINT = struct.Struct("<qd")
+CHECKPOINTS_FILE = "checkpoints.bin"
+
+class Segment:
+    """A run of consecutive history records stored in a binary history file."""
+
+    __slots__ = ("path", "start", "count", "owned")
+
+    def __init__(self, path: str, start: int, count: int, owned: bool):
+        """
+        Initialize a segment.
+
+        Args:
+            path (str): The binary history file holding the records.
+            start (int): The history position of the first record.
+            count (int): The number of records still part of the history.
+            owned (bool): Whether the file was written by the store and is deleted with it.
+        """
+        self.path = path
+        self.start = start
+        self.count = count
+        self.owned = owned
+
+class SpillStore:
+    """A record store that keeps at most ``max_entries`` records in memory and spills the rest to disk.
+
+    New records go to an in-memory ColumnStore tail. When the tail is full, its oldest half is
+    written to a segment file in the binary history format, together with the object entries
+    (serialized with ``to_dict``) that fall in that range, which are removed from ``objects``.
+    Spilled records are read back with positioned reads rather than mapped, so reading a large
+    history does not grow resident memory either. ``on_spill`` is called with the new number of
+    spilled records after each spill, so the history can move its per-position state for them out
+    of memory too (time checkpoints go to a file here, see spill_checkpoints).
+    """
+
+    __slots__ = ("max_entries", "objects", "on_spill", "_directory", "_segments", "_starts", "_spilled", "_tail",
+                 "_files", "_sequence", "_checkpoints", "_cleanup", "__weakref__")
+
+    def __init__(self, objects: Dict[int, object], max_entries: int, directory: Optional[str] = None):
+        """
+        Initialize an empty store.
+
+        Args:
+            objects (Dict[int, object]): The history's position -> entry table for OBJECT_CODE records.
+            max_entries (int): Maximum number of records kept in memory; at least 2.
+            directory (Optional[str]): Where segment files are written. Defaults to a temporary
+                directory that is removed when the store is garbage collected.
+
+        Raises:
+            ValueError: If max_entries is less than 2.
+        """
+        if max_entries < 2:
+            raise ValueError("max_entries must be at least 2")
+        self.max_entries = max_entries
+        self.objects = objects
+        self.on_spill: Optional[Callable[[int], None]] = None
+        if directory is None:
+            directory = tempfile.mkdtemp(prefix="calc-history-")
+            self._cleanup = weakref.finalize(self, shutil.rmtree, directory, True)
+        else:
+            os.makedirs(directory, exist_ok=True)
+            self._cleanup = None
+        self._directory = directory
+        self._segments: List[Segment] = []
+        self._starts: List[int] = []  # Start position of each segment, for bisection
+        self._spilled = 0             # Records held in segments
+        self._tail = ColumnStore()
+        self._files: "OrderedDict[str, int]" = OrderedDict()  # Path -> open descriptor, least recent first
+        self._sequence = 0
+        self._checkpoints = 0  # Time checkpoints in the checkpoint file
+
+    def __len__(self) -> int:
+        """Return the number of records, spilled and in memory."""
+        return self._spilled + len(self._tail)
+
+    @property
+    def spilled(self) -> int:
+        """The number of records held in segment files; the rest are in memory."""
+        return self._spilled
+
+    def append(self, code: int, operand1: float, operand2: float, result: float) -> None:
+        """Append one record, spilling the oldest half of memory to disk when the cap is reached."""
+        self._tail.append(code, operand1, operand2, result)
+        if len(self._tail) >= self.max_entries:
+            self._spill(self.max_entries // 2)
+
+    def _spill(self, count: int) -> None:
+        """Move the oldest ``count`` in-memory records into a new segment file."""
+        start = self._spilled
+        objects = {}  # Keyed by offset in the segment, so each segment is a valid history file
+        for offset, code in enumerate(self._tail.codes[:count]):
+            if code == OBJECT_CODE:
+                objects[offset] = self.objects.pop(start + offset).to_dict()
+        self._sequence += 1
+        path = os.path.join(self._directory, f"segment-{self._sequence:06d}.bin")
+        binary.write(path, itertools.islice(self._tail.records(), count), count, objects)
+        for column in (self._tail.codes, self._tail.operands1, self._tail.operands2, self._tail.results):
+            del column[:count]
+        self._add_segment(Segment(path, start, count, owned=True))
+        if self.on_spill is not None:
+            self.on_spill(self._spilled)
+
+    def _add_segment(self, segment: Segment) -> None:
+        """Register a segment holding the records that follow the current spilled ones."""
+        self._segments.append(segment)
+        self._starts.append(segment.start)
+        self._spilled += segment.count
+
+    def attach(self, filename: str, count: int) -> None:
+        """
+        Use an existing binary history file as the oldest records of an empty store, without copying it.
+
+        The file is kept open, so it can be replaced on disk (e.g. by a later save) without
+        affecting the records already read from it.
+
+        Args:
+            filename (str): A binary history file.
+            count (int): The number of records in the file.
+        """
+        self._add_segment(Segment(filename, 0, count, owned=False))
+        self._descriptor(filename)
+
+    def _descriptor(self, path: str) -> int:
+        """Return an open descriptor for a segment file, closing the least recently used one if needed."""
+        descriptor = self._files.get(path)
+        if descriptor is not None:
+            self._files.move_to_end(path)
+            return descriptor
+        descriptor = os.open(path, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+        self._files[path] = descriptor
+        attached = self._segments[0].path if self._segments and not self._segments[0].owned else None
+        for oldest in [open_path for open_path in self._files if open_path != attached][:-OPEN_SEGMENTS]:
+            os.close(self._files.pop(oldest))  # An attached file stays open; see attach
+        return descriptor
+
+    def _segment(self, index: int) -> Segment:
+        """Return the segment holding a spilled position."""
+        return self._segments[bisect_right(self._starts, index) - 1]
+
+    def record(self, index: int) -> Record:
+        """Return the record at a (non-negative) position, reading it from disk if it was spilled."""
+        if index >= self._spilled:
+            return self._tail.record(index - self._spilled)
+        segment = self._segment(index)
+        offset = binary.HEADER.size + (index - segment.start) * binary.RECORD.size
+        return binary.RECORD.unpack(os.pread(self._descriptor(segment.path), binary.RECORD.size, offset))
+
+    def records(self, start: int = 0) -> Iterator[Record]:
+        """Iterate over the records from a position on, in order, reading spilled ones a block at a time."""
+        for segment in list(self._segments):
+            for first in range(max(0, start - segment.start), segment.count, READ_RECORDS):
+                size = min(READ_RECORDS, segment.count - first) * binary.RECORD.size
+                offset = binary.HEADER.size + first * binary.RECORD.size
+                # Look the descriptor up per block: reads between blocks may have closed it
+                yield from binary.RECORD.iter_unpack(os.pread(self._descriptor(segment.path), size, offset))
+        yield from itertools.islice(self._tail.records(), max(0, start - self._spilled), None)
+
+    def spill_checkpoints(self, positions: array, times: array) -> None:
+        """
+        Append time checkpoints of spilled records to the checkpoint file.
+
+        Args:
+            positions (array): Ascending positions, after those already in the file.
+            times (array): The add time of each position.
+        """
+        with open(os.path.join(self._directory, CHECKPOINTS_FILE), "ab") as file:
+            file.write(b"".join(map(CHECKPOINT.pack, positions, times)))
+        self._checkpoints += len(positions)
+
+    def checkpoints(self) -> Tuple[array, array]:
+        """Read back the spilled time checkpoints, as arrays of positions and of times."""
+        positions, times = array("q"), array("d")
+        if self._checkpoints:
+            with open(os.path.join(self._directory, CHECKPOINTS_FILE), "rb") as file:
+                data = file.read(self._checkpoints * CHECKPOINT.size)
+            for position, added in CHECKPOINT.iter_unpack(data):
+                positions.append(position)
+                times.append(added)
+        return positions, times
+
+    def drop_checkpoints(self, start: int) -> None:
+        """Remove the spilled time checkpoints of positions from ``start`` on (undone records), newest first."""
+        if not self._checkpoints:
+            return
+        path = os.path.join(self._directory, CHECKPOINTS_FILE)
+        count = self._checkpoints
+        with open(path, "rb") as file:
+            while count:
+                file.seek((count - 1) * CHECKPOINT.size)
+                if CHECKPOINT.unpack(file.read(CHECKPOINT.size))[0] < start:
+                    break
+                count -= 1
+        if count < self._checkpoints:
+            self._checkpoints = count
+            os.truncate(path, count * CHECKPOINT.size)
+
+    def clear_checkpoints(self) -> None:
+        """Remove every spilled time checkpoint."""
+        if self._checkpoints:
+            os.remove(os.path.join(self._directory, CHECKPOINTS_FILE))
+            self._checkpoints = 0
+
+    def spilled_object(self, index: int) -> dict:
+        """
+        Return the serialized object entry at a spilled position.
+
+        Args:
+            index (int): The position of an OBJECT_CODE record that has been spilled.
+
+        Returns:
+            dict: The entry as produced by its ``to_dict`` method.
+        """
+        segment = self._segment(index)
+        return self._segment_objects(segment)[index - segment.start]
+
+    def spilled_objects(self) -> Iterator[Tuple[int, dict]]:
+        """Yield the (position, serialized entry) pairs of all spilled object entries."""
+        for segment in list(self._segments):
+            for offset, entry in self._segment_objects(segment).items():
+                if offset < segment.count:
+                    yield segment.start + offset, entry
+
+    def _segment_objects(self, segment: Segment) -> Dict[int, dict]:
+        """Read the object entries of a segment, keyed by offset within the segment."""
+        descriptor = self._descriptor(segment.path)
+        header = os.pread(descriptor, binary.HEADER.size, 0)
+        objects_offset = binary.HEADER.unpack(header)[5]
+        if not objects_offset:
+            return {}
+        size = os.fstat(descriptor).st_size - objects_offset
+        objects = json.loads(os.pread(descriptor, size, objects_offset))
+        return {int(offset): entry for offset, entry in objects.items()}
+
+    def pop(self) -> Record:
+        """Remove and return the last record, shrinking the newest segment once memory is empty."""
+        if self._tail:
+            return self._tail.pop()
+        segment = self._segments[-1]
+        record = self.record(self._spilled - 1)
+        segment.count -= 1
+        self._spilled -= 1
+        if not segment.count:
+            self._drop_segment()
+        return record
+
+    def _drop_segment(self) -> None:
+        """Forget the newest segment, deleting its file if the store wrote it."""
+        segment = self._segments.pop()
+        self._starts.pop()
+        self._spilled -= segment.count
+        descriptor = self._files.pop(segment.path, None)
+        if descriptor is not None:
+            os.close(descriptor)
+        if segment.owned:
+            os.remove(segment.path)
+
+    def clear(self) -> None:
+        """Remove all records and delete the segment and checkpoint files."""
+        while self._segments:
+            self._drop_segment()
+        self._tail.clear()
+        self.clear_checkpoints()
+
+    def nbytes(self) -> int:
+        """Return the number of bytes held in memory (spilled records are on disk)."""
+        return self._tail.nbytes()
@@ -0,0 +1,135 @@
+# app/history/wal.py
+
+import json
+import os
+from typing import Iterator, List
+
+# Record tags written to the log, one JSON array per line.
+ADD = "a"     # ["a", code, operand1, operand2, result] -- a columnar calculation
+OBJECT = "o"  # ["o", entry_dict] -- an entry stored as an object (e.g. a batch)
+UNDO = "u"    # ["u"]
+CLEAR = "c"   # ["c"]
+GENERATION = "g"  # ["g", generation] -- the first line of a log, not counted in records
+
+class WriteAheadLog:
+    """An append-only log of history mutations, so that autosave cost does not grow with history size.
+
+    Every log file starts with its generation number, which goes up by one each time the log is
+    truncated or rotated. A snapshot records the generation of the newest log folded into it, so
+    a log that outlives the snapshot replacing it (after a crash in between) is not replayed twice.
+    """
+
+    def __init__(self, path: str, batch_size: int = 1, fsync: bool = False, generation: int = 1):
+        """
+        Open (or create) a log file for appending.
+
+        Args:
+            path (str): The log file path.
+            batch_size (int): Number of records buffered in memory before they are written. Defaults to 1,
+                which writes every record immediately.
+            fsync (bool): Whether each write is followed by os.fsync for durability across power loss.
+                Defaults to False, which only guarantees durability across process crashes.
+            generation (int): The generation of the log, written first if the file is new. Defaults to 1.
+        """
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1.")
+        self.path = path
+        self.batch_size = batch_size
+        self.fsync = fsync
+        self.generation = generation
+        self.records = 0  # Records in the log since the last truncate
+        self._pending: List[str] = []
+        self._file = open(path, "a", encoding="utf-8")
+        if not self._file.tell():
+            self._write_generation()
+
+    def append(self, *record) -> None:
+        """
+        Append one record, writing the pending batch once it is full.
+
+        Args:
+            *record: The record tag followed by its fields.
+        """
+        self._pending.append(json.dumps(record))
+        self.records += 1
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write all pending records to the file."""
+        if not self._pending:
+            return
+        self._file.write("\n".join(self._pending) + "\n")
+        self._pending.clear()
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+    def rotate(self, path: str) -> None:
+        """
+        Move the records written so far to another file and continue in an empty log, e.g. so the
+        moved records can be compacted on another thread.
+
+        Args:
+            path (str): Where the current log file is moved; an existing file there is replaced.
+        """
+        self.flush()
+        self._file.close()
+        os.replace(self.path, path)
+        self._file = open(self.path, "a", encoding="utf-8")
+        self.generation += 1
+        self._write_generation()
+        self.records = 0
+
+    def truncate(self) -> None:
+        """Discard every record and start the next generation, e.g. after the history was compacted into a snapshot."""
+        self._pending.clear()
+        self._file.seek(0)
+        self._file.truncate()
+        self.generation += 1
+        self._write_generation()
+        self.records = 0
+
+    def _write_generation(self) -> None:
+        """Write the generation record that starts the (empty) log file."""
+        self._file.write(json.dumps([GENERATION, self.generation]) + "\n")
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        """Flush pending records and close the file."""
+        self.flush()
+        self._file.close()
+
+def read_records(path: str) -> Iterator[list]:
+    """
+    Yield the records of a log file in order.
+
+    A torn final line (left by a crash in the middle of a write) is ignored. The generation record
+    comes first, except in logs written before generations were recorded.
+
+    Args:
+        path (str): The log file path.
+
+    Yields:
+        list: Each record as its tag followed by its fields.
+    """
+    with open(path, "r", encoding="utf-8") as file:
+        for line in file:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                return
+
+def log_path(snapshot_path: str) -> str:
+    """Return the write-ahead log path that belongs to a snapshot file."""
+    return snapshot_path + ".wal"
+
+def rotated_log_path(snapshot_path: str) -> str:
+    """Return the path a snapshot's log is rotated to while it is being compacted into the snapshot."""
+    return log_path(snapshot_path) + ".1"
+
+def existing_logs(snapshot_path: str) -> List[str]:
+    """Return the log paths of a snapshot that exist, in replay order: a rotated log first, then the log."""
+    return [path for path in (rotated_log_path(snapshot_path), log_path(snapshot_path)) if os.path.exists(path)]
@@ -0,0 +1,338 @@
+# app/loadtest/__init__.py
+
+import json
+import math
+import os
+import queue
+import random
+import resource
+import threading
+import time
+from array import array
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, TextIO, Union
+from app.calculator import Calculator, parse_command
+from app.operations.builtin import OPERATIONS
+from app.reduction import REDUCTIONS
+
+# Commands left out of a replay: they end the session or touch files (as do '@file' arguments, also skipped).
+SKIPPED_COMMANDS = frozenset(['exit', 'quit', 'save', 'load', 'pipeline'])
+# Events a replay reads ahead are handed to its threads in batches of this many, through queues of
+# at most REPLAY_QUEUE_BATCHES batches per thread, so a recording is streamed rather than loaded.
+REPLAY_BATCH = 256
+REPLAY_QUEUE_BATCHES = 64
+# Operation mix of generated workloads by default: command -> relative weight.
+DEFAULT_MIX = {'add': 4.0, 'subtract': 2.0, 'multiply': 2.0, 'divide': 1.0, 'history': 0.05, 'undo': 0.05}
+# Values passed to each reduction command in generated workloads.
+REDUCTION_VALUES = 5
+
+class Event(NamedTuple):
+    """A recorded command: seconds since the recording started, the session, and the command line."""
+    time: float
+    session: int
+    line: str
+
+class Recorder:
+    """Appends timestamped command lines to a recording, one JSON object per line.
+
+    Lines are written as they are recorded (buffered by the file), so a recording survives the
+    process being stopped. Recording is thread-safe.
+    """
+
+    def __init__(self, file: Union[str, TextIO]):
+        """
+        Open a recording.
+
+        Args:
+            file (Union[str, TextIO]): A path to create, or an open text file to write to.
+        """
+        self._owned = isinstance(file, str)
+        self._file = open(file, "w", encoding="utf-8") if self._owned else file
+        self._start = time.monotonic()
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def record(self, line: str, session: int = 0) -> None:
+        """
+        Record one command line, timestamped now.
+
+        Args:
+            line (str): The command line as the user or client sent it.
+            session (int): The session it belongs to, e.g. a server connection. Defaults to 0.
+        """
+        text = json.dumps({"t": round(time.monotonic() - self._start, 6), "session": session, "line": line})
+        with self._lock:
+            self._file.write(text + "\n")
+            self.count += 1
+
+    def close(self) -> None:
+        """Flush the recording, and close its file if the recorder opened it."""
+        with self._lock:
+            if self._owned:
+                self._file.close()
+            else:
+                self._file.flush()
+
+    def __enter__(self) -> "Recorder":
+        """Return the recorder."""
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        """Close the recorder."""
+        self.close()
+
+def read_recording(path: str) -> Iterator[Event]:
+    """
+    Lazily read the events of a recording.
+
+    Args:
+        path (str): A file written by Recorder or write_recording.
+
+    Yields:
+        Event: Each recorded command, in order.
+
+    Raises:
+        ValueError: If a line is not a recorded event.
+    """
+    with open(path, "r", encoding="utf-8") as file:
+        for number, text in enumerate(file, start=1):
+            if not text.strip():
+                continue
+            try:
+                fields = json.loads(text)
+                yield Event(float(fields["t"]), int(fields.get("session", 0)), str(fields["line"]))
+            except (ValueError, KeyError, TypeError):
+                raise ValueError(f"{path}:{number} is not a recorded event") from None
+
+def write_recording(events: Iterable[Event], path: str) -> int:
+    """
+    Write events to a recording file, e.g. a generated workload.
+
+    Returns:
+        int: The number of events written.
+    """
+    count = 0
+    with open(path, "w", encoding="utf-8") as file:
+        for event in events:
+            file.write(json.dumps({"t": round(event.time, 6), "session": event.session, "line": event.line}) + "\n")
+            count += 1
+    return count
+
+def generate(count: int, mix: Optional[Dict[str, float]] = None, error_rate: float = 0.0, rate: float = 1000.0,
+             sessions: int = 1, seed: Optional[int] = None) -> Iterator[Event]:
+    """
+    Generate a synthetic workload.
+
+    Commands are drawn from the mix by weight: operations get two random operands, reductions
+    REDUCTION_VALUES values, and any other command (e.g. 'history', 'undo') none. Arrivals follow a
+    Poisson process at the given rate, and each command goes to a random session.
+
+    Args:
+        count (int): The number of commands.
+        mix (Optional[Dict[str, float]]): Command -> relative weight. Defaults to DEFAULT_MIX.
+        error_rate (float): Fraction of commands replaced by a division by zero. Defaults to 0.
+        rate (float): Mean commands per second. Defaults to 1000.
+        sessions (int): The number of sessions. Defaults to 1.
+        seed (Optional[int]): Seed for a reproducible workload.
+
+    Yields:
+        Event: Each generated command, in time order.
+
+    Raises:
+        ValueError: If the mix is empty, has a negative weight, or the error rate is not in [0, 1].
+    """
+    mix = DEFAULT_MIX if mix is None else mix
+    if not mix or min(mix.values()) < 0 or not sum(mix.values()):
+        raise ValueError("The mix needs at least one command with a positive weight.")
+    if not 0 <= error_rate <= 1:
+        raise ValueError("The error rate must be between 0 and 1.")
+    generator = random.Random(seed)
+    commands, weights = list(mix), list(mix.values())
+    now = 0.0
+    for _ in range(count):
+        now += generator.expovariate(rate)
+        session = generator.randrange(sessions)
+        if generator.random() < error_rate:
+            yield Event(now, session, f"divide {generator.randint(1, 1000)} 0")
+            continue
+        command = generator.choices(commands, weights)[0]
+        if command in OPERATIONS:
+            line = f"{command} {generator.randint(-1000, 1000)} {generator.randint(1, 1000)}"
+        elif command in REDUCTIONS:
+            line = " ".join([command, *(str(generator.randint(-1000, 1000)) for _ in range(REDUCTION_VALUES))])
+        else:
+            line = command
+        yield Event(now, session, line)
+
+def parse_mix(text: str) -> Dict[str, float]:
+    """
+    Parse a mix written as 'add=4,divide=1,history=0.1'.
+
+    Raises:
+        ValueError: If an item is not command=weight.
+    """
+    mix = {}
+    for item in filter(None, text.split(",")):
+        command, separator, weight = item.partition("=")
+        if not separator:
+            raise ValueError(f"Invalid mix item '{item}'; expected command=weight.")
+        mix[command.strip().lower()] = float(weight)
+    return mix
+
+def resident_bytes() -> int:
+    """Return the current resident set size, or the peak size where the current one is unavailable."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def percentile(ordered: array, fraction: float) -> float:
+    """Return a percentile of sorted values by the nearest-rank method (0 for no values)."""
+    if not ordered:
+        return 0.0
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+class ReplayReport(NamedTuple):
+    """The outcome of a replay; latencies are of Calculator.execute_command, in microseconds."""
+    commands: int
+    errors: int
+    skipped: int
+    seconds: float
+    p50_us: float
+    p99_us: float
+    max_us: float
+    memory_growth: int  # Bytes of resident memory gained during the replay
+    max_lag: float      # Seconds the replay fell furthest behind the recorded schedule
+
+    @property
+    def throughput(self) -> float:
+        """Commands per second."""
+        return self.commands / self.seconds if self.seconds > 0 else 0.0
+
+    def format(self) -> str:
+        """Return the report as a few lines of text."""
+        return (f"{self.commands:,} commands ({self.errors:,} errors, {self.skipped:,} skipped) "
+                f"in {self.seconds:.3f} s: {self.throughput:,.0f} commands/s\n"
+                f"latency p50 {self.p50_us:,.1f} us, p99 {self.p99_us:,.1f} us, max {self.max_us:,.1f} us\n"
+                f"memory growth {self.memory_growth / (1 << 20):,.1f} MiB, "
+                f"max lag behind schedule {self.max_lag:.3f} s")
+
+def _skipped(line: str) -> bool:
+    """Return True if a command line is not replayed: blank, in SKIPPED_COMMANDS, or with an '@file' argument."""
+    words = line.split()
+    return not words or words[0].lower() in SKIPPED_COMMANDS or any(word.startswith("@") for word in words[1:])
+
+class _Worker(threading.Thread):
+    """Replays the events of some sessions in order, each session on its own calculator."""
+
+    def __init__(self, factory: Callable[[], Calculator], speed: float, start_time: float):
+        """Initialize a worker with an empty queue of event batches."""
+        super().__init__(daemon=True)
+        self.factory = factory
+        self.speed = speed
+        self.start_time = start_time
+        self.events: "queue.Queue[Optional[List[Event]]]" = queue.Queue(REPLAY_QUEUE_BATCHES)  # None: no more
+        self.latencies = array("q")  # Nanoseconds
+        self.errors = self.skipped = 0
+        self.max_lag = 0.0
+        self.failure: Optional[BaseException] = None
+
+    def run(self) -> None:
+        """Replay the queued events, waiting for each one's scheduled time unless the speed is 0."""
+        try:
+            calculators: Dict[int, Calculator] = {}
+            perf_counter_ns, latencies = time.perf_counter_ns, self.latencies
+            for batch in iter(self.events.get, None):
+                for event in batch:
+                    if self.speed:
+                        due = self.start_time + event.time / self.speed
+                        delay = due - time.perf_counter()
+                        if delay > 0:
+                            time.sleep(delay)
+                        else:
+                            self.max_lag = max(self.max_lag, -delay)
+                    if _skipped(event.line):
+                        self.skipped += 1
+                        continue
+                    calculator = calculators.get(event.session)
+                    if calculator is None:
+                        calculator = calculators[event.session] = self.factory()
+                    begin = perf_counter_ns()
+                    try:
+                        command, args = parse_command(event.line)
+                        output = calculator.execute_command(command, *args)
+                    except ValueError:
+                        output = "Error: Invalid input."
+                    latencies.append(perf_counter_ns() - begin)
+                    if isinstance(output, str) and output.startswith("Error"):
+                        self.errors += 1
+        except BaseException as e:  # Re-raised by replay in the calling thread
+            self.failure = e
+            for _ in iter(self.events.get, None):
+                pass  # Keep draining, so replay never blocks on this worker's full queue
+
+def replay(events: Iterable[Event], speed: float = 1.0, concurrency: int = 1,
+           factory: Callable[[], Calculator] = Calculator) -> ReplayReport:
+    """
+    Drive recorded or generated commands against calculators, and measure them.
+
+    Each session gets its own calculator, and its commands run in order on one of ``concurrency``
+    threads (sessions are spread across the threads), at their recorded times divided by the speed.
+    The events are read while the replay runs and handed to the threads through bounded queues, so
+    a long recording does not have to fit in memory. Blank lines, commands in SKIPPED_COMMANDS, and
+    commands with '@file' arguments are not run, so a replay never reads or writes files. Runs
+    offline; memory growth is read from /proc on Linux.
+
+    Args:
+        events (Iterable[Event]): The commands, e.g. from read_recording or generate.
+        speed (float): Speed multiplier: 2 replays twice as fast as recorded, 0 as fast as
+            possible. Defaults to 1.
+        concurrency (int): Threads replaying sessions at once. Defaults to 1.
+        factory (Callable[[], Calculator]): Creates each session's calculator. Defaults to Calculator.
+
+    Returns:
+        ReplayReport: Counts, throughput, latency percentiles, memory growth, and schedule lag.
+
+    Raises:
+        ValueError: If the speed is negative or the concurrency is less than 1.
+    """
+    if speed < 0 or concurrency < 1:
+        raise ValueError("The speed must be at least 0 and the concurrency at least 1.")
+    workers = [_Worker(factory, speed, 0.0) for _ in range(concurrency)]
+    memory_before = resident_bytes()
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start_time = start
+        worker.start()
+    batches: List[List[Event]] = [[] for _ in workers]
+    try:
+        for count, event in enumerate(events, start=1):
+            batches[event.session % concurrency].append(event)
+            if count % REPLAY_BATCH == 0:  # Hand every thread its events so far, so none waits on the reader
+                for worker, batch in zip(workers, batches):
+                    if batch:
+                        worker.events.put(batch)
+                batches = [[] for _ in workers]
+    finally:
+        for worker, batch in zip(workers, batches):
+            if batch:
+                worker.events.put(batch)
+            worker.events.put(None)
+    for worker in workers:
+        worker.join()
+    seconds = time.perf_counter() - start
+    memory_growth = resident_bytes() - memory_before
+    for worker in workers:
+        if worker.failure is not None:
+            raise worker.failure
+    latencies = array("q")
+    for worker in workers:
+        latencies.extend(worker.latencies)
+    latencies = array("q", sorted(latencies))
+    return ReplayReport(
+        commands=len(latencies), errors=sum(worker.errors for worker in workers),
+        skipped=sum(worker.skipped for worker in workers), seconds=seconds,
+        p50_us=percentile(latencies, 0.50) / 1000, p99_us=percentile(latencies, 0.99) / 1000,
+        max_us=(latencies[-1] / 1000 if latencies else 0.0), memory_growth=memory_growth,
+        max_lag=max(worker.max_lag for worker in workers),
+    )
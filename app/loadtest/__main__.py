@@ -0,0 +1,33 @@
+"""Record-and-replay load testing: python -m app.loadtest {generate,replay} ..."""
+import argparse
+import sys
+from app import loadtest
+
+def main(argv=None):
+    """Parse options, then generate a workload or replay a recording and print the report."""
+    parser = argparse.ArgumentParser(description="Generate workloads and replay recorded calculator sessions.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    generate = commands.add_parser("generate", help="write a synthetic workload as a recording")
+    generate.add_argument("output")
+    generate.add_argument("--count", type=int, default=100_000)
+    generate.add_argument("--mix", type=loadtest.parse_mix, help="e.g. add=4,divide=1,history=0.1")
+    generate.add_argument("--error-rate", type=float, default=0.0, help="fraction of divisions by zero")
+    generate.add_argument("--rate", type=float, default=1000.0, help="mean commands per second")
+    generate.add_argument("--sessions", type=int, default=1)
+    generate.add_argument("--seed", type=int)
+    replay = commands.add_parser("replay", help="replay a recording (from main.py or the server --record)")
+    replay.add_argument("recording")
+    replay.add_argument("--speed", type=float, default=1.0, help="speed multiplier; 0 for as fast as possible")
+    replay.add_argument("--concurrency", type=int, default=1, help="threads replaying sessions at once")
+    options = parser.parse_args(argv)
+    if options.command == "generate":
+        count = loadtest.write_recording(loadtest.generate(options.count, options.mix, options.error_rate,
+                                                           options.rate, options.sessions, options.seed),
+                                         options.output)
+        print(f"Wrote {count:,} commands to {options.output}.", file=sys.stderr)
+    else:
+        report = loadtest.replay(loadtest.read_recording(options.recording), options.speed, options.concurrency)
+        print(report.format())
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,40 @@
 from abc import ABC, abstractmethod
-from typing import Union
+from array import array
+from typing import Any, Callable, Union
+
+def as_float_array(values: Any) -> Union[array, memoryview]:
+    """
+    Coerce an operand column into a flat float64 sequence with a single conversion pass.
+
+    Buffers that already hold float64 data (``array('d')``, NumPy ``float64`` arrays, ...) are
+    returned as a zero-copy ``memoryview``; anything else is converted with ``array('d', values)``.
+
+    Args:
+        values (Any): A buffer or iterable of numbers.
+
+    Returns:
+        Union[array, memoryview]: A float64 sequence over the operands.
+
+    Raises:
+        TypeError: If the values cannot be interpreted as numbers.
+    """
+    try:
+        view = memoryview(values)
+    except TypeError:
+        view = None
+    if view is not None and view.format == "d" and view.ndim == 1:
+        return view
+    try:
+        return array("d", values)
+    except TypeError as exc:
+        raise TypeError(f"Invalid batch operand: {exc}. Expected a sequence of int or float.") from exc
 
 class Operation(ABC):
     """Abstract base class representing a generic operation for a calculator."""
 
+    # Element-wise function used by calculate_many; set by subclasses that support batches.
+    _operator: Callable[[float, float], float] = None
+
     def _validate_inputs(self, operand1: Union[int, float], operand2: Union[int, float]) -> None:
         """
         Validate that both inputs are of type int or float.
@@ -21,6 +52,27 @@ class Operation(ABC):
                 "Expected int or float."
             )
 
+    def _validate_batch(self, operands1: Any, operands2: Any):
+        """
+        Convert two operand columns to float64 sequences and check that their lengths match.
+
+        Args:
+            operands1 (Any): The first operand column.
+            operands2 (Any): The second operand column.
+
+        Returns:
+            tuple: The two columns as float64 sequences.
+
+        Raises:
+            ValueError: If the columns have different lengths.
+        """
+        column1, column2 = as_float_array(operands1), as_float_array(operands2)
+        if len(column1) != len(column2):
+            raise ValueError(
+                f"Batch operands must have the same length, got {len(column1)} and {len(column2)}."
+            )
+        return column1, column2
+
     @abstractmethod
     def calculate(self, operand1: Union[int, float], operand2: Union[int, float]) -> float:
         """
@@ -36,3 +88,24 @@ class Operation(ABC):
         """
         pass  # This is an abstract method, to be defined in subclasses
 
+    def calculate_many(self, operands1: Any, operands2: Any) -> array:
+        """
+        Perform the calculation element-wise over two operand columns in one pass.
+
+        Inputs are validated once per batch instead of once per pair, and the loop runs
+        through ``map`` over the subclass' ``_operator`` so no Python frame is entered per element.
+
+        Args:
+            operands1 (Any): A buffer or iterable of first operands.
+            operands2 (Any): A buffer or iterable of second operands, of the same length.
+
+        Returns:
+            array: A float64 array holding one result per operand pair.
+
+        Raises:
+            NotImplementedError: If the operation does not define an element-wise operator.
+        """
+        if self._operator is None:
+            raise NotImplementedError(f"{self.__class__.__name__} does not support batch calculation.")
+        column1, column2 = self._validate_batch(operands1, operands2)
+        return array("d", map(self._operator, column1, column2))
@@ -1,11 +1,14 @@
 # app/operations/addition.py
 
+import operator
 from app.operations import Operation
 from typing import Union
 
 class Addition(Operation):
     """Performs the addition of two numbers, inheriting from the base Operation class."""
 
+    _operator = staticmethod(operator.add)
+
     def calculate(self, a: Union[int, float], b: Union[int, float]) -> float:
         """
         Calculate the sum of two numbers after validating them.
@@ -0,0 +1,12 @@
+# app/operations/builtin.py
+
+from app.operations.registry import OperationRegistry
+
+# Operations are stateless, so every Calculator, worker, and session shares these instances. Each
+# is imported on first use; more can be added with OPERATIONS.register or through entry points
+# (see app.operations.registry).
+OPERATIONS = OperationRegistry()
+OPERATIONS.register('add', 'app.operations.addition:Addition')
+OPERATIONS.register('subtract', 'app.operations.subtraction:Subtraction')
+OPERATIONS.register('multiply', 'app.operations.multiplication:Multiplication')
+OPERATIONS.register('divide', 'app.operations.division:Division')
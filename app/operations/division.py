@@ -1,7 +1,24 @@
 # app/operations/division.py
 
-from app.operations import Operation
-from typing import Union
+import math
+from array import array
+from typing import Any, Union
+from app.operations import Operation, as_float_array
+
+# Policies accepted by Division.calculate_many for zero divisors.
+ZERO_POLICIES = ("ieee", "nan", "raise")
+
+def _ieee_divide(a: float, b: float) -> float:
+    """Divide following IEEE 754 semantics: x/0 is +/-inf and 0/0 is NaN."""
+    if b == 0:
+        if a == 0 or math.isnan(a):
+            return math.nan
+        return math.copysign(math.inf, a) * math.copysign(1.0, b)
+    return a / b
+
+def _nan_divide(a: float, b: float) -> float:
+    """Divide, mapping every zero divisor to NaN."""
+    return a / b if b != 0 else math.nan
 
 class Division(Operation):
     """Performs division of two numbers, inheriting from the base Operation class."""
@@ -32,3 +49,40 @@ class Division(Operation):
         
         return result
 
+    def calculate_many(self, operands1: Any, operands2: Any, zero_policy: str = "ieee") -> array:
+        """
+        Divide two operand columns element-wise in one pass.
+
+        Args:
+            operands1 (Any): A buffer or iterable of numerators.
+            operands2 (Any): A buffer or iterable of denominators, of the same length.
+            zero_policy (str): How zero divisors are handled: 'ieee' yields +/-inf (NaN for 0/0),
+                'nan' yields NaN, and 'raise' rejects the whole batch. Defaults to 'ieee'.
+
+        Returns:
+            array: A float64 array holding one quotient per operand pair.
+
+        Raises:
+            ValueError: If the policy is unknown, or if it is 'raise' and any divisor is zero.
+        """
+        if zero_policy not in ZERO_POLICIES:
+            raise ValueError(f"Unknown zero policy '{zero_policy}'. Expected one of {', '.join(ZERO_POLICIES)}.")
+        column1, column2 = self._validate_batch(operands1, operands2)
+        if 0.0 not in column2:
+            return array("d", map(float.__truediv__, column1, column2))
+        if zero_policy == "raise":
+            raise ValueError("Division by zero is undefined.")
+        divide = _ieee_divide if zero_policy == "ieee" else _nan_divide
+        return array("d", map(divide, column1, column2))
+
+    def zero_divisor_mask(self, operands2: Any) -> bytearray:
+        """
+        Flag the zero divisors of a batch.
+
+        Args:
+            operands2 (Any): A buffer or iterable of denominators.
+
+        Returns:
+            bytearray: One byte per divisor, 1 where the divisor is zero and 0 otherwise.
+        """
+        return bytearray(map((0.0).__eq__, as_float_array(operands2)))
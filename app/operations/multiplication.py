@@ -1,11 +1,14 @@
 # app/operations/multiplication.py
 
+import operator
 from app.operations import Operation
 from typing import Union
 
 class Multiplication(Operation):
     """Performs multiplication of two numbers, inheriting from the base Operation class."""
 
+    _operator = staticmethod(operator.mul)
+
     def calculate(self, a: Union[int, float], b: Union[int, float]) -> float:
         """
         Calculate the product of two numbers after validating inputs.
@@ -0,0 +1,148 @@
+# app/operations/registry.py
+
+import importlib
+import threading
+from collections.abc import Mapping
+from typing import Callable, Dict, Iterator, Optional, Union
+from app.operations import Operation
+
+# Entry point group that installed packages use to provide operations, e.g. in pyproject.toml:
+#     [project.entry-points."calculator.operations"]
+#     power = "inhouse.power:Power"
+ENTRY_POINT_GROUP = "calculator.operations"
+
+Target = Union[str, type, Operation]
+
+class OperationRegistry(Mapping):
+    """A mapping of command names to shared Operation instances that imports each operation on first use.
+
+    Operations register under a name as a 'module:Class' string, an Operation subclass, or an
+    instance; ``register`` also works as a class decorator. String targets and entry points are
+    only imported when their name is first looked up, and entry points are only discovered when a
+    name is not already registered (or the names are listed), so the number of registered
+    operations does not affect startup time.
+    """
+
+    def __init__(self, entry_point_group: Optional[str] = ENTRY_POINT_GROUP):
+        """
+        Initialize an empty registry.
+
+        Args:
+            entry_point_group (Optional[str]): Entry point group to discover operations from, or
+                None to disable discovery. Defaults to ENTRY_POINT_GROUP.
+        """
+        self._operations: Dict[str, Operation] = {}              # Loaded instances
+        self._factories: Dict[str, Callable[[], Operation]] = {}  # Registered but not loaded yet
+        self._class_names: Dict[str, str] = {}                   # Known without importing the class
+        self._entry_point_group = entry_point_group
+        self._discovered = entry_point_group is None
+        self._lock = threading.RLock()  # Reentrant: importing an operation may register others
+
+    def register(self, name: str, target: Optional[Target] = None):
+        """
+        Register an operation under a command name, replacing any previous registration.
+
+        Args:
+            name (str): The command name, e.g. 'power'.
+            target (Optional[Target]): A 'module:Class' string, an Operation subclass, or an
+                instance. If omitted, returns a decorator that registers the decorated class.
+
+        Returns:
+            The target (so the method can be used as a class decorator), or the decorator.
+        """
+        if target is None:
+            return lambda cls: self.register(name, cls)
+        with self._lock:
+            self._operations.pop(name, None)
+            if isinstance(target, Operation):
+                self._operations[name] = target
+                self._class_names[name] = type(target).__name__
+            elif isinstance(target, str):
+                module, _, attribute = target.partition(":")
+                self._factories[name] = lambda: getattr(importlib.import_module(module), attribute)()
+                self._class_names[name] = attribute
+            else:
+                self._factories[name] = target
+                self._class_names[name] = target.__name__
+        return target
+
+    def unregister(self, name: str) -> None:
+        """
+        Remove the operation registered under a name.
+
+        Raises:
+            KeyError: If no operation is registered under the name.
+        """
+        self._discover()
+        with self._lock:
+            del self._class_names[name]
+            self._operations.pop(name, None)
+            self._factories.pop(name, None)
+
+    def __getitem__(self, name: str) -> Operation:
+        """
+        Return the shared Operation registered under a name, importing it on first use.
+
+        Raises:
+            KeyError: If no operation is registered under the name.
+        """
+        operation = self._operations.get(name)
+        if operation is not None:
+            return operation
+        if name not in self._factories:
+            self._discover()
+        with self._lock:
+            if name in self._operations:  # Loaded by another thread meanwhile
+                return self._operations[name]
+            factory = self._factories.get(name)
+            if factory is None:
+                raise KeyError(name)
+            operation = self._operations[name] = factory()
+            del self._factories[name]
+        return operation
+
+    def __contains__(self, name) -> bool:
+        """Return True if an operation is registered under a name, without importing it."""
+        if name in self._operations or name in self._factories:
+            return True
+        self._discover()
+        return name in self._operations or name in self._factories
+
+    def __iter__(self) -> Iterator[str]:
+        """Iterate over the registered names, without importing the operations."""
+        self._discover()
+        return iter(list(self._class_names))
+
+    def __len__(self) -> int:
+        """Return the number of registered operations."""
+        self._discover()
+        return len(self._class_names)
+
+    def find(self, class_name: str) -> Optional[Operation]:
+        """
+        Return the registered operation whose class has a given name, importing only that one.
+
+        Args:
+            class_name (str): The class name, as stored by ``Calculation.to_dict`` (e.g. 'Power').
+
+        Returns:
+            Optional[Operation]: The operation, or None if no registered operation has that class name.
+        """
+        for name in self:
+            if self._class_names[name] == class_name:
+                return self[name]
+        return None
+
+    def _discover(self) -> None:
+        """Register the operations provided through entry points, once; explicit registrations win."""
+        if self._discovered:
+            return
+        from importlib import metadata  # Deferred: importing it costs more than a typical startup
+        with self._lock:
+            if self._discovered:
+                return
+            for entry_point in metadata.entry_points(group=self._entry_point_group):
+                if entry_point.name not in self._class_names:
+                    self._factories[entry_point.name] = lambda entry_point=entry_point: entry_point.load()()
+                    self._class_names[entry_point.name] = entry_point.attr.rpartition(".")[2]
+            self._discovered = True
@@ -1,11 +1,14 @@
 # app/operations/subtraction.py
 
+import operator
 from app.operations import Operation
 from typing import Union
 
 class Subtraction(Operation):
     """Performs the subtraction of one number from another."""
 
+    _operator = staticmethod(operator.sub)
+
     def calculate(self, minuend: Union[int, float], subtrahend: Union[int, float]) -> float:
         """
         Calculate the difference between two numbers.
@@ -0,0 +1,109 @@
+# app/parallel/__init__.py
+
+import itertools
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
+from app.operations.builtin import OPERATIONS
+
+Job = Tuple[str, Union[int, float], Union[int, float]]
+Outcome = Union[int, float, str]  # A result, or an "Error: ..." message
+
+def evaluate_chunk(jobs: List[Job]) -> List[Outcome]:
+    """
+    Evaluate a chunk of jobs in the current process.
+
+    Args:
+        jobs (List[Job]): (command, operand1, operand2) tuples.
+
+    Returns:
+        List[Outcome]: One result or error message per job, in order.
+    """
+    outcomes = []
+    for command, operand1, operand2 in jobs:
+        operation = OPERATIONS.get(command)
+        if operation is None:
+            outcomes.append("Error: Unknown command.")
+            continue
+        try:
+            outcomes.append(operation.calculate(operand1, operand2))
+        except Exception as e:
+            outcomes.append(f"Error: {str(e)}")
+    return outcomes
+
+def chunked(jobs: Iterable[Job], chunk_size: int) -> Iterator[List[Job]]:
+    """Split an iterable of jobs into lists of at most chunk_size jobs."""
+    iterator = iter(jobs)
+    while True:
+        chunk = list(itertools.islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+class ParallelEngine:
+    """Evaluates large streams of calculation jobs across a pool of worker processes."""
+
+    def __init__(self, workers: Optional[int] = None, chunk_size: int = 10_000, max_pending: Optional[int] = None):
+        """
+        Initialize the engine.
+
+        Args:
+            workers (Optional[int]): Number of worker processes. Defaults to the number of CPUs.
+            chunk_size (int): Number of jobs sent to a worker at a time. Defaults to 10,000.
+            max_pending (Optional[int]): Maximum number of chunks in flight, which bounds memory when
+                jobs come from a stream. Defaults to twice the number of workers.
+        """
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1.")
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.max_pending = max_pending
+
+    def map_chunks(self, jobs: Iterable[Job]) -> Iterator[Tuple[List[Job], List[Outcome]]]:
+        """
+        Evaluate jobs in parallel, yielding each chunk of jobs with its outcomes in input order.
+
+        Args:
+            jobs (Iterable[Job]): A list or stream of (command, operand1, operand2) tuples.
+
+        Yields:
+            Tuple[List[Job], List[Outcome]]: A chunk of jobs and the outcome of each.
+        """
+        workers = self.workers or os.cpu_count() or 1
+        max_pending = self.max_pending or 2 * workers
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            pending = deque()
+            for chunk in chunked(jobs, self.chunk_size):
+                pending.append((chunk, executor.submit(evaluate_chunk, chunk)))
+                if len(pending) >= max_pending:
+                    chunk, future = pending.popleft()
+                    yield chunk, future.result()
+            while pending:
+                chunk, future = pending.popleft()
+                yield chunk, future.result()
+
+    def map(self, jobs: Iterable[Job]) -> Iterator[Outcome]:
+        """
+        Evaluate jobs in parallel, yielding outcomes in input order.
+
+        Args:
+            jobs (Iterable[Job]): A list or stream of (command, operand1, operand2) tuples.
+
+        Yields:
+            Outcome: The result of each job, or its "Error: ..." message.
+        """
+        for _, outcomes in self.map_chunks(jobs):
+            yield from outcomes
+
+    def run(self, jobs: Iterable[Job]) -> List[Outcome]:
+        """
+        Evaluate jobs in parallel and collect the outcomes.
+
+        Args:
+            jobs (Iterable[Job]): A list or stream of (command, operand1, operand2) tuples.
+
+        Returns:
+            List[Outcome]: The outcome of each job, in input order.
+        """
+        return list(self.map(jobs))
@@ -0,0 +1,294 @@
+# app/pipeline/__init__.py
+
+import ast
+import itertools
+import mmap
+import operator
+import struct
+import sys
+from array import array
+from typing import Iterator, Optional, Sequence, Tuple
+from app.operations import Operation
+
+# Rows per chunk: each column chunk is 512 KiB of float64, so memory stays bounded for any file size.
+CHUNK_ROWS = 1 << 16
+# Extensions of the binary formats; any other file is read and written as CSV.
+NPY_EXTENSIONS = (".npy",)
+RAW_EXTENSIONS = (".f64", ".raw")
+
+NPY_MAGIC = b"\x93NUMPY"
+# Written .npy headers are padded to this size, so the row count can be filled in after streaming.
+NPY_HEADER_BYTES = 128
+_LITTLE_ENDIAN = sys.byteorder == "little"
+
+Chunk = Tuple[Sequence[float], ...]
+
+def _kind(path: str) -> str:
+    """Return 'npy', 'raw', or 'csv' for a file name."""
+    lower = path.lower()
+    if lower.endswith(NPY_EXTENSIONS):
+        return "npy"
+    if lower.endswith(RAW_EXTENSIONS):
+        return "raw"
+    return "csv"
+
+def _npy_layout(mapped: mmap.mmap) -> Tuple[int, bool, Tuple[int, ...], bool]:
+    """
+    Parse the header of a mapped .npy file.
+
+    Returns:
+        Tuple[int, bool, Tuple[int, ...], bool]: The data offset, whether the data is little-endian,
+        the shape, and whether it is stored in Fortran (column-major) order.
+
+    Raises:
+        ValueError: If the file is not a float64 .npy file.
+    """
+    if mapped[:6] != NPY_MAGIC:
+        raise ValueError("not a .npy file")
+    if mapped[6] == 1:
+        (header_length,), start = struct.unpack_from("<H", mapped, 8), 10
+    else:
+        (header_length,), start = struct.unpack_from("<I", mapped, 8), 12
+    header = ast.literal_eval(mapped[start:start + header_length].decode("latin-1"))
+    descr = header["descr"]
+    if descr not in ("<f8", ">f8", "=f8"):
+        raise ValueError(f"unsupported .npy dtype '{descr}'; expected float64")
+    little_endian = descr == "<f8" or (descr == "=f8" and _LITTLE_ENDIAN)
+    return start + header_length, little_endian, tuple(header["shape"]), bool(header["fortran_order"])
+
+def _swapped(data: memoryview) -> array:
+    """Copy float64 values of the other byte order into a native array."""
+    values = array("d")
+    values.frombytes(data)
+    values.byteswap()
+    return values
+
+def _mapped_chunks(path: str, columns: Sequence[int], chunk_rows: int) -> Iterator[Chunk]:
+    """Yield column chunks of a .npy or raw float64 file as views of the mapped file, without copying."""
+    with open(path, "rb") as file:
+        if not file.seek(0, 2):
+            return  # Empty raw file; mmap cannot map zero bytes
+        mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        if _kind(path) == "npy":
+            offset, little_endian, shape, fortran_order = _npy_layout(mapped)
+            rows, width = shape[0] if shape else 1, shape[1] if len(shape) > 1 else 1
+        else:
+            offset, little_endian, fortran_order = 0, True, False
+            width = 2 if len(columns) > 1 else 1  # Raw files hold pairs interleaved, or one column
+            rows = (len(mapped) // 8) // width
+        if max(columns) >= width:
+            raise ValueError(f"{path} has {width} column(s); column {max(columns)} requested")
+        data = memoryview(mapped)[offset:offset + rows * width * 8]
+        values = data.cast("d") if little_endian == _LITTLE_ENDIAN else None  # None: copy and swap chunks
+        for first in range(0, rows, chunk_rows):
+            last = min(first + chunk_rows, rows)
+            if fortran_order:  # Each column is contiguous
+                if values is None:
+                    yield tuple(_swapped(data[(column * rows + first) * 8:(column * rows + last) * 8])
+                                for column in columns)
+                else:
+                    yield tuple(values[column * rows + first:column * rows + last] for column in columns)
+            else:  # Rows are contiguous, so each column is a strided view
+                block = _swapped(data[first * width * 8:last * width * 8]) if values is None else values
+                start = 0 if values is None else first * width
+                yield tuple(block[start + column:start + (last - first) * width:width] for column in columns)
+    finally:
+        try:
+            mapped.close()
+        except BufferError:
+            pass  # A consumer still holds a chunk view; the mapping closes when it is released
+
+def _csv_chunks(path: str, columns: Sequence[int], chunk_rows: int) -> Iterator[Chunk]:
+    """Yield column chunks of a CSV file, parsing a block of lines at a time; a header row is skipped."""
+    width = max(columns) + 1
+    with open(path, "r", encoding="utf-8", newline="") as file:
+        lines = iter(file)
+        first_line = next(lines, None)
+        if first_line is None:
+            return
+        header = _is_header(first_line)
+        pending = [] if header else [first_line]  # A malformed data row fails below
+        number = 2 if header else 1  # The line number of the block's first line
+        fields = None  # Fields per row, set by the first data row
+        while True:
+            block = pending + list(itertools.islice(lines, chunk_rows - len(pending)))
+            pending = []
+            if not block:
+                return
+            if fields is None:
+                fields = next((line.count(",") + 1 for line in block if line.strip()), None)
+            yield _parse_rows(block, columns, width, fields, number)
+            number += len(block)
+
+def _is_header(line: str) -> bool:
+    """Return True if a CSV line has no numeric field, as a header row."""
+    for field in line.split(","):
+        try:
+            float(field)
+            return False
+        except ValueError:
+            pass
+    return True
+
+def _parse_rows(lines: Sequence[str], columns: Sequence[int], width: int, fields: Optional[int],
+                number: int) -> Chunk:
+    """
+    Parse CSV lines into float64 columns, with a fast path for files of exactly the needed columns.
+
+    Args:
+        lines (Sequence[str]): The lines; blank ones are skipped.
+        columns (Sequence[int]): Indexes of the columns to parse.
+        width (int): max(columns) + 1.
+        fields (Optional[int]): The number of fields every row must have (None if every line is blank).
+        number (int): The line number of the first line, for errors.
+
+    Raises:
+        ValueError: If a row has a different number of fields, lacks a column, or holds a non-number.
+    """
+    # Fast path: every line has exactly ``width`` fields, each holding one number
+    if fields == width and set(map(operator.methodcaller("count", ","), lines)) == {width - 1}:
+        values = array("d")
+        try:
+            values.extend(map(float, "".join(lines).replace(",", " ").split()))
+        except ValueError:
+            pass  # The slow path finds the line
+        if len(values) == len(lines) * width:
+            return tuple(memoryview(values)[column::width] for column in columns)
+    result = tuple(array("d") for _ in columns)
+    for number, line in enumerate(lines, number):
+        if not line.strip():
+            continue
+        row = line.split(",")
+        try:
+            values = [float(row[column]) for column in columns] if len(row) == fields else None
+        except (ValueError, IndexError):
+            values = None
+        if values is None:
+            # The line number only: the row itself may hold data that should not end up in logs
+            raise ValueError(f"Invalid CSV row at line {number}.")
+        for value, target in zip(values, result):
+            target.append(value)
+    return result
+
+def read_columns(path: str, columns: Sequence[int] = (0, 1), chunk_rows: int = CHUNK_ROWS) -> Iterator[Chunk]:
+    """
+    Stream columns of a numeric file in chunks of rows.
+
+    .npy (float64, 1-D or 2-D) and raw float64 files (.f64/.raw: little-endian, two columns
+    interleaved or one column) are memory-mapped, and each chunk is a view of the file, not a
+    copy. Other files are parsed as CSV one block of lines at a time.
+
+    Args:
+        path (str): The file to read.
+        columns (Sequence[int]): Indexes of the columns to read. Defaults to (0, 1).
+        chunk_rows (int): Rows per chunk. Defaults to CHUNK_ROWS.
+
+    Yields:
+        Chunk: One float64 sequence per requested column, of equal lengths.
+
+    Raises:
+        ValueError: If the file is malformed or lacks a requested column.
+    """
+    if _kind(path) == "csv":
+        return _csv_chunks(path, columns, chunk_rows)
+    return _mapped_chunks(path, columns, chunk_rows)
+
+def read_operands(path: str, path2: Optional[str] = None, columns: Sequence[int] = (0, 1),
+                  chunk_rows: int = CHUNK_ROWS) -> Iterator[Tuple[Sequence[float], Sequence[float]]]:
+    """
+    Stream chunks of operand pairs from one two-column file, or from two one-column files.
+
+    Args:
+        path (str): The file of first operands (or of both columns, if path2 is omitted).
+        path2 (Optional[str]): A file of second operands. Each file's first column is read.
+        columns (Sequence[int]): The two operand columns when path2 is omitted. Defaults to (0, 1).
+        chunk_rows (int): Rows per chunk. Defaults to CHUNK_ROWS.
+
+    Yields:
+        Tuple[Sequence[float], Sequence[float]]: Chunks of first and second operands.
+
+    Raises:
+        ValueError: If the two files hold different numbers of rows.
+    """
+    if path2 is None:
+        yield from read_columns(path, columns, chunk_rows)
+        return
+    first, second = read_columns(path, (0,), chunk_rows), read_columns(path2, (0,), chunk_rows)
+    for chunk1, chunk2 in itertools.zip_longest(first, second):
+        if chunk1 is None or chunk2 is None or len(chunk1[0]) != len(chunk2[0]):
+            raise ValueError(f"{path} and {path2} hold different numbers of rows")
+        yield chunk1[0], chunk2[0]
+        del chunk1, chunk2  # Let each file be unmapped as soon as it is exhausted
+
+class ResultWriter:
+    """Streams a float64 result column to a .npy, raw float64 (.f64/.raw), or CSV file."""
+
+    def __init__(self, path: str):
+        """
+        Open the output file.
+
+        Args:
+            path (str): The file to write; its extension selects the format.
+        """
+        self.path = path
+        self.kind = _kind(path)
+        self.count = 0
+        self._file = open(path, "wb")
+        if self.kind == "npy":
+            self._file.write(bytes(NPY_HEADER_BYTES))  # Filled in by close, once the count is known
+
+    def write(self, results: array) -> None:
+        """Append a chunk of results."""
+        self.count += len(results)
+        if self.kind == "csv":
+            self._file.write("".join(f"{value!r}\n" for value in results).encode())
+        elif _LITTLE_ENDIAN:
+            results.tofile(self._file)
+        else:
+            swapped = array("d", results)
+            swapped.byteswap()
+            swapped.tofile(self._file)
+
+    def close(self) -> None:
+        """Complete the file header, if any, and close the file."""
+        if self.kind == "npy":
+            header = f"{{'descr': '<f8', 'fortran_order': False, 'shape': ({self.count},), }}"
+            header = header.ljust(NPY_HEADER_BYTES - 10 - 1) + "\n"
+            self._file.seek(0)
+            self._file.write(NPY_MAGIC + bytes([1, 0]) + struct.pack("<H", len(header)) + header.encode("latin-1"))
+        self._file.close()
+
+    def __enter__(self) -> "ResultWriter":
+        """Return the writer."""
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        """Close the writer."""
+        self.close()
+
+def run(operation: Operation, path: str, output: str, path2: Optional[str] = None,
+        columns: Sequence[int] = (0, 1), chunk_rows: int = CHUNK_ROWS, **options) -> int:
+    """
+    Apply an operation to the operand columns of large files and stream the results to a file.
+
+    Only one chunk of operands and results is in memory at a time, and binary inputs are read
+    through views of the mapped files.
+
+    Args:
+        operation (Operation): The operation to apply with ``calculate_many``.
+        path (str): The operand file (see read_operands).
+        output (str): The result file; '.npy', '.f64'/'.raw', or CSV.
+        path2 (Optional[str]): A separate file of second operands.
+        columns (Sequence[int]): The operand columns. Defaults to (0, 1).
+        chunk_rows (int): Rows per chunk. Defaults to CHUNK_ROWS.
+        **options: Extra options for ``calculate_many`` (e.g. zero_policy='nan' for division).
+
+    Returns:
+        int: The number of results written.
+    """
+    with ResultWriter(output) as writer:
+        for operands1, operands2 in read_operands(path, path2, columns, chunk_rows):
+            writer.write(operation.calculate_many(operands1, operands2, **options))
+            del operands1, operands2  # Release the views before the file is unmapped
+        return writer.count
@@ -0,0 +1,29 @@
+"""Run an operation over a numeric file: python -m app.pipeline OPERATION INPUT OUTPUT [--input2 FILE]."""
+import argparse
+import os
+import sys
+import time
+from app import pipeline
+from app.operations.builtin import OPERATIONS
+
+def main(argv=None):
+    """Parse options, stream the results to the output file, and report the throughput."""
+    parser = argparse.ArgumentParser(description="Apply an operation to every row of a CSV, .npy, or raw float64 file.")
+    parser.add_argument("operation", help="e.g. add, divide")
+    parser.add_argument("input")
+    parser.add_argument("output", help="'.npy', '.f64'/'.raw', or CSV")
+    parser.add_argument("--input2", help="a file of second operands")
+    parser.add_argument("--columns", default="0,1", help="operand columns of a two-column input")
+    parser.add_argument("--chunk-rows", type=int, default=pipeline.CHUNK_ROWS)
+    parser.add_argument("--zero-policy", help="division by zero: ieee, nan, or raise")
+    options = parser.parse_args(argv)
+    extra = {"zero_policy": options.zero_policy} if options.zero_policy else {}
+    start = time.perf_counter()
+    count = pipeline.run(OPERATIONS[options.operation], options.input, options.output, options.input2,
+                         tuple(int(column) for column in options.columns.split(",")), options.chunk_rows, **extra)
+    seconds = time.perf_counter() - start
+    size = os.path.getsize(options.input) + (os.path.getsize(options.input2) if options.input2 else 0)
+    print(f"{count:,} rows in {seconds:.2f} s ({size / seconds / 1e6:,.0f} MB/s read)", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
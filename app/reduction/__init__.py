@@ -0,0 +1,266 @@
+# app/reduction/__init__.py
+
+import math
+import re
+from abc import ABC, abstractmethod
+from typing import Dict, Iterable, Iterator, TextIO, Type, Union
+
+Number = Union[int, float]
+
+# Separators between numbers in a values file: whitespace and/or commas.
+_SEPARATOR = re.compile(r"[\s,]+")
+
+def _invalid(value) -> TypeError:
+    """Return the error raised for a value that is not a number (bools are not numbers here)."""
+    return TypeError(f"Invalid input type: {type(value).__name__}. Expected int or float.")
+
+class Reduction(ABC):
+    """A streaming reduction over a sequence of numbers, in one pass with constant memory.
+
+    Values are fed with ``update`` (any iterable, including generators and files read lazily) and
+    the reduction of everything seen so far is available from ``result`` at any time.
+    """
+
+    name = ""
+
+    def __init__(self):
+        """Initialize an empty reduction."""
+        self.count = 0
+
+    @abstractmethod
+    def update(self, values: Iterable[Number]) -> "Reduction":
+        """
+        Feed more values into the reduction.
+
+        Args:
+            values (Iterable[Number]): The values, consumed once.
+
+        Returns:
+            Reduction: This reduction, so calls can be chained.
+
+        Raises:
+            TypeError: If a value is not an int or float (bool included).
+        """
+
+    @abstractmethod
+    def result(self) -> Number:
+        """
+        Return the reduction of the values seen so far.
+
+        Raises:
+            ValueError: If too few values have been seen.
+        """
+
+    def _require(self, count: int) -> None:
+        """Raise ValueError unless at least `count` values have been seen."""
+        if self.count < count:
+            plural = "value" if count == 1 else "values"
+            raise ValueError(f"{self.name} requires at least {count} {plural}.")
+
+class Sum(Reduction):
+    """Sums values with Neumaier's compensated summation; ints are summed exactly."""
+
+    name = "sum"
+
+    def __init__(self):
+        """Initialize an empty sum."""
+        super().__init__()
+        self.integer_total = 0   # Exact sum of the int values
+        self.float_total = 0.0   # Running sum of the float values
+        self.compensation = 0.0  # Low-order bits lost from float_total
+        self.has_floats = False
+
+    def update(self, values: Iterable[Number]) -> "Sum":
+        """Feed more values into the sum; see Reduction.update."""
+        integer_total, total, compensation = self.integer_total, self.float_total, self.compensation
+        count, has_floats = self.count, self.has_floats
+        try:
+            for value in values:
+                if isinstance(value, float):
+                    has_floats = True
+                    new_total = total + value
+                    # Once the total is infinite or NaN it is the result (inf - inf would make the compensation NaN)
+                    if math.isfinite(new_total):
+                        if abs(total) >= abs(value):
+                            compensation += (total - new_total) + value
+                        else:
+                            compensation += (value - new_total) + total
+                    total = new_total
+                elif isinstance(value, int) and not isinstance(value, bool):
+                    integer_total += value
+                else:
+                    raise _invalid(value)
+                count += 1
+        finally:
+            self.integer_total, self.float_total, self.compensation = integer_total, total, compensation
+            self.count, self.has_floats = count, has_floats
+        return self
+
+    def result(self) -> Number:
+        """Return the sum: an int if every value was an int, else a float."""
+        if not self.has_floats:
+            return self.integer_total
+        return self._total()
+
+    def _total(self) -> float:
+        """Return the float sum of every value, or the infinite or NaN float total if it has one."""
+        if not math.isfinite(self.float_total):
+            return self.float_total
+        return (self.float_total + self.compensation) + self.integer_total
+
+class Mean(Sum):
+    """Averages values using the compensated sum."""
+
+    name = "mean"
+
+    def result(self) -> float:
+        """Return the arithmetic mean."""
+        self._require(1)
+        if not self.has_floats:
+            return self.integer_total / self.count
+        return self._total() / self.count
+
+class Product(Reduction):
+    """Multiplies values; ints are multiplied exactly."""
+
+    name = "product"
+
+    def __init__(self):
+        """Initialize an empty product."""
+        super().__init__()
+        self.total: Number = 1
+
+    def update(self, values: Iterable[Number]) -> "Product":
+        """Feed more values into the product; see Reduction.update."""
+        total, count = self.total, 0
+        try:
+            for value in values:
+                if not isinstance(value, (int, float)) or isinstance(value, bool):
+                    raise _invalid(value)
+                total *= value
+                count += 1
+        finally:
+            self.total, self.count = total, self.count + count
+        return self
+
+    def result(self) -> Number:
+        """Return the product (1 for no values)."""
+        return self.total
+
+class Variance(Reduction):
+    """Computes the sample variance with Welford's online algorithm."""
+
+    name = "variance"
+
+    def __init__(self):
+        """Initialize an empty variance."""
+        super().__init__()
+        self.mean = 0.0
+        self.squared_deviations = 0.0  # Sum of squared differences from the running mean
+
+    def update(self, values: Iterable[Number]) -> "Variance":
+        """Feed more values into the variance; see Reduction.update."""
+        count, mean, squared_deviations = self.count, self.mean, self.squared_deviations
+        try:
+            for value in values:
+                if not isinstance(value, (int, float)) or isinstance(value, bool):
+                    raise _invalid(value)
+                count += 1
+                delta = value - mean
+                mean += delta / count
+                squared_deviations += delta * (value - mean)
+        finally:
+            self.count, self.mean, self.squared_deviations = count, mean, squared_deviations
+        return self
+
+    def result(self) -> float:
+        """Return the sample variance (divided by count - 1)."""
+        self._require(2)
+        return self.squared_deviations / (self.count - 1)
+
+class Minimum(Reduction):
+    """Finds the smallest value."""
+
+    name = "min"
+
+    def __init__(self):
+        """Initialize an empty minimum."""
+        super().__init__()
+        self.value: Number = math.inf
+
+    def update(self, values: Iterable[Number]) -> "Minimum":
+        """Feed more values into the minimum; see Reduction.update."""
+        smallest, count = self.value, 0
+        try:
+            for value in values:
+                if not isinstance(value, (int, float)) or isinstance(value, bool):
+                    raise _invalid(value)
+                count += 1
+                if value < smallest or value != value:  # NaN propagates
+                    smallest = value
+        finally:
+            self.value, self.count = smallest, self.count + count
+        return self
+
+    def result(self) -> Number:
+        """Return the smallest value."""
+        self._require(1)
+        return self.value
+
+class Maximum(Reduction):
+    """Finds the largest value."""
+
+    name = "max"
+
+    def __init__(self):
+        """Initialize an empty maximum."""
+        super().__init__()
+        self.value: Number = -math.inf
+
+    def update(self, values: Iterable[Number]) -> "Maximum":
+        """Feed more values into the maximum; see Reduction.update."""
+        largest, count = self.value, 0
+        try:
+            for value in values:
+                if not isinstance(value, (int, float)) or isinstance(value, bool):
+                    raise _invalid(value)
+                count += 1
+                if value > largest or value != value:  # NaN propagates
+                    largest = value
+        finally:
+            self.value, self.count = largest, self.count + count
+        return self
+
+    def result(self) -> Number:
+        """Return the largest value."""
+        self._require(1)
+        return self.value
+
+# Reduction classes by command name.
+REDUCTIONS: Dict[str, Type[Reduction]] = {
+    reduction.name: reduction for reduction in (Sum, Product, Mean, Variance, Minimum, Maximum)
+}
+
+def read_values(file: TextIO) -> Iterator[float]:
+    """
+    Lazily parse numbers separated by whitespace, commas, or newlines from a text file.
+
+    Args:
+        file (TextIO): An open text file, read one line at a time.
+
+    Yields:
+        float: Each number in the file.
+
+    Raises:
+        ValueError: If a word is not a number. The message gives its position, not the word, so
+            the contents of a file are never echoed back.
+    """
+    count = 0
+    for line in file:
+        for word in _SEPARATOR.split(line.strip()):
+            if word:
+                count += 1
+                try:
+                    yield float(word)
+                except ValueError:
+                    raise ValueError(f"Value {count} is not a number.") from None
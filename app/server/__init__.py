@@ -0,0 +1,319 @@
+# app/server/__init__.py
+
+import asyncio
+import json
+from typing import Iterable, List, Optional, Set
+from app.calculation import SweepCalculation
+from app.calculator import Calculator, parse_command
+from app.history import HistoryView
+from app.reduction import REDUCTIONS
+from app.session import SessionManager
+
+# Bytes read from a connection at a time; every complete line in the chunk is answered in one write.
+READ_CHUNK_BYTES = 64 * 1024
+# Longest request line, or HTTP request body, accepted before the connection is closed.
+MAX_LINE_BYTES = 64 * 1024
+# Methods that switch a connection to the minimal HTTP/JSON protocol.
+HTTP_METHODS = (b"GET ", b"POST ")
+# Calculator commands network clients may run besides operations. The others (save, load, pipeline)
+# read or write files on the server, as do '@file' arguments, which are refused for every command.
+SERVER_COMMANDS = frozenset(['help', 'exit', 'quit', 'undo', 'clear', 'history', 'summary', 'cache', 'stats',
+                             'eval', 'let', 'sweep', *REDUCTIONS])
+
+def format_response(output) -> str:
+    """
+    Format a command's output as a single response line.
+
+    Args:
+        output: The value returned by Calculator.execute_command.
+
+    Returns:
+        str: The output on one line; history entries are tab-separated and newlines become spaces.
+    """
+    if isinstance(output, (list, HistoryView)):
+        return "\t".join(str(item) for item in output)
+    return str(output).replace("\n", " ")
+
+def check_command(command: str, args: Iterable) -> Optional[str]:
+    """
+    Check that a network client may run a command (see SERVER_COMMANDS).
+
+    Args:
+        command (str): The lower-cased command.
+        args (Iterable): Its arguments.
+
+    Returns:
+        Optional[str]: An error message if the command or one of its arguments would touch the
+        server's files, otherwise None.
+    """
+    if command in Calculator.COMMANDS and command not in SERVER_COMMANDS:
+        return f"Error: '{command}' is not available over the network."
+    if any(isinstance(arg, str) and arg.lstrip().startswith("@") for arg in args):
+        return "Error: '@file' arguments are not available over the network."
+    return None
+
+def execute_line(calculator: Calculator, line: str):
+    """
+    Parse and execute one protocol line against a session's calculator.
+
+    Args:
+        calculator (Calculator): The session's calculator.
+        line (str): The request line, e.g. 'add 1 2'.
+
+    Returns:
+        The output of the command, or an error message.
+    """
+    try:
+        command, args = parse_command(line)
+    except ValueError:
+        return "Error: Invalid input. Please ensure all arguments are numbers."
+    return check_command(command, args) or calculator.execute_command(command, *args)
+
+class CalculatorServer:
+    """An asyncio TCP server hosting many calculator sessions in one process.
+
+    Each connection is a session with its own History, while the stateless Operation instances are
+    shared. Sessions are hosted by a SessionManager, so the state of connections that stay idle
+    while others are busy is evicted to a compact serialized form and revived on their next request.
+    The default protocol is one command per line and one response line per command; requests may be
+    pipelined. A connection whose first bytes are 'GET ' or 'POST ' speaks minimal HTTP/JSON.
+    Commands that touch the server's files are refused on both protocols (see check_command).
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8765, max_connections: int = 1024,
+                 cache_size: int = 0, max_active_sessions: int = 1024, recorder=None):
+        """
+        Initialize the server.
+
+        Args:
+            host (str): The address to listen on. Defaults to '127.0.0.1'.
+            port (int): The port to listen on; 0 picks a free port. Defaults to 8765.
+            max_connections (int): Connections served at once; extra clients are refused. Defaults to 1024.
+            cache_size (int): Result cache size of each session's calculator. Defaults to 0 (disabled).
+            max_active_sessions (int): Sessions kept live at once; the least recently used others are
+                evicted. Defaults to 1024.
+            recorder (Optional[app.loadtest.Recorder]): Records every request as a command line with
+                its session and time, for replay with app.loadtest. Defaults to None (not recorded).
+        """
+        self.host = host
+        self.port = port
+        self.max_connections = max_connections
+        self.cache_size = cache_size
+        self.sessions = SessionManager(max_active_sessions, cache_size)
+        self.recorder = recorder
+        self.active_connections = 0
+        self.requests_served = 0
+        self._server: Optional[asyncio.base_events.Server] = None
+        self._sessions: Set[asyncio.Task] = set()
+
+    async def start(self) -> int:
+        """
+        Start listening.
+
+        Returns:
+            int: The port the server is listening on.
+        """
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port,
+                                                  limit=MAX_LINE_BYTES)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self.port
+
+    async def serve_forever(self) -> None:
+        """Start listening if needed, then serve until cancelled."""
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self) -> None:
+        """Stop accepting connections, end the open sessions, and wait for the listener to close."""
+        if self._server is not None:
+            self._server.close()
+            for session in self._sessions:
+                session.cancel()
+            await asyncio.gather(*self._sessions, return_exceptions=True)
+            await self._server.wait_closed()
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serve one connection as a calculator session."""
+        if self.active_connections >= self.max_connections:
+            writer.write(b"Error: Server busy.\n")
+            await self._close_writer(writer)
+            return
+        self.active_connections += 1
+        session = asyncio.current_task()
+        self._sessions.add(session)
+        session_id = self.sessions.open()
+        try:
+            first = await reader.read(READ_CHUNK_BYTES)
+            if first.startswith(HTTP_METHODS):
+                await self._serve_http(session_id, first, reader, writer)
+            else:
+                await self._serve_lines(session_id, first, reader, writer)
+        except (ConnectionError, ValueError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass  # Client went away, or the server is shutting down
+        finally:
+            self.active_connections -= 1
+            self._sessions.discard(session)
+            self.sessions.close(session_id)
+            await self._close_writer(writer)
+
+    async def _serve_lines(self, session_id: int, data: bytes, reader: asyncio.StreamReader,
+                           writer: asyncio.StreamWriter) -> None:
+        """Answer pipelined command lines until the client closes or sends 'exit'."""
+        buffer = b""
+        while data:
+            buffer += data
+            *lines, buffer = buffer.split(b"\n")
+            if len(buffer) > MAX_LINE_BYTES:
+                writer.write(b"Error: Line too long.\n")
+                return
+            responses = []
+            calculator = self.sessions.get(session_id) if lines else None  # Revived if it was evicted
+            for line in lines:
+                line = line.decode("utf-8", "replace").strip()
+                if not line:
+                    continue
+                if self.recorder is not None:
+                    self.recorder.record(line, session_id)
+                output = execute_line(calculator, line)
+                responses.append(format_response(output))
+                self.requests_served += 1
+                if line.lower() in ("exit", "quit"):
+                    writer.write(("\n".join(responses) + "\n").encode())
+                    return
+            if responses:
+                writer.write(("\n".join(responses) + "\n").encode())
+                await writer.drain()  # Backpressure: stop reading while the client is not reading
+            data = await reader.read(READ_CHUNK_BYTES)
+
+    async def _serve_http(self, session_id: int, data: bytes, reader: asyncio.StreamReader,
+                          writer: asyncio.StreamWriter) -> None:
+        """Answer keep-alive HTTP requests: POST / with {"command": ..., "args": [...]}, or GET /health."""
+        buffer = data
+        while True:
+            while b"\r\n\r\n" not in buffer:
+                if len(buffer) > MAX_LINE_BYTES:
+                    return
+                chunk = await reader.read(READ_CHUNK_BYTES)
+                if not chunk:
+                    return
+                buffer += chunk
+            head, buffer = buffer.split(b"\r\n\r\n", 1)
+            request_line, *header_lines = head.decode("latin-1").split("\r\n")
+            headers = {name.strip().lower(): value.strip()
+                       for name, _, value in (line.partition(":") for line in header_lines)}
+            try:
+                length = int(headers.get("content-length", 0) or 0)
+            except ValueError:
+                length = -1
+            if length < 0:
+                self._write_http(writer, "400 Bad Request", {"error": "Error: Invalid Content-Length."})
+                return
+            if length > MAX_LINE_BYTES:
+                self._write_http(writer, "413 Payload Too Large", {"error": "Error: Request body too large."})
+                return
+            if len(buffer) < length:
+                buffer += await reader.readexactly(length - len(buffer))
+            body, buffer = buffer[:length], buffer[length:]
+            if self.recorder is not None and request_line.startswith("POST "):
+                self._record_request(session_id, body)
+            status, payload = self._http_response(self.sessions.get(session_id), request_line, body)
+            self.requests_served += 1
+            self._write_http(writer, status, payload)
+            await writer.drain()
+            if headers.get("connection", "").lower() == "close":
+                return
+
+    @staticmethod
+    def _write_http(writer: asyncio.StreamWriter, status: str, payload: dict) -> None:
+        """Write one HTTP response with a JSON payload."""
+        content = json.dumps(payload).encode()
+        writer.write(f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\n"
+                     f"Content-Length: {len(content)}\r\n\r\n".encode() + content)
+
+    def _record_request(self, session_id: int, body: bytes) -> None:
+        """Record an HTTP/JSON request as the equivalent command line; malformed requests are not recorded."""
+        try:
+            request = json.loads(body or b"{}")
+            line = " ".join([str(request["command"]), *(str(arg) for arg in request.get("args", []))])
+        except (ValueError, KeyError, TypeError, AttributeError):
+            return
+        self.recorder.record(line, session_id)
+
+    @staticmethod
+    def _http_response(calculator: Calculator, request_line: str, body: bytes):
+        """Return the status line and JSON payload for one HTTP request."""
+        method, _, rest = request_line.partition(" ")
+        path = rest.split(" ", 1)[0]
+        if method == "GET" and path == "/health":
+            return "200 OK", {"status": "ok"}
+        if method != "POST" or path != "/":
+            return "404 Not Found", {"error": "Error: Not found."}
+        try:
+            request = json.loads(body or b"{}")
+            command, args = str(request["command"]).lower(), request.get("args", [])
+            output = check_command(command, args) or calculator.execute_command(command, *args)
+        except (ValueError, KeyError, TypeError, AttributeError):
+            return "400 Bad Request", {"error": "Error: Invalid request."}
+        if isinstance(output, (list, HistoryView)):
+            return "200 OK", {"result": [str(item) for item in output]}
+        if isinstance(output, str) and output.startswith("Error"):
+            return "200 OK", {"error": output}
+        if isinstance(output, SweepCalculation):
+            return "200 OK", {"result": str(output)}  # The descriptor; a table can be too large to send
+        return "200 OK", {"result": output}
+
+    @staticmethod
+    async def _close_writer(writer: asyncio.StreamWriter) -> None:
+        """Close a connection, ignoring errors from clients that already went away."""
+        try:
+            writer.close()
+            await writer.wait_closed()
+        except ConnectionError:
+            pass
+
+class CalculatorClient:
+    """A minimal line-protocol client, used for tests and benchmarks."""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Wrap an open connection; use CalculatorClient.connect to create one."""
+        self._reader = reader
+        self._writer = writer
+
+    @classmethod
+    async def connect(cls, host: str = "127.0.0.1", port: int = 8765) -> "CalculatorClient":
+        """
+        Open a connection to a CalculatorServer.
+
+        Returns:
+            CalculatorClient: The connected client.
+        """
+        reader, writer = await asyncio.open_connection(host, port, limit=MAX_LINE_BYTES)
+        return cls(reader, writer)
+
+    async def request(self, line: str) -> str:
+        """
+        Send one command and wait for its response.
+
+        Returns:
+            str: The response line, without the newline.
+        """
+        return (await self.pipeline([line]))[0]
+
+    async def pipeline(self, lines: Iterable[str]) -> List[str]:
+        """
+        Send several commands at once, then read one response per command.
+
+        Returns:
+            List[str]: The response lines, in request order.
+        """
+        lines = list(lines)
+        self._writer.write("".join(line + "\n" for line in lines).encode())
+        await self._writer.drain()
+        return [(await self._reader.readline()).decode().rstrip("\n") for _ in lines]
+
+    async def close(self) -> None:
+        """Close the connection."""
+        self._writer.close()
+        await self._writer.wait_closed()
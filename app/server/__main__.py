@@ -0,0 +1,33 @@
+"""Run the calculator server: python -m app.server [--host HOST] [--port PORT] [--max-connections N] [--max-active-sessions N]."""
+import argparse
+import asyncio
+from app.server import CalculatorServer
+
+def main(argv=None):
+    """Parse options and serve until interrupted."""
+    parser = argparse.ArgumentParser(description="Calculator TCP server (line protocol and HTTP/JSON).")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--max-connections", type=int, default=1024)
+    parser.add_argument("--cache-size", type=int, default=0)
+    parser.add_argument("--max-active-sessions", type=int, default=1024,
+                        help="sessions kept live; idle others are serialized until their next request")
+    parser.add_argument("--record", metavar="FILE",
+                        help="record every request, with its session and time, for python -m app.loadtest replay")
+    options = parser.parse_args(argv)
+    recorder = None
+    if options.record:
+        from app.loadtest import Recorder  # Only needed when recording
+        recorder = Recorder(options.record)
+    server = CalculatorServer(options.host, options.port, options.max_connections, options.cache_size,
+                              options.max_active_sessions, recorder)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if recorder is not None:
+            recorder.close()
+
+if __name__ == "__main__":
+    main()
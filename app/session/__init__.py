@@ -0,0 +1,166 @@
+# app/session/__init__.py
+
+import itertools
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional
+from app.calculator import Calculator
+
+class Session:
+    """An active session: its calculator and when it was last used."""
+
+    __slots__ = ("calculator", "last_used")
+
+    def __init__(self, calculator: Calculator, last_used: float):
+        """
+        Initialize a session.
+
+        Args:
+            calculator (Calculator): The session's calculator.
+            last_used (float): The time.monotonic() of the last request.
+        """
+        self.calculator = calculator
+        self.last_used = last_used
+
+class SessionManager:
+    """Hosts many calculator sessions in one process, keeping only the recently used ones live.
+
+    Calculators share their command and operation tables and keep their state in slots, so an
+    active idle session costs about a kilobyte. Beyond ``max_active`` sessions, the least recently
+    used ones are evicted to the compact serialized form of Calculator.to_bytes, and sessions idle
+    for longer than a given time can be evicted with evict_idle. An evicted session is revived
+    transparently on its next request. A session that has never been used is stored as None and
+    only gets a calculator on its first request.
+    """
+
+    def __init__(self, max_active: int = 1024, cache_size: int = 0):
+        """
+        Initialize an empty manager.
+
+        Args:
+            max_active (int): Sessions kept live at once; at least 1. Defaults to 1024.
+            cache_size (int): Result cache size of each new session's calculator. Defaults to 0 (disabled).
+
+        Raises:
+            ValueError: If max_active is less than 1.
+        """
+        if max_active < 1:
+            raise ValueError("max_active must be at least 1")
+        self.max_active = max_active
+        self.cache_size = cache_size
+        self.evictions = 0
+        self.revivals = 0
+        self._active: "OrderedDict[Hashable, Session]" = OrderedDict()  # Least recently used first
+        self._evicted: Dict[Hashable, Optional[bytes]] = {}             # None: never used
+        self._ids = itertools.count(1)
+
+    def __len__(self) -> int:
+        """Return the number of open sessions, active and evicted."""
+        return len(self._active) + len(self._evicted)
+
+    def __contains__(self, session_id: Hashable) -> bool:
+        """Return True if a session is open."""
+        return session_id in self._active or session_id in self._evicted
+
+    @property
+    def active(self) -> int:
+        """The number of sessions with a live calculator."""
+        return len(self._active)
+
+    def open(self, session_id: Optional[Hashable] = None) -> Hashable:
+        """
+        Open a session, without creating its calculator yet.
+
+        Args:
+            session_id (Optional[Hashable]): The id to use. Defaults to the next free number.
+
+        Returns:
+            Hashable: The session id.
+
+        Raises:
+            KeyError: If a session with the id is already open.
+        """
+        if session_id is None:
+            session_id = next(self._ids)
+            while session_id in self:
+                session_id = next(self._ids)
+        elif session_id in self:
+            raise KeyError(session_id)
+        self._evicted[session_id] = None
+        return session_id
+
+    def close(self, session_id: Hashable) -> None:
+        """
+        Close a session and drop its state.
+
+        Raises:
+            KeyError: If the session is not open.
+        """
+        if self._active.pop(session_id, None) is None:
+            del self._evicted[session_id]
+
+    def get(self, session_id: Hashable) -> Calculator:
+        """
+        Return a session's calculator, reviving it if it was evicted.
+
+        Marks the session as used, and evicts the least recently used sessions beyond max_active.
+
+        Raises:
+            KeyError: If the session is not open.
+        """
+        now = time.monotonic()
+        session = self._active.get(session_id)
+        if session is not None:
+            self._active.move_to_end(session_id)
+            session.last_used = now
+            return session.calculator
+        data = self._evicted.pop(session_id)
+        if data is None:
+            calculator = Calculator(cache_size=self.cache_size)
+        else:
+            calculator = Calculator.from_bytes(data)
+            self.revivals += 1
+        self._active[session_id] = Session(calculator, now)
+        while len(self._active) > self.max_active:
+            self.evict(next(iter(self._active)))
+        return calculator
+
+    def execute(self, session_id: Hashable, command: str, *args):
+        """
+        Run a command in a session, as Calculator.execute_command.
+
+        Raises:
+            KeyError: If the session is not open.
+        """
+        return self.get(session_id).execute_command(command, *args)
+
+    def evict(self, session_id: Hashable) -> None:
+        """
+        Serialize an active session's calculator and release it; evicted sessions are left as they are.
+
+        Raises:
+            KeyError: If the session is not open.
+        """
+        session = self._active.pop(session_id, None)
+        if session is None:
+            if session_id not in self._evicted:
+                raise KeyError(session_id)
+            return
+        self._evicted[session_id] = session.calculator.to_bytes()
+        self.evictions += 1
+
+    def evict_idle(self, idle_seconds: float) -> int:
+        """
+        Evict every session that has not been used for a while.
+
+        Args:
+            idle_seconds (float): Sessions unused for longer than this are evicted.
+
+        Returns:
+            int: The number of sessions evicted.
+        """
+        cutoff = time.monotonic() - idle_seconds
+        idle = list(itertools.takewhile(lambda item: item[1].last_used < cutoff, self._active.items()))
+        for session_id, _ in idle:
+            self.evict(session_id)
+        return len(idle)
@@ -0,0 +1,159 @@
+# app/stats/__init__.py
+
+import json
+import threading
+import time
+from typing import Dict, List, Optional
+
+# Each power of two is split into 2**SUB_BUCKET_BITS linear buckets, bounding the relative error of
+# a reported percentile to about 1 / 2**SUB_BUCKET_BITS (6% here), as in HDR histograms.
+SUB_BUCKET_BITS = 4
+_SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+
+def bucket_index(value: int) -> int:
+    """Return the histogram bucket of a non-negative integer value."""
+    if value < _SUB_BUCKETS:
+        return value
+    shift = value.bit_length() - SUB_BUCKET_BITS - 1
+    return ((shift + 1) << SUB_BUCKET_BITS) + (value >> shift) - _SUB_BUCKETS
+
+def bucket_upper_bound(index: int) -> int:
+    """Return the largest value that falls in a histogram bucket."""
+    if index < _SUB_BUCKETS:
+        return index
+    shift = (index >> SUB_BUCKET_BITS) - 1
+    return (((index & (_SUB_BUCKETS - 1)) + _SUB_BUCKETS + 1) << shift) - 1
+
+class LatencyHistogram:
+    """A log-linear histogram of latencies in nanoseconds with constant-time recording."""
+
+    __slots__ = ("counts", "total", "max")
+
+    def __init__(self):
+        """Initialize an empty histogram."""
+        self.counts: Dict[int, int] = {}
+        self.total = 0
+        self.max = 0
+
+    def record(self, nanoseconds: int) -> None:
+        """Record one latency."""
+        index = bucket_index(nanoseconds)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.total += 1
+        if nanoseconds > self.max:
+            self.max = nanoseconds
+
+    def percentile(self, percent: float) -> int:
+        """
+        Return an upper bound of the given percentile.
+
+        Args:
+            percent (float): The percentile, between 0 and 100.
+
+        Returns:
+            int: The upper bound of the bucket holding the percentile, in nanoseconds (0 if empty).
+        """
+        if not self.total:
+            return 0
+        rank = max(1, round(percent / 100 * self.total))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(bucket_upper_bound(index), self.max)
+        return self.max
+
+class Instrumentation:
+    """Per-command counts, error counts, and latency histograms."""
+
+    def __init__(self):
+        """Initialize with no recorded commands."""
+        self._lock = threading.Lock()
+        self._commands: Dict[str, List] = {}  # command -> [count, errors, histogram]
+        self._dump_thread: Optional[threading.Thread] = None
+        self._dump_stop = threading.Event()
+
+    def record(self, command: str, nanoseconds: int, error: bool) -> None:
+        """
+        Record one command execution.
+
+        Args:
+            command (str): The command name (e.g. 'add', or 'history.save' for history I/O).
+            nanoseconds (int): How long the command took.
+            error (bool): Whether the command failed.
+        """
+        with self._lock:
+            entry = self._commands.get(command)
+            if entry is None:
+                entry = self._commands[command] = [0, 0, LatencyHistogram()]
+            entry[0] += 1
+            entry[1] += error
+            entry[2].record(nanoseconds)
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        """
+        Return the current statistics.
+
+        Returns:
+            Dict[str, Dict[str, int]]: For each command, its count, errors, and p50/p95/p99/max latency
+            in nanoseconds.
+        """
+        with self._lock:
+            return {
+                command: {"count": count, "errors": errors, "p50_ns": histogram.percentile(50),
+                          "p95_ns": histogram.percentile(95), "p99_ns": histogram.percentile(99),
+                          "max_ns": histogram.max}
+                for command, (count, errors, histogram) in self._commands.items()
+            }
+
+    def reset(self) -> None:
+        """Discard all recorded statistics."""
+        with self._lock:
+            self._commands.clear()
+
+    def format(self) -> str:
+        """
+        Return the statistics as a text table with latencies in microseconds.
+
+        Returns:
+            str: One line per command, or a message if nothing was recorded.
+        """
+        snapshot = self.snapshot()
+        if not snapshot:
+            return "No commands recorded."
+        lines = [f"{'command':<14}{'count':>9}{'errors':>8}{'p50 us':>10}{'p95 us':>10}{'p99 us':>10}"]
+        for command in sorted(snapshot):
+            stats = snapshot[command]
+            lines.append(f"{command:<14}{stats['count']:>9}{stats['errors']:>8}{stats['p50_ns'] / 1000:>10.1f}"
+                         f"{stats['p95_ns'] / 1000:>10.1f}{stats['p99_ns'] / 1000:>10.1f}")
+        return "\n".join(lines)
+
+    def dump(self, filename: str) -> None:
+        """Write a timestamped snapshot to a JSON file."""
+        with open(filename, "w", encoding="utf-8") as file:
+            json.dump({"time": time.time(), "commands": self.snapshot()}, file)
+
+    def start_periodic_dump(self, filename: str, interval: float = 60.0) -> None:
+        """
+        Write a snapshot to a file every `interval` seconds from a background thread.
+
+        Args:
+            filename (str): The JSON file to (over)write.
+            interval (float): Seconds between dumps. Defaults to 60.
+        """
+        self.stop_periodic_dump()
+        self._dump_stop.clear()
+
+        def run():
+            while not self._dump_stop.wait(interval):
+                self.dump(filename)
+
+        self._dump_thread = threading.Thread(target=run, name="stats-dump", daemon=True)
+        self._dump_thread.start()
+
+    def stop_periodic_dump(self) -> None:
+        """Stop the periodic dump thread, if it is running."""
+        if self._dump_thread is not None:
+            self._dump_stop.set()
+            self._dump_thread.join()
+            self._dump_thread = None
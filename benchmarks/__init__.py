@@ -0,0 +1 @@
+"""Performance benchmarks for the calculator. Run a benchmark with `python -m benchmarks.<name>`."""
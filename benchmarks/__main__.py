@@ -0,0 +1,52 @@
+"""Run the microbenchmark suite.
+
+Usage:
+    python -m benchmarks run [--only NAME ...] [--sizes N ...] [--output FILE]
+    python -m benchmarks compare BASELINE [--only NAME ...] [--sizes N ...] [--threshold 0.1]
+
+'run' prints the metrics and optionally writes them to a JSON baseline. 'compare' runs the suite
+again and exits with status 1 if any metric is worse than the baseline by more than the threshold.
+"""
+import argparse
+import json
+import sys
+from benchmarks.suite import BENCHMARKS, Metric, compare, run
+
+def save_metrics(metrics, filename):
+    """Write metrics to a JSON file."""
+    with open(filename, "w", encoding="utf-8") as file:
+        json.dump({name: metric._asdict() for name, metric in metrics.items()}, file, indent=2, sort_keys=True)
+
+def load_metrics(filename):
+    """Read metrics from a JSON file."""
+    with open(filename, "r", encoding="utf-8") as file:
+        return {name: Metric(**fields) for name, fields in json.load(file).items()}
+
+def main(argv=None):
+    """Parse options and run or compare the suite."""
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Calculator microbenchmarks.")
+    parser.add_argument("mode", choices=["run", "compare"])
+    parser.add_argument("baseline", nargs="?", help="baseline JSON file (compare mode)")
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), help="benchmarks to run")
+    parser.add_argument("--sizes", nargs="+", type=lambda text: int(float(text)),
+                        help="history sizes, e.g. 1e3 1e5 1e7")
+    parser.add_argument("--output", help="write the metrics to this JSON file")
+    parser.add_argument("--threshold", type=float, default=0.1, help="allowed relative regression (default 0.1)")
+    options = parser.parse_args(argv)
+    if options.mode == "compare" and not options.baseline:
+        parser.error("compare needs a baseline file")
+
+    metrics = run(options.only, options.sizes)
+    for name, metric in sorted(metrics.items()):
+        print(f"{name:<40} {metric.value:>14.4g} {metric.unit}")
+    if options.output:
+        save_metrics(metrics, options.output)
+    if options.mode == "compare":
+        regressions = compare(load_metrics(options.baseline), metrics, options.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,46 @@
+"""Resident memory benchmark for a History with a memory cap.
+
+Appends calculations to a History that keeps at most --max-entries in memory and spills the rest
+to disk, printing the process resident set size at regular checkpoints. With the cap, the resident
+size should stay flat however many calculations are appended (try --calculations 100000000).
+
+Usage: python -m benchmarks.bench_history_spill [--calculations N] [--max-entries N] [--checkpoints N]
+"""
+import argparse
+import os
+import resource
+import time
+from app.history import History
+from app.operations.builtin import OPERATIONS
+
+def resident_bytes():
+    """Return the current resident set size, or the peak size where the current one is unavailable."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def main(argv=None):
+    """Parse options, append the calculations, and print the resident size at each checkpoint."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calculations", type=int, default=10_000_000)
+    parser.add_argument("--max-entries", type=int, default=1_000_000, help="0 for no memory cap")
+    parser.add_argument("--checkpoints", type=int, default=10)
+    options = parser.parse_args(argv)
+    history = History(max_entries=options.max_entries or None)
+    add_result = history.add_result
+    operation = OPERATIONS['add']
+    step = max(1, options.calculations // options.checkpoints)
+    print(f"{'calculations':>14} {'resident MiB':>13} {'appends/s':>12}")
+    start = time.perf_counter()
+    for first in range(0, options.calculations, step):
+        for i in range(first, min(first + step, options.calculations)):
+            add_result(operation, i, 1, i + 1)
+        rate = len(history) / (time.perf_counter() - start)
+        print(f"{len(history):>14,} {resident_bytes() / (1 << 20):>13.1f} {rate:>12,.0f}")
+    assert history.undo().startswith("Undone")  # The newest entry is still in memory
+    history.clear()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Concurrent append benchmark for the thread-safe History.
+
+Compares the buffered thread-safe mode with a single coarse lock around a plain History, for a
+growing number of threads that each append the same number of calculations.
+
+Usage: python -m benchmarks.bench_history_threads [--appends N] [--threads 1 2 4 8]
+"""
+import argparse
+import threading
+import time
+from app.history import History
+from app.operations.builtin import OPERATIONS
+
+def coarse_locked_appender(history):
+    """Return an append function that serializes every call on one lock."""
+    lock = threading.Lock()
+
+    def append(operation, operand1, operand2, result):
+        with lock:
+            history.add_result(operation, operand1, operand2, result)
+    return append
+
+def run(threads, appends, mode):
+    """Append from `threads` threads and return the appends per second."""
+    history = History(thread_safe=(mode == "buffered"))
+    append = history.add_result if mode == "buffered" else coarse_locked_appender(history)
+    operation = OPERATIONS['add']
+
+    def worker():
+        for i in range(appends):
+            append(operation, i, 1, i + 1)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    assert len(history) == threads * appends  # Also merges any remaining buffered appends
+    return threads * appends / (time.perf_counter() - start)
+
+def main(argv=None):
+    """Parse options, run both modes for each thread count, and print a table."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--appends", type=int, default=200_000, help="appends per thread")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8])
+    options = parser.parse_args(argv)
+    print(f"{'threads':>7} {'buffered/s':>14} {'coarse lock/s':>14}")
+    for threads in options.threads:
+        buffered = run(threads, options.appends, "buffered")
+        locked = run(threads, options.appends, "locked")
+        print(f"{threads:>7} {buffered:>14,.0f} {locked:>14,.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""Scaling benchmark for the process-pool parallel engine.
+
+Runs the same job list with 1, 2, 4 and 8 workers and reports throughput and speedup over the
+single-process baseline, showing where inter-process overhead stops the gains.
+
+Usage: python -m benchmarks.bench_parallel [--jobs N] [--chunk-size N] [--workers 1 2 4 8]
+"""
+import argparse
+import random
+import time
+from app.parallel import ParallelEngine, evaluate_chunk
+
+COMMANDS = ["add", "subtract", "multiply", "divide"]
+
+def make_jobs(count, seed=0):
+    """Build a reproducible list of random (command, operand1, operand2) jobs."""
+    rng = random.Random(seed)
+    return [(rng.choice(COMMANDS), rng.uniform(-1e6, 1e6), rng.uniform(-1e6, 1e6)) for _ in range(count)]
+
+def run(jobs, worker_counts, chunk_size):
+    """Time the jobs in-process and with each worker count.
+
+    Returns:
+        list: (label, seconds, jobs per second, speedup) rows.
+    """
+    start = time.perf_counter()
+    evaluate_chunk(jobs)
+    baseline = time.perf_counter() - start
+    rows = [("in-process", baseline, len(jobs) / baseline, 1.0)]
+    for workers in worker_counts:
+        engine = ParallelEngine(workers=workers, chunk_size=chunk_size)
+        start = time.perf_counter()
+        engine.run(jobs)
+        seconds = time.perf_counter() - start
+        rows.append((f"{workers} workers", seconds, len(jobs) / seconds, baseline / seconds))
+    return rows
+
+def main(argv=None):
+    """Parse options, run the benchmark, and print a table."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=2_000_000)
+    parser.add_argument("--chunk-size", type=int, default=50_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    options = parser.parse_args(argv)
+
+    jobs = make_jobs(options.jobs)
+    print(f"{'mode':<12} {'seconds':>9} {'jobs/s':>12} {'speedup':>8}")
+    for label, seconds, rate, speedup in run(jobs, options.workers, options.chunk_size):
+        print(f"{label:<12} {seconds:>9.3f} {rate:>12,.0f} {speedup:>7.2f}x")
+
+if __name__ == "__main__":
+    main()
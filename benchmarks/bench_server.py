@@ -0,0 +1,42 @@
+"""Throughput benchmark for the asyncio calculator server.
+
+Starts a server in-process and drives it with concurrent line-protocol clients, each sending its
+requests in pipelined batches, then reports requests per second.
+
+Usage: python -m benchmarks.bench_server [--clients N] [--requests N] [--pipeline N]
+"""
+import argparse
+import asyncio
+import time
+from app.server import CalculatorClient, CalculatorServer
+
+async def drive(port, requests, pipeline):
+    """Send `requests` commands over one connection, `pipeline` at a time."""
+    client = await CalculatorClient.connect(port=port)
+    lines = [f"add {i} {i + 1}" for i in range(pipeline)]
+    for _ in range(requests // pipeline):
+        await client.pipeline(lines)
+    await client.close()
+
+async def run(clients, requests, pipeline):
+    """Run the benchmark and return (total requests, seconds)."""
+    server = CalculatorServer(port=0, max_connections=clients)
+    port = await server.start()
+    start = time.perf_counter()
+    await asyncio.gather(*(drive(port, requests, pipeline) for _ in range(clients)))
+    seconds = time.perf_counter() - start
+    await server.close()
+    return server.requests_served, seconds
+
+def main(argv=None):
+    """Parse options, run the benchmark, and print the throughput."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=2000, help="requests per client")
+    parser.add_argument("--pipeline", type=int, default=50, help="requests sent per round trip")
+    options = parser.parse_args(argv)
+    served, seconds = asyncio.run(run(options.clients, options.requests, options.pipeline))
+    print(f"{served} requests from {options.clients} clients in {seconds:.3f}s: {served / seconds:,.0f} requests/s")
+
+if __name__ == "__main__":
+    main()
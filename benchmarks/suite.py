@@ -0,0 +1,328 @@
+"""Microbenchmarks for the calculator hot paths.
+
+Each benchmark returns a mapping of metric name to a Metric. Metrics are written to a JSON baseline
+file, and a later run can be compared against it to flag regressions beyond a threshold.
+"""
+import math
+import multiprocessing
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+import tracemalloc
+from array import array
+from typing import Callable, Dict, List, NamedTuple
+from app.calculation import Calculation
+from app.calculator import Calculator, parse_command
+from app.history import History
+from app.history.archive import HistoryArchive
+from app.history.shared import HistoryReader
+from app.operations.builtin import OPERATIONS
+from app.operations.registry import ENTRY_POINT_GROUP
+from app.session import SessionManager
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000]
+# Numbers of extra operations registered through entry points for the cold start benchmark.
+STARTUP_OPERATIONS = [0, 1_000]
+# Calculations written while a reader process tails them for the shared memory benchmark.
+PUBLISHED_CALCULATIONS = 500_000
+# Idle sessions hosted for the session memory benchmark, and calculations in each one's history.
+SESSIONS = 2_000
+SESSION_CALCULATIONS = 20
+MAIN_SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "main.py")
+
+class Metric(NamedTuple):
+    """A measured value, its unit, and whether lower values are better."""
+    value: float
+    unit: str
+    lower_is_better: bool = True
+
+def _per_call_ns(statement: Callable[[], object], number: int) -> float:
+    """Return the best of five timings of `number` calls, in nanoseconds per call."""
+    return min(timeit.repeat(statement, number=number, repeat=5)) / number * 1e9
+
+def bench_dispatch(_sizes: List[int]) -> Dict[str, Metric]:
+    """Latency of one operation command through Calculator.execute_command."""
+    calculator = Calculator()
+    calculator.record_history = False
+    execute = calculator.execute_command
+    return {"dispatch.execute_command": Metric(_per_call_ns(lambda: execute('add', 1.0, 2.0), 20_000), "ns/op")}
+
+def bench_execute(_sizes: List[int]) -> Dict[str, Metric]:
+    """Sustained Calculation.execute throughput and Operation._validate_inputs latency."""
+    operation = OPERATIONS['multiply']
+    calculations = [Calculation(operation, float(i), 2.0) for i in range(100_000)]
+    start = time.perf_counter()
+    for calculation in calculations:
+        calculation.execute()
+    throughput = len(calculations) / (time.perf_counter() - start)
+    validate = operation._validate_inputs  # pylint: disable=protected-access
+    return {
+        "execute.throughput": Metric(throughput, "ops/s", lower_is_better=False),
+        "execute.validate_inputs": Metric(_per_call_ns(lambda: validate(1.0, 2.0), 50_000), "ns/op"),
+    }
+
+def bench_parse(_sizes: List[int]) -> Dict[str, Metric]:
+    """Cost of parsing one REPL line."""
+    return {"repl.parse_command": Metric(_per_call_ns(lambda: parse_command("add 12.5 3"), 50_000), "ns/op")}
+
+def _filled_history(size: int) -> History:
+    """Return a history holding `size` executed calculations."""
+    history = History()
+    operation = OPERATIONS['add']
+    for i in range(size):
+        history.add_result(operation, float(i), 1.0, i + 1.0)
+    return history
+
+def bench_history_memory(sizes: List[int]) -> Dict[str, Metric]:
+    """Bytes of memory used per stored calculation as the history grows."""
+    metrics = {}
+    for size in sizes:
+        tracemalloc.start()
+        try:
+            baseline = tracemalloc.get_traced_memory()[0]
+            history = _filled_history(size)
+            used = tracemalloc.get_traced_memory()[0] - baseline
+        finally:
+            tracemalloc.stop()
+        metrics[f"history.bytes_per_entry[{size}]"] = Metric(used / size, "bytes")
+        del history
+    return metrics
+
+def bench_save_load(sizes: List[int]) -> Dict[str, Metric]:
+    """Time to save and load histories in the JSON and binary formats."""
+    metrics = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            history = _filled_history(size)
+            for extension in ("json", "bin"):
+                filename = os.path.join(directory, f"history.{extension}")
+                start = time.perf_counter()
+                history.save(filename)
+                metrics[f"history.save_{extension}[{size}]"] = Metric(time.perf_counter() - start, "s")
+                start = time.perf_counter()
+                History().load(filename)
+                metrics[f"history.load_{extension}[{size}]"] = Metric(time.perf_counter() - start, "s")
+    return metrics
+
+def bench_archive(sizes: List[int]) -> Dict[str, Metric]:
+    """Compression ratio of history archives against the JSON and binary formats, and their read speed."""
+    metrics = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            history = _filled_history(size)
+            sizes_on_disk = {}
+            for extension in ("json", "bin"):
+                filename = os.path.join(directory, f"history-{size}.{extension}")
+                history.save(filename)
+                sizes_on_disk[extension] = os.path.getsize(filename)
+            filename = os.path.join(directory, f"history-{size}.archive")
+            start = time.perf_counter()
+            history.save(filename)
+            metrics[f"archive.save[{size}]"] = Metric(time.perf_counter() - start, "s")
+            archive = HistoryArchive(filename)
+            archive.seal()  # Compress the entries still in the active segment too
+            archive.flush()
+            compressed = archive.disk_bytes()
+            for extension, raw in sizes_on_disk.items():
+                metrics[f"archive.ratio_vs_{extension}[{size}]"] = Metric(raw / compressed, "x", False)
+            start = time.perf_counter()
+            decoded = sum(1 for _ in archive.records())
+            metrics[f"archive.decode[{size}]"] = Metric(decoded / (time.perf_counter() - start), "entries/s", False)
+            positions = random.Random(size).choices(range(size), k=200)
+            start = time.perf_counter()
+            for position in positions:
+                archive.record(position)
+            metrics[f"archive.seek[{size}]"] = Metric((time.perf_counter() - start) / 200 * 1e6, "us")
+            archive.close()
+    return metrics
+
+def bench_sweep(sizes: List[int]) -> Dict[str, Metric]:
+    """Cells per second of a sweep over a square grid, against one execute_command per cell."""
+    metrics = {}
+    calculator = Calculator()
+    calculator.record_history = False
+    for size in sizes:
+        side = max(1, math.isqrt(size))
+        start = time.perf_counter()
+        for _ in calculator.sweep('multiply', (1, side), (1, side)).rows():
+            pass
+        metrics[f"sweep.cells_per_second[{side * side}]"] = Metric(side * side / (time.perf_counter() - start),
+                                                                   "cells/s", lower_is_better=False)
+    execute = calculator.execute_command
+    start = time.perf_counter()
+    for operand1 in range(side):
+        for operand2 in range(side):
+            execute('multiply', float(operand1), float(operand2))
+    per_command = side * side / (time.perf_counter() - start)
+    sweep = metrics[f"sweep.cells_per_second[{side * side}]"].value
+    metrics["sweep.speedup_vs_commands"] = Metric(sweep / per_command, "x", lower_is_better=False)
+    return metrics
+
+def _tail_published(name: str, queue) -> None:
+    """Tail a published history until it closes, then report the lag of every event and the events lost."""
+    with HistoryReader(name) as reader:
+        queue.put(None)  # Attached
+        lags = array("d")
+        for event in reader.follow():
+            lags.append(time.time() - event.time)
+        lags = sorted(lags)
+        queue.put((len(lags), reader.lost, lags[len(lags) // 2], lags[int(len(lags) * 0.99)], lags[-1]))
+
+def _write_calculations(history: History) -> float:
+    """Add PUBLISHED_CALCULATIONS calculations to a history and return the seconds it took."""
+    operation = OPERATIONS['add']
+    start = time.perf_counter()
+    for i in range(PUBLISHED_CALCULATIONS):
+        history.add_result(operation, float(i), 1.0, i + 1.0)
+    return time.perf_counter() - start
+
+def bench_shared_memory(_sizes: List[int]) -> Dict[str, Metric]:
+    """Cost of publishing history to shared memory, and how far a reader process lags under heavy writes."""
+    plain_seconds = _write_calculations(History())
+    history = History()
+    history.publish()
+    published_seconds = _write_calculations(history)
+    history.stop_publishing()
+
+    history = History()
+    queue = multiprocessing.Queue()
+    reader = multiprocessing.Process(target=_tail_published, args=(history.publish(), queue))
+    reader.start()
+    try:
+        queue.get(timeout=60)
+        seconds = _write_calculations(history)
+        history.stop_publishing()
+        read, lost, p50, p99, worst = queue.get(timeout=60)
+    finally:
+        reader.join(60)
+    return {
+        "shared.publish_overhead": Metric((published_seconds - plain_seconds) / PUBLISHED_CALCULATIONS * 1e9,
+                                          "ns/op"),
+        "shared.writes_per_second_while_read": Metric(PUBLISHED_CALCULATIONS / seconds, "ops/s",
+                                                      lower_is_better=False),
+        "shared.reader_lag_p50": Metric(p50 * 1e6, "us"),
+        "shared.reader_lag_p99": Metric(p99 * 1e6, "us"),
+        "shared.reader_lag_max": Metric(worst * 1e6, "us"),
+        "shared.reader_lost_fraction": Metric(lost / (read + lost), "ratio"),
+    }
+
+def bench_sessions(_sizes: List[int]) -> Dict[str, Metric]:
+    """Memory per idle session in a SessionManager, while live and after eviction."""
+    manager = SessionManager(max_active=SESSIONS)
+    session_ids = [manager.open() for _ in range(SESSIONS)]
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        for session_id in session_ids:
+            for i in range(SESSION_CALCULATIONS):
+                manager.execute(session_id, 'add', float(i), 1.0)
+        active = tracemalloc.get_traced_memory()[0] - baseline
+        for session_id in session_ids:
+            manager.evict(session_id)
+        evicted = tracemalloc.get_traced_memory()[0] - baseline
+    finally:
+        tracemalloc.stop()
+    return {
+        "sessions.active_bytes_per_session": Metric(active / SESSIONS, "bytes"),
+        "sessions.evicted_bytes_per_session": Metric(evicted / SESSIONS, "bytes"),
+    }
+
+def _plugin_distribution(directory: str, count: int) -> None:
+    """Install metadata for a distribution providing `count` operations through entry points.
+
+    The modules named by the entry points do not exist; startup must not import them.
+    """
+    dist_info = os.path.join(directory, "calculator_plugins-1.0.dist-info")
+    os.makedirs(dist_info)
+    with open(os.path.join(dist_info, "METADATA"), "w") as file:
+        file.write("Metadata-Version: 2.1\nName: calculator-plugins\nVersion: 1.0\n")
+    with open(os.path.join(dist_info, "entry_points.txt"), "w") as file:
+        file.write(f"[{ENTRY_POINT_GROUP}]\n")
+        file.writelines(f"plugin{i} = calculator_plugins.plugin{i}:Plugin{i}\n" for i in range(count))
+
+def _seconds_to_prompt(env: Dict[str, str]) -> float:
+    """Launch the interactive calculator and return the seconds until its first prompt appears."""
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, MAIN_SCRIPT], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                               stderr=subprocess.DEVNULL, env=env)
+    output = b""
+    while b"Enter a command" not in output:
+        chunk = process.stdout.read1(4096)
+        if not chunk:
+            raise RuntimeError("calculator exited before prompting")
+        output += chunk
+    elapsed = time.perf_counter() - start
+    process.communicate(b"exit\n")
+    return elapsed
+
+def bench_startup(_sizes: List[int]) -> Dict[str, Metric]:
+    """Cold start time from process launch to the first prompt, as more operations are registered."""
+    metrics = {}
+    for count in STARTUP_OPERATIONS:
+        with tempfile.TemporaryDirectory() as directory:
+            _plugin_distribution(directory, count)
+            env = dict(os.environ, PYTHONPATH=os.pathsep.join([directory, os.path.dirname(MAIN_SCRIPT)]))
+            seconds = min(_seconds_to_prompt(env) for _ in range(5))
+        metrics[f"startup.first_prompt[{count}]"] = Metric(seconds * 1000, "ms")
+    # Target: registering operations must not slow startup, so this ratio should stay at about 1
+    first = metrics[f"startup.first_prompt[{STARTUP_OPERATIONS[0]}]"].value
+    last = metrics[f"startup.first_prompt[{STARTUP_OPERATIONS[-1]}]"].value
+    metrics["startup.registered_operations_slowdown"] = Metric(last / first, "x")
+    return metrics
+
+BENCHMARKS = {
+    "dispatch": bench_dispatch,
+    "execute": bench_execute,
+    "parse": bench_parse,
+    "history_memory": bench_history_memory,
+    "save_load": bench_save_load,
+    "archive": bench_archive,
+    "sweep": bench_sweep,
+    "shared_memory": bench_shared_memory,
+    "startup": bench_startup,
+    "sessions": bench_sessions,
+}
+
+def run(names: List[str] = None, sizes: List[int] = None) -> Dict[str, Metric]:
+    """
+    Run benchmarks.
+
+    Args:
+        names (List[str]): Benchmarks to run. Defaults to all of BENCHMARKS.
+        sizes (List[int]): History sizes for the size-dependent benchmarks. Defaults to DEFAULT_SIZES.
+
+    Returns:
+        Dict[str, Metric]: Every metric produced, by name.
+    """
+    metrics = {}
+    for name in names or BENCHMARKS:
+        metrics.update(BENCHMARKS[name](sizes or DEFAULT_SIZES))
+    return metrics
+
+def compare(baseline: Dict[str, Metric], current: Dict[str, Metric], threshold: float) -> List[str]:
+    """
+    Find metrics that got worse than the baseline by more than a relative threshold.
+
+    Args:
+        baseline (Dict[str, Metric]): The reference metrics.
+        current (Dict[str, Metric]): The new metrics.
+        threshold (float): Allowed relative slowdown, e.g. 0.1 for 10%.
+
+    Returns:
+        List[str]: A description of each regression; metrics missing from either side are ignored.
+    """
+    regressions = []
+    for name, metric in current.items():
+        reference = baseline.get(name)
+        if reference is None or reference.value <= 0:
+            continue
+        change = metric.value / reference.value - 1
+        worse = change if metric.lower_is_better else -change
+        if worse > threshold:
+            regressions.append(f"{name}: {reference.value:.4g} -> {metric.value:.4g} {metric.unit} "
+                               f"({worse:+.1%} worse)")
+    return regressions
@@ -1,4 +1,20 @@
-from app.calculator import Calculator 
+import argparse
+import io
+import itertools
+import json
+import shutil
+import sys
+import time
+from app.calculation import SweepCalculation
+from app.calculator import Calculator, parse_command
+from app.history import History, HistoryView
+
+# Number of formatted output lines collected before each write in batch mode.
+BATCH_FLUSH_LINES = 4096
+# Buffer size of the batch mode output stream.
+BATCH_BUFFER_BYTES = 1 << 20
+# Prompt shown between screens of long interactive output.
+MORE_PROMPT = "-- More (Enter for the next page, q to stop) -- "
 
 def left_align_text(text, width=50):
     """Aligns the provided text to the left within the specified width.
@@ -16,35 +32,253 @@ def display_header(text):
     """Prints a header with left-aligned text without borders."""
     print("\n" + left_align_text(text, 50) + "\n")
 
-def main():
-    """Runs the interactive calculator, handling user input and commands."""
-    calculator = Calculator()
+def page_lines(lines, page_size=None, write=None, prompt=None):
+    """Writes lines a screen at a time, with a 'more' prompt between screens.
+
+    Each screen is formatted and written in one call, and lines are pulled from the iterable only
+    as they are shown, so the first screen appears in constant time however many lines follow.
+    Without a terminal (e.g. when output is piped), nothing is asked and all lines are written.
+
+    Args:
+        lines: An iterable of lines, such as History.iter_history().
+        page_size (int): Lines per screen. Defaults to the terminal height, leaving room for the prompt.
+        write: The function that writes text. Defaults to sys.stdout.write.
+        prompt: The function that asks for more, like input. Defaults to input if both stdin and
+            stdout are terminals, otherwise None (no paging).
+
+    Returns:
+        int: The number of lines written.
+    """
+    write = write or sys.stdout.write
+    if prompt is None and sys.stdin.isatty() and sys.stdout.isatty():
+        prompt = input
+    page_size = page_size or max(1, shutil.get_terminal_size().lines - 2)
+    lines = iter(lines)
+    written, following = 0, []
+    while True:
+        page = following + list(itertools.islice(lines, page_size - len(following)))
+        write("".join(left_align_text(line, 50) + "\n" for line in page))
+        written += len(page)
+        following = list(itertools.islice(lines, 1))  # Only ask for more if there is more
+        if not following:
+            return written
+        if prompt is not None and prompt(MORE_PROMPT).strip().lower() in ("q", "quit"):
+            return written
+
+def format_output(line_number, command, output, fmt):
+    """Formats the output of one command for batch mode.
+
+    Args:
+        line_number (int): The 1-based line number of the command in the script.
+        command (str): The command that was executed.
+        output: The value returned by Calculator.execute_command.
+        fmt (str): 'text', 'json', or 'tsv'.
+
+    Returns:
+        str: The formatted output, ending with a newline.
+    """
+    if isinstance(output, (list, HistoryView)):
+        output = [str(item) for item in output]
+    elif isinstance(output, SweepCalculation):
+        output = str(output)  # The table itself is streamed by run_batch in text format
+    if fmt == "json":
+        key = "error" if isinstance(output, str) and output.startswith("Error") else "result"
+        return json.dumps({"line": line_number, "command": command, key: output}) + "\n"
+    if fmt == "tsv":
+        if isinstance(output, list):
+            output = "\t".join(output)
+        return f"{line_number}\t{command}\t{str(output).replace(chr(10), ' ')}\n"
+    if isinstance(output, (int, float)):
+        return f"Result: {output}\n"
+    if isinstance(output, list):
+        return "History:\n" + "".join(item + "\n" for item in output)
+    return f"{output}\n"
+
+def run_batch(lines, output, fmt="text", calculator=None, record_history=True):
+    """Runs commands from an iterable of lines, writing one formatted result per command.
+
+    Lines are processed one at a time, so memory use does not depend on the script length.
+    Blank lines and lines starting with '#' are skipped; 'exit' or 'quit' ends the run.
+
+    Args:
+        lines (Iterable[str]): The script, e.g. an open file or sys.stdin.
+        output (TextIO): The stream results are written to.
+        fmt (str): 'text', 'json', or 'tsv'. Defaults to 'text'.
+        calculator (Calculator): The calculator to use. Defaults to a new Calculator.
+        record_history (bool): Whether calculations are logged to history. Defaults to True.
+
+    Returns:
+        dict: The number of commands and errors, and the elapsed time in seconds.
+    """
+    calculator = calculator or Calculator()
+    calculator.record_history = record_history
+    execute = calculator.execute_command
+    pending = []
+    commands = errors = 0
+    start = time.perf_counter()
+
+    for line_number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        commands += 1
+        try:
+            command, args = parse_command(line)
+        except ValueError:
+            command, args = line.split()[0].lower(), None
+        if command in ['exit', 'quit']:
+            break
+        if args is None:
+            result = "Error: Invalid input. Please ensure all arguments are numbers."
+        else:
+            result = execute(command, *args)
+        if isinstance(result, str) and result.startswith("Error"):
+            errors += 1
+        pending.append(format_output(line_number, command, result, fmt))
+        if fmt == "text" and isinstance(result, SweepCalculation):
+            output.write("".join(pending))
+            pending.clear()
+            output.writelines(row + "\n" for row in result.lines())  # Row by row, never the whole table
+            continue
+        if len(pending) >= BATCH_FLUSH_LINES:
+            output.write("".join(pending))
+            pending.clear()
+
+    output.write("".join(pending))
+    output.flush()
+    return {"commands": commands, "errors": errors, "seconds": time.perf_counter() - start}
+
+def format_summary(summary):
+    """Formats the end-of-run throughput summary of batch mode.
+
+    Args:
+        summary (dict): The dictionary returned by run_batch.
+
+    Returns:
+        str: A one-line summary.
+    """
+    seconds = summary["seconds"]
+    rate = summary["commands"] / seconds if seconds > 0 else 0.0
+    return (f"Processed {summary['commands']} commands ({summary['errors']} errors) "
+            f"in {seconds:.3f}s, {rate:,.0f} commands/s")
+
+def parse_arguments(argv):
+    """Parses the command line options.
+
+    Args:
+        argv (list): The command line arguments, without the program name.
+
+    Returns:
+        argparse.Namespace: The parsed options.
+    """
+    parser = argparse.ArgumentParser(description="Command line calculator.")
+    parser.add_argument("--batch", metavar="FILE",
+                        help="run commands from FILE ('-' for stdin) instead of prompting")
+    parser.add_argument("--output", metavar="FILE", help="write batch results to FILE instead of stdout")
+    parser.add_argument("--format", choices=["text", "json", "tsv"], default="text",
+                        help="batch output format (default: text)")
+    parser.add_argument("--no-history", action="store_true",
+                        help="do not log batch calculations to history, keeping memory constant")
+    parser.add_argument("--quiet", action="store_true", help="do not print the batch throughput summary")
+    parser.add_argument("--cache-size", type=int, default=0, metavar="N",
+                        help="memoize the results of up to N distinct calculations (default: disabled)")
+    parser.add_argument("--history-max-entries", type=int, metavar="N",
+                        help="keep at most N history entries in memory, spilling older ones to disk")
+    parser.add_argument("--history-max-bytes", type=int, metavar="N",
+                        help="like --history-max-entries, as bytes of in-memory history")
+    parser.add_argument("--spill-dir", metavar="DIR",
+                        help="directory for spilled history segments (default: a temporary directory)")
+    parser.add_argument("--instrument", action="store_true",
+                        help="record per-command counts and latencies (see the 'stats' command)")
+    parser.add_argument("--stats-dump", metavar="FILE", help="periodically write statistics to FILE as JSON")
+    parser.add_argument("--stats-interval", type=float, default=60.0, metavar="SECONDS",
+                        help="seconds between statistics dumps (default: 60)")
+    parser.add_argument("--record", metavar="FILE",
+                        help="record the commands entered, with timestamps, for python -m app.loadtest replay")
+    parser.add_argument("--publish", metavar="NAME",
+                        help="publish history changes to shared memory NAME for app.history.shared.HistoryReader")
+    return parser.parse_args(argv)
+
+def build_calculator(options):
+    """Creates the calculator configured by the command line options.
+
+    Args:
+        options (argparse.Namespace): The parsed command line options.
+
+    Returns:
+        Calculator: The configured calculator.
+    """
+    history = History(max_entries=options.history_max_entries, max_bytes=options.history_max_bytes,
+                      spill_directory=options.spill_dir)
+    calculator = Calculator(cache_size=options.cache_size, history=history,
+                            instrument=options.instrument or bool(options.stats_dump))
+    if options.stats_dump:
+        calculator.stats.start_periodic_dump(options.stats_dump, options.stats_interval)
+    if options.publish:
+        history.publish(options.publish)
+    return calculator
 
+def batch_main(options):
+    """Runs batch mode as configured by the command line options.
+
+    Args:
+        options (argparse.Namespace): The parsed command line options.
+    """
+    source = sys.stdin if options.batch == "-" else open(options.batch, "r", encoding="utf-8")
+    if options.output:
+        output = open(options.output, "w", encoding="utf-8", buffering=BATCH_BUFFER_BYTES)
+    else:
+        output = io.TextIOWrapper(io.BufferedWriter(io.FileIO(sys.stdout.fileno(), "w", closefd=False),
+                                                    BATCH_BUFFER_BYTES), encoding="utf-8")
+    calculator = build_calculator(options)
+    try:
+        summary = run_batch(source, output, options.format, calculator=calculator,
+                            record_history=not options.no_history)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        output.close()
+        calculator.history.stop_publishing()
+    if options.stats_dump:
+        calculator.stats.stop_periodic_dump()
+        calculator.stats.dump(options.stats_dump)
+    if not options.quiet:
+        print(format_summary(summary), file=sys.stderr)
+
+def repl(calculator, recorder=None):
+    """Prompts for commands and prints their results until 'exit' or 'quit'.
+
+    Args:
+        calculator (Calculator): The calculator to run the commands on.
+        recorder (Recorder): Records each command entered, if given.
+    """
     display_header("Welcome to the Calculator!")
     print(left_align_text("Type 'help' for a list of commands.") + "\n")
 
     while True:
-        user_input = input(">>> Enter a command: ").strip().lower()
+        user_input = input(">>> Enter a command: ").strip()
+        if recorder is not None and user_input:
+            recorder.record(user_input)
 
-        if user_input in ['exit', 'quit']:
+        if user_input.lower() in ['exit', 'quit']:
             display_header("Exiting the calculator.")
             break
 
-        parts = user_input.split()
-        command = parts[0]
-        args = parts[1:]
-
         try:
             # Convert arguments to float if possible
-            args = [float(arg) for arg in args]
+            command, args = parse_command(user_input)
             output = calculator.execute_command(command, *args)
 
             if isinstance(output, (int, float)):
                 display_header(f"Result: {output}")
-            elif isinstance(output, list):
+            elif isinstance(output, (list, HistoryView)):
                 display_header("History:")
-                for item in output:
-                    print(left_align_text(str(item), 50))
+                # Format entries lazily, a screen at a time, instead of building every line up front
+                page_lines(calculator.history.iter_history() if isinstance(output, HistoryView) else map(str, output))
+                print("\n")
+            elif isinstance(output, SweepCalculation):
+                display_header(str(output))
+                page_lines(output.lines())  # Rows are computed as they are shown
                 print("\n")
             else:
                 display_header(output)  # Messages like help text or errors
@@ -55,5 +289,28 @@ def main():
         except Exception as e:
             display_header(f"Error: {e}")
 
+def main(argv=None):
+    """Runs the calculator: interactively, or in batch mode when '--batch' is given.
+
+    Args:
+        argv (list): Command line arguments, without the program name. Defaults to none (interactive).
+    """
+    options = parse_arguments(argv or [])
+    if options.batch:
+        batch_main(options)
+        return
+
+    calculator = build_calculator(options)
+    recorder = None
+    if options.record:
+        from app.loadtest import Recorder  # Only needed when recording
+        recorder = Recorder(options.record)
+    try:
+        repl(calculator, recorder)
+    finally:
+        if recorder is not None:
+            recorder.close()
+        calculator.history.stop_publishing()
+
 if __name__ == "__main__":  # pragma: no cover
-    main()
+    main(sys.argv[1:])
@@ -0,0 +1,25 @@
+"""Tests for the microbenchmark suite runner and regression comparison."""
+from benchmarks.__main__ import main
+from benchmarks.suite import Metric, compare, run
+
+def test_run_produces_metrics():
+    """Test that a quick run reports every metric for the requested sizes."""
+    metrics = run(["parse", "history_memory"], sizes=[100])
+    assert set(metrics) == {"repl.parse_command", "history.bytes_per_entry[100]"}
+    assert all(metric.value > 0 for metric in metrics.values())
+
+def test_compare_flags_regressions():
+    """Test the threshold in both directions of 'better'."""
+    baseline = {"latency": Metric(100.0, "ns/op"), "throughput": Metric(1000.0, "ops/s", False),
+                "gone": Metric(1.0, "s")}
+    current = {"latency": Metric(125.0, "ns/op"), "throughput": Metric(950.0, "ops/s", False),
+               "new": Metric(1.0, "s")}
+    assert compare(baseline, current, threshold=0.1) == ["latency: 100 -> 125 ns/op (+25.0% worse)"]
+    assert compare(baseline, current, threshold=0.3) == []
+
+def test_main_baseline_roundtrip(tmpdir, capsys):
+    """Test writing a baseline and comparing a new run against it."""
+    baseline = str(tmpdir.join("baseline.json"))
+    assert main(["run", "--only", "parse", "--output", baseline]) == 0
+    assert main(["compare", baseline, "--only", "parse", "--threshold", "100"]) == 0
+    assert "repl.parse_command" in capsys.readouterr().out
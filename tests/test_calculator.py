@@ -1,8 +1,9 @@
 """Unit tests for the Calculator class."""
 # pylint: disable=redefined-outer-name
+import math
 from typing import Literal
 import pytest
-from app.calculator import Calculator
+from app.calculator import Calculator, parse_command
 
 @pytest.fixture
 def calculator():
@@ -25,6 +26,147 @@ def test_execute_command(calculator: Calculator, command: str, args: tuple[int,
     assert result == expected_output
 
 
+def test_history_filters(calculator: Calculator):
+    """Test the filters, ordering, and paging of the 'history' command."""
+    def run(line):
+        command, args = parse_command(line)
+        return calculator.execute_command(command, *args)
+
+    for line in ["add 5 3", "divide 10 4", "divide 30 3", "subtract 10 4", "divide 1 2"]:
+        run(line)
+    divisions = run("history divide min=2")
+    assert [str(calc) for calc in divisions] == ["10.0 division 4.0 = 2.5", "30.0 division 3.0 = 10.0"]
+    newest = run("history newest limit=1 last=60")
+    assert [str(calc) for calc in newest] == ["1.0 division 2.0 = 0.5"]
+    assert [calc.operand1 for calc in run("history offset=3")] == [10, 1]
+    assert run("history modulo") == "Error: Unknown history filter 'modulo'."
+    assert run("history limit=x") == "Error: Invalid value for history filter 'limit'."
+
+def test_reduction_commands(calculator: Calculator, tmpdir):
+    """Test reduction commands on numbers, command line text, files, and generators."""
+    assert calculator.execute_command('sum', 1, 2, 3) == 6
+    command, args = parse_command("MEAN 1 2 3 4")
+    assert calculator.execute_command(command, *args) == 2.5
+    values = tmpdir.join("Values.txt")
+    values.write("1, 2\n3 4\n")
+    command, args = parse_command(f"max @{values}")  # The path keeps its case
+    assert calculator.execute_command(command, *args) == 4.0
+    assert calculator.reduce('variance', (float(i) for i in range(1, 6))) == 2.5
+    assert calculator.execute_command('min') == "Error: min requires at least 1 value."
+    assert calculator.execute_command('sum', "1 two") == "Error: Value 2 is not a number."
+    assert calculator.execute_command('sum', "@missing.txt") == "Error: Could not read missing.txt."
+    assert [str(calc) for calc in calculator.history.get_history()] == [
+        "sum of 3 values = 6", "mean of 4 values = 2.5", "max of 4 values = 4.0", "variance of 5 values = 2.5",
+    ]
+    filename = str(tmpdir.join("history.json"))
+    calculator.history.save(filename)
+    calculator.history.load(filename)
+    assert str(calculator.history.get_history()[0]) == "sum of 3 values = 6"
+
+def test_references_and_variables(calculator: Calculator):
+    """Test 'ans', '$N', and variables, and that dependents are recomputed when a variable changes."""
+    def run(line):
+        command, args = parse_command(line)
+        return calculator.execute_command(command, *args)
+    assert run("add 1 2") == 3.0
+    assert run("multiply ans 10") == 30.0
+    assert run("let x = 5") == 5
+    assert run("let y = $x * 2") == 10
+    assert run("add $y $1") == 13.0
+    assert run("eval x + $2") == 35.0
+    assert run("let x = 7") == 7
+    assert calculator.graph.value(5) == 17.0 and calculator.graph.value(6) == 37.0
+    assert run("let") == "x = 7\ny = 14"
+    assert run("let x = y + 1") == "Error: Circular reference: x would depend on itself."
+    assert run("add $99 1") == "Error: Unknown reference '$99'."
+    assert str(calculator.history.get_history()[4]) == "10 addition 3.0 = 13.0"  # As first computed
+    run("undo")  # 'let x = 7'; the variable keeps its value
+    assert 6 in calculator.graph and run("undo").startswith("Undone") and 6 not in calculator.graph
+    assert run("clear") and run("let") == "No variables defined."
+
+def test_string_operands_are_not_references(calculator: Calculator):
+    """Test that only 'ans', '$N', and '$name' strings are references; other strings are invalid operands."""
+    calculator.execute_command('add', 30, 1)
+    invalid = "Error: Invalid number of arguments. Please provide two numbers."
+    assert calculator.execute_command('add', '1', 2) == invalid
+    assert calculator.execute_command('add', 'abc', 2) == invalid
+    assert calculator.execute_command('add', '$1', 2) == 33
+
+def test_graph_stays_lazy(calculator: Calculator):
+    """Test that sessions without references never create the calculation graph."""
+    calculator.execute_command('add', 1, 2)
+    calculator.undo()
+    calculator.clear()
+    assert calculator._graph is None  # pylint: disable=protected-access
+
+def test_evaluate(calculator: Calculator):
+    """Test evaluating expressions through the API and the 'eval' command."""
+    assert calculator.evaluate("(a + b) * c / d", a=1, b=2, c=3, d=4) == 2.25
+    assert calculator.execute_command('eval', "(a+b)*c a=1 b=2 c=3") == 9.0
+    assert calculator.execute_command('eval', "2 * -3 + 10") == 4
+    assert calculator.execute_command('eval', "1 / (x - 1) x=1") == "Error: Division by zero is undefined."
+    assert calculator.execute_command('eval', "a + 1") == "Error: Unknown variable 'a'."
+    assert calculator.execute_command('eval', "a + 1 a=z") == "Error: Invalid value for variable 'a'."
+    assert calculator.execute_command('eval', "(1 + 2") == "Error: Missing ')' in expression."
+
+    history = calculator.read_history()
+    assert len(history) == 3
+    assert str(history[1]) == "(a+b)*c [a=1.0, b=2.0, c=3.0] = 9.0"
+
+def test_result_cache():
+    """Test that cached results are returned, counted, and still logged to history."""
+    calculator = Calculator(cache_size=2)
+    assert calculator.execute_command('add', 1, 2) == 3
+    assert calculator.execute_command('add', 1, 2) == 3
+    assert calculator.execute_command('add', 1.0, 2.0) == 3.0
+    assert isinstance(calculator.execute_command('add', 1.0, 2.0), float)
+    assert calculator.execute_command('divide', 1, 0) == "Error: Division by zero is undefined."
+    assert calculator.execute_command('multiply', 2, 3) == 6  # Evicts ('add', 1, 2)
+
+    assert calculator.cache.stats() == {"size": 2, "max_size": 2, "hits": 2, "misses": 4, "evictions": 1}
+    assert calculator.execute_command('cache') == \
+        "Cache: 2/2 entries, 2 hits, 4 misses, 1 evictions, 33.3% hit rate"
+    assert [str(calc) for calc in calculator.read_history()] == [
+        "1 addition 2 = 3", "1 addition 2 = 3", "1.0 addition 2.0 = 3.0",
+        "1.0 addition 2.0 = 3.0", "2 multiplication 3 = 6"]
+
+def test_result_cache_keeps_zero_signs():
+    """Test that 0.0 and -0.0 operands do not share a cache entry."""
+    calculator = Calculator(cache_size=8)
+    assert math.copysign(1, calculator.execute_command('multiply', 1, 0.0)) == 1
+    assert math.copysign(1, calculator.execute_command('multiply', 1, -0.0)) == -1
+    assert math.copysign(1, calculator.read_history()[-1].result) == -1
+    assert calculator.execute_command('multiply', 1, -0.0) == 0 and calculator.cache.stats()["hits"] == 1
+
+def test_result_cache_disabled(calculator: Calculator):
+    """Test the cache command when the cache is disabled."""
+    assert calculator.execute_command('cache') == "Result cache is disabled."
+
+def test_instrumentation(tmpdir):
+    """Test per-command counts, errors, latencies, and history I/O statistics."""
+    calculator = Calculator(instrument=True)
+    calculator.execute_command('add', 1, 2)
+    calculator.execute_command('add', 3, 4)
+    calculator.execute_command('divide', 1, 0)
+    calculator.history.save(str(tmpdir.join("stats.json")))
+
+    snapshot = calculator.stats.snapshot()
+    assert snapshot['add']['count'] == 2 and snapshot['add']['errors'] == 0
+    assert snapshot['divide']['errors'] == 1
+    assert snapshot['history.save']['count'] == 1
+    assert 0 < snapshot['add']['p50_ns'] <= snapshot['add']['p99_ns'] <= snapshot['add']['max_ns']
+    table = calculator.execute_command('stats')
+    assert table.splitlines()[0].split() == ['command', 'count', 'errors', 'p50', 'us', 'p95', 'us', 'p99', 'us']
+    assert "divide" in table
+
+    calculator.stats.reset()
+    assert calculator.show_stats() == "No commands recorded."
+
+def test_instrumentation_disabled(calculator: Calculator):
+    """Test that uninstrumented calculators use the plain method and report that stats are off."""
+    assert calculator.execute_command.__func__ is Calculator.execute_command
+    assert calculator.execute_command('stats') == "Instrumentation is disabled."
+
 def test_show_help(calculator: Calculator):
     """Test the show_help method to ensure it returns the correct help text."""
     expected_help_text = (
@@ -35,11 +177,19 @@ def test_show_help(calculator: Calculator):
         "- subtract: Subtract the second number from the first\n"
         "- multiply: Multiply two numbers\n"
         "- divide: Divide the first number by the second\n"
+        "- eval: Evaluate an expression, e.g. eval (a + b) * c a=1 b=2 c=3\n"
+        "- let: Define a variable, e.g. let x = 5, then add $x ans or eval x * $3 (recomputed when x changes)\n"
+        "- sum/product/mean/variance/min/max: Reduce many values, e.g. mean 1 2 3 or sum @values.txt\n"
+        "- pipeline: Run an operation over a numeric file, e.g. pipeline divide in.npy out.npy zero_policy=nan\n"
+        "- sweep: Tabulate an operation over two ranges, e.g. sweep multiply 1:10 1:10\n"
         "\n"
         "History Commands:\n"
         "- undo: Undo the last calculation\n"
-        "- clear: Clear the calculation history\n"
-        "- history: Read the calculation history\n"
+        "- clear: Clear the calculation history and variables\n"
+        "- history: Read the calculation history, e.g. history divide min=5 limit=10\n"
+        "- summary: Show counts per operation and the sum, mean, min, and max of results, e.g. summary 10\n"
+        "- cache: Show result cache statistics\n"
+        "- stats: Show command counts, errors, and latencies\n"
         "\n"
         "File Commands:\n"
         "- save: Save the current history to a file\n"
@@ -97,3 +247,68 @@ def test_read_history(calculator: Calculator):
                 return args[0] / args[1]
             else:
                 return "Error: Unknown command."
+
+def test_show_summary(calculator: Calculator):
+    """Test the summary command over calculations and undo."""
+    assert calculator.execute_command('summary') == "History is empty."
+    calculator.execute_command('add', 5, 3)
+    calculator.execute_command('multiply', 2, 3)
+    calculator.execute_command('divide', 1, 4)
+    calculator.execute_command('undo')
+    lines = calculator.execute_command('summary', '1').splitlines()
+    assert lines[0] == "Entries: 2 (2 with a result)"
+    assert lines[1] == "By operation: addition 1, multiplication 1"
+    assert lines[2] == "Sum: 14.0, mean: 7.0, min: 6.0, max: 8"
+    assert lines[3:] == ["Last 1:", "  2 multiplication 3 = 6"]
+    assert calculator.execute_command('summary', 'x').startswith("Error: Usage: summary")
+
+def test_execute_batch(calculator: Calculator):
+    """Test that a batch is computed in one call and logged as a single history entry."""
+    results = calculator.execute_batch('multiply', [1, 2, 3], [4, 5, 6])
+    assert list(results) == [4.0, 10.0, 18.0]
+    history = calculator.read_history()
+    assert len(history) == 1
+    assert str(history[0]) == "batch multiplication x 3"
+
+def test_execute_batch_division_policies(calculator: Calculator):
+    """Test the zero-divisor policies of a division batch."""
+    results = calculator.execute_batch('divide', [1, -1, 0, 6], [0, 0, 0, 3])
+    assert results[0] == float('inf') and results[1] == float('-inf')
+    assert results[2] != results[2]  # NaN for 0/0
+    assert results[3] == 2.0
+
+    assert calculator.execute_batch('divide', [1], [0], zero_policy='raise') == \
+        "Error: Division by zero is undefined."
+    assert len(calculator.read_history()) == 1  # Failed batches are not logged
+
+def test_execute_batch_errors(calculator: Calculator):
+    """Test error handling for unknown commands and mismatched columns."""
+    assert calculator.execute_batch('history', [1], [2]) == "Error: Unknown command."
+    assert calculator.execute_batch('add', [1, 2], [3]) == \
+        "Error: Batch operands must have the same length, got 2 and 1."
+    assert calculator.execute_batch('add', ['a'], [3]).startswith("Error: Invalid batch operand")
+
+def test_sweep(calculator: Calculator):
+    """Test that a sweep streams its table in chunks and is logged as one range entry."""
+    sweep = calculator.execute_command('sweep', 'multiply 1:3 2:10:4')
+    assert str(sweep) == "sweep multiplication 1:3 x 2:10:4 (9 cells)"
+    assert list(sweep.lines()) == ["\t2\t6\t10", "1\t2\t6\t10", "2\t4\t12\t20", "3\t6\t18\t30"]
+    assert [(operand1, list(row)) for operand1, row in sweep.rows(chunk_cells=4)] == \
+        [(1.0, [2.0, 6.0, 10.0]), (2.0, [4.0, 12.0, 20.0]), (3.0, [6.0, 18.0, 30.0])]
+    assert [str(entry) for entry in calculator.read_history()] == [str(sweep)]
+
+    sweep = calculator.sweep('divide', (1, 2), (-1, 1, 0.5), zero_policy='nan')
+    assert list(sweep.lines())[1] == "1\t-1\t-2\tnan\t2\t1"
+    wide = calculator.sweep('add', (0, 9999), (0, 9999))
+    assert len(wide) == 100_000_000 and next(wide.rows())[1][9999] == 9999.0
+
+def test_sweep_errors(calculator: Calculator):
+    """Test that invalid sweeps are rejected before anything is logged."""
+    assert calculator.execute_command('sweep', 'multiply 1:3').startswith("Error: Usage: sweep")
+    assert calculator.execute_command('sweep', 'multiply 1:3 5:1') == \
+        "Error: Empty range 5:1; the step must lead from the start to the stop."
+    assert calculator.execute_command('sweep', 'multiply 1:3 1-5').startswith("Error: Invalid range")
+    assert calculator.execute_command('sweep', 'history 1:3 1:3') == "Error: Unknown command."
+    assert calculator.execute_command('sweep', 'divide 1:3 0:1 zero_policy=raise') == \
+        "Error: Division by zero is undefined."
+    assert not calculator.read_history()
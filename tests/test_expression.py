@@ -0,0 +1,42 @@
+"""Tests for the expression compiler."""
+import re
+import pytest
+from app.expression import CompiledExpression, ExpressionError, compile_expression
+
+@pytest.mark.parametrize("text, bindings, expected", [
+    ("1 + 2 * 3", {}, 7),
+    ("(1 + 2) * 3", {}, 9),
+    ("8 - 3 - 2", {}, 3),
+    ("16 / 4 / 2", {}, 2.0),
+    ("-x + +y", {"x": 2, "y": 5}, 3),
+    ("2.5e1 / .5", {}, 50.0),
+    ("rate * (total - fee)", {"rate": 0.5, "total": 10, "fee": 2}, 4.0),
+])
+def test_evaluate(text, bindings, expected):
+    """Test precedence, associativity, unary signs, number formats, and variables."""
+    assert CompiledExpression(text).evaluate(**bindings) == expected
+
+def test_constant_folding():
+    """Test that constant sub-expressions are folded while a division by zero is kept for runtime."""
+    assert not compile_expression("2 * (3 + 4)").variables
+    assert compile_expression("x * (3 + 4)").variables == frozenset({"x"})
+    plan = CompiledExpression("1 / 0")
+    with pytest.raises(ValueError, match="Division by zero is undefined."):
+        plan.evaluate()
+
+def test_plan_cache():
+    """Test that compiling the same text twice returns the cached plan."""
+    assert compile_expression("(a + b) * c") is compile_expression("(a + b) * c")
+
+@pytest.mark.parametrize("text, message", [
+    ("", "Empty expression."),
+    ("1 +", "Unexpected end of expression."),
+    ("(1 + 2", "Missing ')' in expression."),
+    ("1 2", "Unexpected '2' in expression."),
+    ("1 % 2", "Unexpected character '%' in expression."),
+    ("* 2", "Unexpected '*' in expression."),
+])
+def test_invalid_expressions(text, message):
+    """Test error messages for malformed expressions."""
+    with pytest.raises(ExpressionError, match=re.escape(message)):
+        CompiledExpression(text)
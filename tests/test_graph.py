@@ -0,0 +1,42 @@
+"""Tests for the dependency-tracked calculation graph."""
+import pytest
+from app.calculation import Calculation, ExpressionCalculation
+from app.graph import CalculationGraph, GraphError
+from app.operations.builtin import OPERATIONS
+
+def constant(value):
+    """Return a calculation of a constant."""
+    return ExpressionCalculation(str(value))
+
+def test_recompute_only_dependents():
+    """Test that redefining a cell in a large graph recomputes just its dependents, in topological order."""
+    graph = CalculationGraph()
+    for number in range(100_000):
+        graph.define(f"c{number}", Calculation(OPERATIONS["add"], number, 0), {})
+    graph.define("x", constant(1), {})
+    graph.define("double", ExpressionCalculation("x * 2"), {"x": "x"})
+    graph.define("sum", ExpressionCalculation("x + double"), {"x": "x", "double": "double"})
+    graph.define(1, Calculation(OPERATIONS["add"], 0, 100), {"operand1": "sum"})
+    assert graph.define("x", constant(5), {}) == ["double", "sum", 1]
+    assert (graph.value("double"), graph.value("sum"), graph.value(1)) == (10, 15, 115)
+    assert graph.define("c7", constant(0), {}) == []
+
+def test_errors_and_cycles():
+    """Test circular references, error propagation, and removing a referenced cell."""
+    graph = CalculationGraph()
+    graph.define("x", constant(2), {})
+    graph.define("y", ExpressionCalculation("1 / x"), {"x": "x"})
+    graph.define("z", ExpressionCalculation("y + 1"), {"y": "y"})
+    with pytest.raises(GraphError, match="Circular reference"):
+        graph.define("x", ExpressionCalculation("z"), {"z": "z"})
+    assert graph.value("x") == 2
+    with pytest.raises(GraphError, match="Unknown reference 'w'"):
+        graph.define("x", ExpressionCalculation("w"), {"w": "w"})
+    graph.define("x", constant(0), {})
+    with pytest.raises(GraphError, match="Division by zero"):
+        graph.value("z")
+    graph.define("x", constant(4), {})
+    assert graph.value("z") == 1.25
+    assert graph.remove("y") == ["z"]
+    with pytest.raises(GraphError, match="y no longer exists"):
+        graph.value("z")
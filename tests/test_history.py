@@ -3,10 +3,23 @@ Tests for the History class and its functionality in the calculator app.
 
 Covers adding, undoing, clearing, saving, and loading calculation history.
 """
+import math
+import multiprocessing
+import os
+import threading
+import time
+from array import array
+from fractions import Fraction
+import tracemalloc
 from unittest.mock import mock_open, patch
 import pytest
+from app import history as history_module
 from app.history import History
-from app.calculation import Calculation # type: ignore
+from app.history.archive import HistoryArchive, decode_block, encode_block
+from app.history.shared import ADD, CLEAR, OBJECT, UNDO, HistoryReader
+from app.calculation import ( # type: ignore
+    BatchCalculation, Calculation, ExpressionCalculation, ReductionCalculation, SweepCalculation,
+)
 from app.operations.addition import Addition # type: ignore
 from app.operations.subtraction import Subtraction # type: ignore
 
@@ -54,7 +67,7 @@ def test_save_load_history_without_serialization(history, sample_calculation):
         save_result = history.save("test_history.json")
         mocked_file.assert_called_once_with("test_history.json", 'w')
         mocked_json_dump.assert_called_once_with(
-            [calc.__dict__ for calc in history.get_history()], mocked_file())
+            [calc.to_dict() for calc in history.get_history()], mocked_file())
         assert save_result == "History saved to test_history.json."
 
     mock_data = '[{"operand1": 5, "operand2": 3, "operation": "Addition"}]'
@@ -89,3 +102,603 @@ def test_load_invalid_json_format(history, tmpdir):
     result = history.load(str(filename))
     assert "Error: Failed to decode history data" in result
 
+
+def test_history_preserves_operand_types(history):
+    """Test that entries read back from the columns keep their int/float types and results."""
+    calculation = Calculation(operation=Subtraction(), operand1=10, operand2=2.5)
+    calculation.execute()
+    history.add_calculation(calculation)
+    stored = history.get_history()[0]
+    assert stored == calculation
+    assert isinstance(stored.operand1, int) and isinstance(stored.operand2, float)
+    assert str(stored) == "10 subtraction 2.5 = 7.5"
+
+def test_history_stores_objects_and_views(history, sample_calculation):
+    """Test that non-columnar entries round-trip and that the view supports slicing."""
+    batch = BatchCalculation(Addition(), [1, 2], [3, 4])
+    batch.execute()
+    history.add_calculation(sample_calculation)
+    history.add_calculation(batch)
+    view = history.get_history()
+    assert view[1] is batch
+    assert view[-2:] == [sample_calculation, batch]
+    assert list(view) == [sample_calculation, batch]
+    with pytest.raises(IndexError):
+        view[2]  # pylint: disable=pointless-statement
+    assert history.undo() == "Undone: batch addition x 2"
+    assert len(view) == 1
+
+class _DictCalculation:  # pylint: disable=too-few-public-methods
+    """The pre-columnar Calculation layout: one __dict__-backed object per entry."""
+
+    def __init__(self, operation, operand1, operand2):
+        self.operation = operation
+        self.operand1 = operand1
+        self.operand2 = operand2
+        self.result = operand1 + operand2
+
+def test_history_memory_per_entry():
+    """Test that columnar storage uses at least 5x fewer bytes per entry than a list of objects."""
+    count = 20_000
+    operation = Addition()
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        objects = [_DictCalculation(operation, i + 0.5, 2.5) for i in range(count)]
+        object_bytes = tracemalloc.get_traced_memory()[0] - baseline
+        del objects
+
+        baseline = tracemalloc.get_traced_memory()[0]
+        columnar = History()
+        for i in range(count):
+            calculation = Calculation(operation, i + 0.5, 2.5)
+            calculation.execute()
+            columnar.add_calculation(calculation)
+        columnar_bytes = tracemalloc.get_traced_memory()[0] - baseline
+    finally:
+        tracemalloc.stop()
+    assert object_bytes >= 5 * columnar_bytes
+
+def test_autosave_recovers_from_log(tmpdir, sample_calculation):
+    """Test that a history with autosave enabled is recovered from its log after a crash."""
+    filename = str(tmpdir.join("autosave.json"))
+    history = History()
+    assert history.enable_autosave(filename, compact_every=100) == f"Autosave enabled to {filename}."
+    sample_calculation.execute()
+    batch = BatchCalculation(Subtraction(), [5, 6], [1, 1])
+    batch.execute()
+    history.add_calculation(sample_calculation)
+    history.add_calculation(Calculation(Subtraction(), 1.5, 2))
+    history.add_calculation(batch)
+    history.undo()
+    history.add_calculation(sample_calculation)
+    # No save or disable_autosave: the process "crashes" here
+
+    recovered = History()
+    recovered.enable_autosave(filename)
+    assert list(recovered.get_history()) == [
+        sample_calculation, Calculation(Subtraction(), 1.5, 2), sample_calculation]
+
+    recovered.clear()
+    recovered.disable_autosave()
+    assert History().load(filename) == f"History loaded from {filename}."
+    reloaded = History()
+    reloaded.load(filename)
+    assert not reloaded.get_history()
+
+def test_autosave_compacts_log(tmpdir, sample_calculation):
+    """Test that the log is folded into the snapshot instead of growing without bound."""
+    filename = str(tmpdir.join("compact.json"))
+    history = History()
+    history.enable_autosave(filename, batch_size=4, compact_every=8)
+    for _ in range(20):
+        history.add_calculation(sample_calculation)
+    history.disable_autosave()
+    with open(filename + ".wal", encoding="utf-8") as file:
+        assert len(file.readlines()) < 20
+
+    reloaded = History()
+    reloaded.load(filename)
+    assert len(reloaded.get_history()) == 20
+
+def test_autosave_compacts_in_background(tmpdir, sample_calculation):
+    """Test that compaction runs off the adding thread, and that a rotated log is recovered if it never finishes."""
+    filename = str(tmpdir.join("background.json"))
+    history = History()
+    history.enable_autosave(filename, compact_every=8)
+    release, compact = threading.Event(), history_module._compact_log
+    def blocked_compaction(*args):
+        release.wait(10)
+        compact(*args)
+    with patch("app.history._compact_log", blocked_compaction):
+        for _ in range(20):
+            history.add_calculation(sample_calculation)  # Does not wait for the blocked compaction
+        assert os.path.exists(filename + ".wal.1")
+        crashed = History()  # As if the process died mid-compaction: snapshot, rotated log, then log
+        crashed.load(filename)
+        assert len(crashed) == 20
+        release.set()
+        history.disable_autosave()
+    assert not os.path.exists(filename + ".wal.1")
+    reloaded = History()
+    reloaded.load(filename)
+    assert len(reloaded) == 20
+
+def test_autosave_compaction_crash_before_removing_log(tmpdir):
+    """Test that a rotated log folded into the snapshot is not replayed again if it outlives the compaction."""
+    for filename in (str(tmpdir.join("crash.json")), str(tmpdir.join("crash.bin"))):
+        history, reference = History(), History()
+        history.enable_autosave(filename, compact_every=8)
+        compact = history_module._compact_log
+        def crashing_compaction(*args):
+            try:
+                compact(*args)
+            except OSError:
+                pass  # The process "dies" after replacing the snapshot, before removing the rotated log
+        with patch("app.history._compact_log", crashing_compaction), \
+                patch("os.remove", side_effect=OSError("crashed")):
+            for i in range(10):
+                for target in (history, reference):
+                    target.add_result(Addition(), i, 1, i + 1)
+            history.undo()
+            reference.undo()
+            history.disable_autosave()
+        assert os.path.exists(filename + ".wal.1")
+        recovered = History()
+        recovered.load(filename)
+        assert [str(calc) for calc in recovered.get_history()] == [str(calc) for calc in reference.get_history()]
+
+        recovered.enable_autosave(filename, compact_every=8)  # Folds the leftover log, then removes it
+        assert not os.path.exists(filename + ".wal.1")
+        recovered.disable_autosave()
+        reloaded = History()
+        reloaded.load(filename)
+        assert len(reloaded) == 9
+
+def test_autosave_ignores_torn_record(tmpdir, sample_calculation):
+    """Test that a partially written final log record is skipped during recovery."""
+    filename = str(tmpdir.join("torn.json"))
+    history = History()
+    history.enable_autosave(filename)
+    history.add_calculation(sample_calculation)
+    with open(filename + ".wal", "a", encoding="utf-8") as file:
+        file.write('["a", 257, 1')
+    recovered = History()
+    recovered.enable_autosave(filename)
+    assert list(recovered.get_history()) == [sample_calculation]
+
+def test_save_load_binary(tmpdir, sample_calculation):
+    """Test saving to and lazily loading from the binary history format."""
+    filename = str(tmpdir.join("history.bin"))
+    sample_calculation.execute()
+    batch = BatchCalculation(Addition(), [1.5], [2])
+    batch.execute()
+    history = History()
+    history.add_calculation(sample_calculation)
+    history.add_calculation(batch)
+    history.add_calculation(Calculation(Subtraction(), 2.5, 1))
+    assert history.save(filename) == f"History saved to {filename}."
+
+    loaded = History()
+    assert loaded.load(filename) == f"History loaded from {filename}."
+    view = loaded.get_history()
+    assert len(view) == 3
+    assert view[0] == sample_calculation
+    assert str(view[1]) == "batch addition x 1" and list(view[1].results) == [3.5]
+    assert str(view[2]) == "2.5 subtraction 1 = Not calculated"
+
+    loaded.add_calculation(sample_calculation)
+    loaded.undo()
+    loaded.undo()  # Crosses from the in-memory tail into the mapped records
+    assert len(view) == 2
+    assert view[-1] is view[1]
+
+def test_save_load_archive(tmpdir, sample_calculation):
+    """Test that archives load lazily and that saving again only appends the new entries."""
+    filename = str(tmpdir.join("history.archive"))
+    sample_calculation.execute()
+    batch = BatchCalculation(Addition(), [1.5], [2])
+    batch.execute()
+    history = History()
+    for i in range(100):
+        history.add_result(Subtraction(), i, 0.5, i - 0.5)
+    history.add_calculation(batch)
+    assert history.save(filename) == f"History saved to {filename}."
+    history.add_calculation(sample_calculation)
+    assert history.save(filename) == f"History saved to {filename}."
+
+    loaded = History()
+    assert loaded.load(filename) == f"History loaded from {filename}."
+    assert [str(calc) for calc in loaded.get_history()] == [str(calc) for calc in history.get_history()]
+    assert list(loaded.get_history()[100].results) == [3.5]
+    loaded.undo()
+    loaded.undo()
+    loaded.add_result(Addition(), 1, 2, 3)
+    assert loaded.save(filename) == f"History saved to {filename}."  # Truncated, then appended
+    reloaded = History()
+    reloaded.load(filename)
+    assert len(reloaded) == 101
+    assert str(reloaded.get_history()[-1]) == "1 addition 2 = 3"
+    assert History().load(str(tmpdir.join("missing.archive"))).startswith("Error:")
+
+def test_archive_undo_and_clear_then_save(tmpdir):
+    """Test that entries undone or cleared before a save do not come back when the archive is loaded."""
+    filename = str(tmpdir.join("history.archive"))
+    history = History()
+    for i in range(5):
+        history.add_result(Addition(), i, 1, i + 1)
+    history.save(filename)
+    history.undo()
+    history.save(filename)
+    loaded = History()
+    loaded.load(filename)
+    assert [calc.result for calc in loaded.get_history()] == [1, 2, 3, 4]
+    loaded.clear()
+    loaded.add_result(Addition(), 10, 1, 11)
+    loaded.save(filename)
+    reloaded = History()
+    reloaded.load(filename)
+    assert [calc.result for calc in reloaded.get_history()] == [11]
+    reloaded.clear()
+    reloaded.save(filename)
+    empty = History()
+    empty.load(filename)
+    assert len(empty) == 0
+
+def test_archive_save_twice_from_spilled_and_other_histories(tmpdir):
+    """Test saving a spilled history to an archive twice, and that another history replaces the archive."""
+    filename = str(tmpdir.join("history.archive"))
+    spilled, reference = History(max_entries=4), History()
+    for history in (spilled, reference):
+        for i in range(10):
+            history.add_result(Addition(), i, 1, i + 1)
+        batch = BatchCalculation(Addition(), [1], [2])
+        batch.execute()
+        history.add_calculation(batch)
+    spilled.save(filename)
+    spilled.save(filename)
+    loaded = History()
+    loaded.load(filename)
+    assert [str(calc) for calc in loaded.get_history()] == [str(calc) for calc in reference.get_history()]
+    for history in (spilled, reference):
+        history.undo()
+        history.undo()
+        history.add_result(Addition(), 5, 5, 10)
+    spilled.save(filename)
+    loaded = History(max_entries=4)
+    loaded.load(filename)
+    assert [str(calc) for calc in loaded.get_history()] == [str(calc) for calc in reference.get_history()]
+    loaded.add_result(Addition(), 6, 6, 12)
+    loaded.save(filename)  # Loaded into a spilled history, so it only appends
+    with HistoryArchive(filename) as saved:
+        assert len(saved) == 11
+
+    other = History()
+    for i in range(3):
+        other.add_result(Addition(), i, 2, i + 2)
+    other.save(filename)
+    replaced = History()
+    replaced.load(filename)
+    assert [calc.result for calc in replaced.get_history()] == [2, 3, 4]
+
+def test_archive_truncate_sealed_segments(tmpdir):
+    """Test truncating an archive back into a sealed segment, and reopening it."""
+    records = [(1, float(i), 2.0, i + 2.0) for i in range(5000)]
+    directory = str(tmpdir.join("truncated.archive"))
+    with HistoryArchive(directory, segment_entries=1500) as archive:
+        archive.extend(records, {})
+        archive.flush()
+        archive.truncate(2000)
+        assert list(archive.records()) == records[:2000]
+        archive.extend(records[2000:2100], {})
+    with HistoryArchive(directory) as archive:
+        assert len(archive) == 2100
+        assert list(archive.records(1400)) == records[1400:2100]
+        with pytest.raises(ValueError):
+            archive.truncate(2101)
+
+@pytest.mark.parametrize("codec", ["zlib", "lzma"])
+def test_archive_segments_and_seek(tmpdir, codec):
+    """Test that full segments are compressed on rotation and read back by position."""
+    records = [((i % 3 + 1) | 0x100, float(i), 1.0 / (i + 1), float(i * i)) for i in range(5000)]
+    directory = str(tmpdir.join("rotated.archive"))
+    with HistoryArchive(directory, segment_entries=1500, codec=codec) as archive:
+        archive.extend(records, {})
+        assert archive.record(4999) == records[4999]  # Still in the active segment
+    assert sorted(os.listdir(directory)) == ["active.bin", "segment-000001.hza", "segment-000002.hza",
+                                             "segment-000003.hza"]
+    with HistoryArchive(directory) as archive:
+        assert len(archive) == 5000
+        assert archive.disk_bytes() < 5000 * 32
+        for index in (0, 1023, 1024, 1499, 1500, 3001, 4500, 4999):
+            assert archive.record(index) == records[index]
+        assert list(archive.records(2990)) == records[2990:]
+        with pytest.raises(IndexError):
+            archive.record(5000)
+
+def test_archive_block_encoding():
+    """Test block encoding with the dictionary of codes, and with too many codes for one."""
+    for codes in ([257, 258, 257], list(range(300))):
+        columns = tuple(array("d", [float(i) + k for i in range(len(codes))]) for k in range(3))
+        block = encode_block(array("H", codes), columns)
+        assert decode_block(block) == (array("H", codes), *columns)
+
+def test_load_invalid_binary(tmpdir):
+    """Test loading a file with a '.bin' name that is not a binary history."""
+    filename = tmpdir.join("invalid.bin")
+    filename.write_binary(b"not a history file at all, but long enough to have a header")
+    result = History().load(str(filename))
+    assert "Error: Failed to decode history data" in result
+
+def test_thread_safe_history_stress():
+    """Test concurrent appends, undos, and reads on a shared thread-safe history."""
+    shared = History(thread_safe=True)
+    operation = Addition()
+    threads, per_thread = 8, 3000
+    undone = []
+
+    def worker(thread_id):
+        for i in range(per_thread):
+            shared.add_result(operation, thread_id, i, thread_id + i)
+            if i % 500 == 0:
+                undone.append(shared.undo().startswith("Undone"))
+                assert len(shared.get_history()) >= 0
+
+    workers = [threading.Thread(target=worker, args=(thread_id,)) for thread_id in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+
+    entries = list(shared.get_history())
+    assert len(entries) == threads * per_thread - sum(undone)
+    for thread_id in range(threads):
+        sequence = [calc.operand2 for calc in entries if calc.operand1 == thread_id]
+        assert sequence == sorted(sequence)  # Each thread's appends keep their program order
+    assert shared.clear() == "History cleared."
+    assert not shared.get_history()
+
+def test_query_filters_and_pagination(history):
+    """Test indexed queries by operation, result and operand range, and time, with undo and paging."""
+    for i in range(200):
+        history.add_result(Addition(), i, 1, i + 1)
+        history.add_result(Subtraction(), i, 1, i - 1)
+    assert history.query() == list(history.get_history())
+    additions = history.query("Addition", min_result=50, max_result=59)
+    assert [calc.result for calc in additions] == list(range(50, 60))
+    assert [calc.operand1 for calc in history.query(Subtraction(), offset=5, limit=3)] == [5, 6, 7]
+    assert [calc.result for calc in history.query(min_result=198, newest_first=True)] == [198, 200, 199, 198]
+    assert len(history.query(min_operand=1, max_operand=1)) == 2
+    history.undo()  # Drops the newest subtraction from every index
+    assert history.query("Subtraction", min_result=198) == []
+    history.add_result(Subtraction(), 500, 1, 499)
+    assert [calc.operand1 for calc in history.query(min_result=400)] == [500]
+    assert len(history.query(since=0)) == len(history)
+    assert history.query(until=0) == []
+    with pytest.raises(TypeError):
+        history.query("Modulo")
+
+def test_query_under_memory_cap(tmpdir):
+    """Test that a capped history answers queries across spilled entries and keeps its indexes capped."""
+    capped = History(max_entries=2000, spill_directory=str(tmpdir.join("spill")))
+    for i in range(5000):
+        capped.add_result(Addition() if i % 2 else Subtraction(), i, 1, i)
+    time.sleep(0.01)
+    middle = time.time()
+    for i in range(5000, 60_000):
+        capped.add_result(Addition() if i % 2 else Subtraction(), i, 1, i)
+    tracemalloc.start()
+    try:
+        assert [calc.result for calc in capped.query("Addition", max_result=10)] == [1, 3, 5, 7, 9]
+        assert [calc.result for calc in capped.query(min_result=59_997)] == [59_997, 59_998, 59_999]
+        assert len(capped.query("Subtraction", limit=10, newest_first=True)) == 10
+        assert capped.query(since=middle, limit=1)[0].result == 5000
+        assert len(capped.query(until=middle, min_result=4990)) == 10
+        for i in range(60_000, 80_000):
+            capped.add_result(Addition(), i, 1, i)
+        retained = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    assert retained < 500_000  # Indexes over all 80,000 entries would take about 2 MB
+    for _ in range(10_000):  # Back across the spill boundary
+        capped.undo()
+    assert [calc.result for calc in capped.query(min_result=69_998)] == [69_998, 69_999]
+    assert capped.query(since=middle)[-1].result == 69_999
+
+def test_query_after_load(history, tmpdir, sample_calculation):
+    """Test that restored entries are queryable but have no add time."""
+    filename = str(tmpdir.join("history.bin"))
+    sample_calculation.execute()
+    history.add_calculation(sample_calculation)
+    history.save(filename)
+    restored = History()
+    restored.load(filename)
+    assert len(restored.query("Addition", min_result=8)) == 1
+    assert restored.query(since=0) == []
+    restored.add_result(Addition(), 1, 2, 3)
+    assert [calc.result for calc in restored.query(since=0)] == [3]
+    restored.undo()
+    restored.undo()
+    assert restored.query() == []
+
+def test_summary_special_results_and_entry_kinds(history):
+    """Test the aggregates over infinite, NaN, overflowing, and missing results, and every kind of object entry."""
+    history.summary()  # Built now, so the entries below update it
+    history.add_calculation(Calculation(Addition(), 1, 2))  # Not calculated: no result
+    history.undo()
+    expression, reduction = ExpressionCalculation("x + 1", {"x": 2}), ReductionCalculation("sum", [1, 2])
+    expression.execute()
+    reduction.execute()
+    for entry in (expression, reduction, Calculation(Addition(), Fraction(1, 2), 1)):
+        history.add_calculation(entry)
+    assert history.summary()["by_operation"] == {"expression": 1, "sum": 1, "addition": 1}
+    assert history.summary()["sum"] == 6.0
+    for result in (math.inf, math.nan, -math.inf):
+        history.add_result(Addition(), 1.0, 1.0, result)
+    assert math.isnan(history.summary()["sum"]) and math.isnan(history.summary()["mean"])
+    history.undo()
+    history.undo()
+    assert history.summary()["sum"] == math.inf and history.summary()["mean"] == math.inf
+    assert history.summary()["max"] == math.inf
+    history.add_result(Addition(), 1.0, 1.0, -math.inf)
+    history.undo()
+    history.undo()
+    assert history.summary()["sum"] == 6.0 and history.summary()["max"] == 3
+    history.add_result(Addition(), 1e308, 1e308, -1.7e308)
+    history.add_result(Addition(), 1e308, 1e308, -1.7e308)
+    assert history.summary()["sum"] == -math.inf and history.summary()["mean"] == -math.inf
+    history.undo()
+    assert history.summary()["sum"] == -1.7e308 + 6.0
+
+def test_summary_aggregates(history, tmpdir):
+    """Test that the running aggregates match a recomputation after adds, undos, clear, and load."""
+    results = [3.0, 0.1, 7.5, 7.5, -2.0, 0.2, 7.5, 9.0]
+    for result in results:
+        history.add_result(Addition(), result, 0, result)
+    batch = BatchCalculation(Subtraction(), [1], [1])
+    batch.execute()
+    history.add_calculation(batch)
+    summary = history.summary(last=2)
+    assert summary["entries"] == 9 and summary["results"] == 8
+    assert summary["by_operation"] == {"addition": 8, "batch": 1}
+    assert summary["sum"] == math.fsum(results) and summary["mean"] == math.fsum(results) / 8
+    assert (summary["min"], summary["max"]) == (-2.0, 9.0)
+    assert [str(entry) for entry in summary["last"]] == ["9.0 addition 0 = 9.0", "batch subtraction x 1"]
+    for remaining in (7, 6, 4, 1):
+        while len(history.get_history()) > remaining:
+            history.undo()
+        summary = history.summary(last=0)
+        assert summary["sum"] == math.fsum(results[:remaining])
+        assert (summary["min"], summary["max"]) == (min(results[:remaining]), max(results[:remaining]))
+        assert summary["by_operation"] == {"addition": remaining}
+
+    filename = str(tmpdir.join("history.bin"))
+    history.add_result(Subtraction(), 1, 5, -4)
+    history.save(filename)
+    history.clear()
+    assert history.summary()["by_operation"] == {} and history.summary()["min"] is None
+    history.load(filename)
+    history.undo()
+    assert history.summary()["sum"] == 3.0 and history.summary()["by_operation"] == {"addition": 1}
+
+@pytest.mark.parametrize("extension", [".json", ".bin"])
+def test_save_load_sweep(history, tmpdir, extension):
+    """Test that a sweep entry is saved as its ranges and rebuilt with the same table."""
+    sweep = SweepCalculation(Subtraction(), (0, 1, 0.25), (10, 30, 10))
+    history.add_calculation(sweep)
+    filename = str(tmpdir.join("history" + extension))
+    history.save(filename)
+    restored = History()
+    restored.load(filename)
+    entry = restored.get_history()[0]
+    assert isinstance(entry, SweepCalculation) and str(entry) == "sweep subtraction 0:1:0.25 x 10:30:10 (15 cells)"
+    assert list(entry.lines()) == list(sweep.lines())
+    assert restored.summary()["by_operation"] == {"sweep": 1}
+
+def _mirror(events, entries):
+    """Apply published events to a list of entry descriptions."""
+    for event in events:
+        if event.kind == CLEAR:
+            entries.clear()
+        elif event.kind == UNDO:
+            assert event.position == len(entries) - 1
+            entries.pop()
+        else:
+            assert event.position == len(entries)
+            entries.append(str(event.calculation()) if event.kind == ADD else f"object = {event.result}")
+    return entries
+
+def test_publish_shared_memory(history, tmpdir):
+    """Test that a reader can rebuild a published history from its events, across undo, clear, and load."""
+    history.add_result(Addition(), 1, 2, 3)
+    name = history.publish(capacity=16)
+    with HistoryReader(name, from_start=True) as reader, HistoryReader(name) as tail:
+        assert _mirror(reader.poll(), []) == ["1 addition 2 = 3"]
+        batch = BatchCalculation(Addition(), [1], [2])
+        batch.execute()
+        history.add_calculation(batch)
+        history.add_result(Subtraction(), 5, 1, 4)
+        history.undo()
+        assert [event.kind for event in tail.poll()] == [OBJECT, ADD, UNDO]
+        filename = str(tmpdir.join("history.bin"))
+        history.save(filename)
+        history.clear()
+        history.add_result(Subtraction(), 5, 1.5, 3.5)
+        history.load(filename)
+        entries = _mirror(reader.poll(), ["1 addition 2 = 3"])
+        assert entries == ["1 addition 2 = 3", "object = nan"] and reader.lost == 0
+
+        for i in range(40):  # Events 10 to 49 overrun the ring of 16 before the reader gets to them
+            history.add_result(Addition(), i, 0, i)
+        events = reader.poll(limit=10)
+        assert reader.lost == 24 and len(events) == 10 and events[0].calculation().operand1 == 24
+        assert len(reader.poll()) == 6 and reader.poll() == []
+        history.stop_publishing()
+        assert reader.closed and list(reader.follow()) == []
+
+def _tail_consistency(name, queue):
+    """Read a published history in another process, counting events whose fields do not belong together."""
+    with HistoryReader(name) as reader:
+        queue.put(None)
+        read = torn = 0
+        sequence = -1
+        for event in reader.follow(interval=0):
+            read += 1
+            torn += not (event.operand1 == event.operand2 == event.position and event.result == 2 * event.position)
+            torn += event.sequence <= sequence
+            sequence = event.sequence
+        queue.put((read, reader.lost, torn))
+
+def test_shared_memory_reader_process():
+    """Test that a reader process never sees a torn event while a fast writer laps a small ring."""
+    history = History()
+    queue = multiprocessing.Queue()
+    reader = multiprocessing.Process(target=_tail_consistency, args=(history.publish(capacity=64), queue))
+    reader.start()
+    queue.get(timeout=30)
+    for i in range(20_000):
+        history.add_result(Addition(), i, i, 2 * i)
+    history.stop_publishing()
+    read, lost, torn = queue.get(timeout=30)
+    reader.join(30)
+    assert torn == 0 and read + lost == 20_000 and read > 0
+
+def test_spill_to_disk(tmpdir):
+    """Test that a capped history spills to segments, reads them back, and undoes across the boundary."""
+    directory = str(tmpdir.join("spill"))
+    capped, reference = History(max_entries=8, spill_directory=directory), History()
+    for history in (capped, reference):
+        for i in range(50):
+            if i % 7 == 0:
+                batch = BatchCalculation(Addition(), [i], [1])
+                batch.execute()
+                history.add_calculation(batch)
+            else:
+                history.add_result(Subtraction(), i, 1, i - 1)
+    assert capped._store.nbytes() < 8 * 32
+    assert len(os.listdir(directory)) > 1
+    assert [str(calc) for calc in capped.get_history()] == [str(calc) for calc in reference.get_history()]
+    for _ in range(30):
+        assert capped.undo() == reference.undo()
+    capped.add_result(Addition(), 1, 2, 3)
+    reference.add_result(Addition(), 1, 2, 3)
+    assert [str(calc) for calc in capped.get_history()] == [str(calc) for calc in reference.get_history()]
+
+    filename = str(tmpdir.join("history.bin"))
+    assert capped.save(filename) == f"History saved to {filename}."
+    restored = History(max_bytes=200)
+    assert restored.load(filename) == f"History loaded from {filename}."
+    assert [str(calc) for calc in restored.get_history()] == [str(calc) for calc in reference.get_history()]
+    assert capped.clear() == "History cleared."
+    assert os.listdir(directory) == []
+
+def test_iter_history_is_lazy(history):
+    """Test ranges and reverse order of iter_history, and that it formats entries only on demand."""
+    for i in range(10):
+        history.add_result(Addition(), i, 1, i + 1)
+    assert list(history.iter_history(8)) == ["8 addition 1 = 9", "9 addition 1 = 10"]
+    assert list(history.iter_history(-3, -1, reverse=True)) == ["8 addition 1 = 9", "7 addition 1 = 8"]
+    lines = history.iter_history()
+    with patch.object(History, "entry", wraps=history.entry) as entry:
+        assert next(lines) == "0 addition 1 = 1"
+        assert entry.call_count == 1
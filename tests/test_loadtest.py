@@ -0,0 +1,95 @@
+"""Tests for the record-and-replay load testing harness."""
+
+import asyncio
+import runpy
+import sys
+import pytest
+from main import main
+from app.calculator import Calculator
+from app.loadtest import __main__ as loadtest_main
+from app.loadtest import (
+    REPLAY_BATCH, REPLAY_QUEUE_BATCHES, Event, Recorder, generate, parse_mix, percentile, read_recording, replay,
+    write_recording,
+)
+from app.server import CalculatorClient, CalculatorServer
+
+def test_generate_mix_and_error_rate():
+    """Test that generated workloads follow the mix and error rate, reproducibly."""
+    events = list(generate(2000, {"add": 3, "mean": 1}, error_rate=0.1, rate=500, sessions=4, seed=7))
+    assert events == list(generate(2000, {"add": 3, "mean": 1}, error_rate=0.1, rate=500, sessions=4, seed=7))
+    commands = [event.line.split()[0] for event in events]
+    assert 150 < sum(event.line.endswith(" 0") and event.line.startswith("divide") for event in events) < 250
+    assert commands.count("add") > 2 * commands.count("mean") > 0
+    assert {event.session for event in events} == {0, 1, 2, 3}
+    assert all(earlier.time < later.time for earlier, later in zip(events, events[1:]))
+    assert 3 < events[-1].time < 5  # About 2000 / 500 seconds
+    assert parse_mix("add=4, divide=0.5") == {"add": 4.0, "divide": 0.5}
+    with pytest.raises(ValueError):
+        list(generate(1, {"add": 0}))
+
+def test_replay_report(tmpdir):
+    """Test that a replay runs every session's commands in order and reports them."""
+    path = str(tmpdir.join("workload.jsonl"))
+    events = [Event(0.0, 0, "add 1 2"), Event(0.0, 1, "divide 1 0"), Event(0.01, 0, "add $1 ans"),
+              Event(0.02, 1, "save history.json"), Event(0.03, 2, "add x"), Event(0.03, 1, f"sum @{path}")]
+    assert write_recording(events, path) == 6
+    assert list(read_recording(path)) == events
+
+    calculators = []
+    def factory():
+        calculators.append(Calculator())
+        return calculators[-1]
+    report = replay(read_recording(path), speed=2, concurrency=2, factory=factory)
+    assert (report.commands, report.errors, report.skipped) == (4, 2, 2)
+    assert len(calculators) == 3
+    assert 0.015 <= report.seconds < 1
+    assert 0 < report.p50_us <= report.p99_us <= report.max_us
+    assert "4 commands (2 errors, 2 skipped)" in report.format()
+    assert percentile([1, 2, 3, 4], 0.5) == 2 and percentile([], 0.99) == 0.0
+
+def test_replay_streams_events():
+    """Test that a replay reads events as it runs them instead of loading the whole recording first."""
+    calculator = Calculator()
+    read_ahead = []
+    def events():
+        for read in range(40_000):
+            read_ahead.append(read - len(calculator.history))
+            yield Event(0.0, 0, "add 1 2")
+    report = replay(events(), speed=0, factory=lambda: calculator)
+    assert report.commands == len(calculator.history) == 40_000
+    assert max(read_ahead) <= (REPLAY_QUEUE_BATCHES + 2) * REPLAY_BATCH < 40_000
+
+def test_record_repl_and_server(tmpdir, monkeypatch):
+    """Test recording the commands of the REPL and of server sessions."""
+    path = str(tmpdir.join("repl.jsonl"))
+    lines = iter(["add 1 2", "", "history", "exit"])
+    monkeypatch.setattr("builtins.input", lambda _prompt: next(lines))
+    main(["--record", path])
+    assert [event.line for event in read_recording(path)] == ["add 1 2", "history", "exit"]
+
+    async def serve():
+        server = CalculatorServer(port=0, recorder=recorder)
+        port = await server.start()
+        client = await CalculatorClient.connect(port=port)
+        await client.pipeline(["add 2 3", "multiply 2 2"])
+        await client.close()
+        await server.close()
+
+    path = str(tmpdir.join("server.jsonl"))
+    with Recorder(path) as recorder:
+        asyncio.run(serve())
+    events = list(read_recording(path))
+    assert [event.line for event in events] == ["add 2 3", "multiply 2 2"]
+    assert events[0].session == events[1].session
+
+def test_main_generate_and_replay(tmpdir, capsys, monkeypatch):
+    """Test the command line entry point: generate a workload, then replay it."""
+    recording = str(tmpdir.join("workload.jsonl"))
+    loadtest_main.main(["generate", recording, "--count", "50", "--mix", "add=4,divide=1", "--error-rate", "0.2",
+                        "--sessions", "2", "--seed", "3"])
+    assert "Wrote 50 commands" in capsys.readouterr().err
+    loadtest_main.main(["replay", recording, "--speed", "0", "--concurrency", "2"])
+    assert capsys.readouterr().out.startswith("50 commands (")
+    monkeypatch.setattr(sys, "argv", ["app.loadtest", "replay", recording, "--speed", "0"])
+    runpy.run_path(loadtest_main.__file__, run_name="__main__")
+    assert "latency p50" in capsys.readouterr().out
@@ -0,0 +1,79 @@
+"""Tests for the batch mode of the main module."""
+
+from io import StringIO
+import json
+from main import MORE_PROMPT, format_summary, main, page_lines, run_batch
+from app.calculator import Calculator
+
+def test_run_batch_text():
+    """Test running a script in text format, including errors, comments, and history."""
+    script = StringIO("# comment\nadd 1 2\n\ndivide 1 0\nadd x 1\nhistory\nexit\nadd 5 5\n")
+    output = StringIO()
+    summary = run_batch(script, output)
+    assert output.getvalue() == (
+        "Result: 3.0\n"
+        "Error: Division by zero is undefined.\n"
+        "Error: Invalid input. Please ensure all arguments are numbers.\n"
+        "History:\n1.0 addition 2.0 = 3.0\n"
+    )
+    assert summary["commands"] == 5 and summary["errors"] == 2
+
+def test_run_batch_json_and_tsv():
+    """Test the machine-readable output formats."""
+    output = StringIO()
+    run_batch(["multiply 2 3", "divide 1 0"], output, fmt="json")
+    lines = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert lines[0] == {"line": 1, "command": "multiply", "result": 6.0}
+    assert lines[1] == {"line": 2, "command": "divide", "error": "Error: Division by zero is undefined."}
+
+    output = StringIO()
+    run_batch(["subtract 5 3", "help"], output, fmt="tsv")
+    first, second = output.getvalue().splitlines()
+    assert first == "1\tsubtract\t2.0"
+    assert second.startswith("2\thelp\tAvailable commands: ")
+
+def test_run_batch_without_history():
+    """Test that calculations are not logged when history recording is disabled."""
+    calculator = Calculator()
+    run_batch(["add 1 1"] * 10, StringIO(), calculator=calculator, record_history=False)
+    assert not calculator.read_history()
+
+def test_run_batch_sweep():
+    """Test that a sweep's table is streamed in text format and summarized in JSON."""
+    output = StringIO()
+    run_batch(["sweep multiply 1:2 1:3", "add 1 1"], output)
+    assert output.getvalue() == (
+        "sweep multiplication 1:2 x 1:3 (6 cells)\n\t1\t2\t3\n1\t1\t2\t3\n2\t2\t4\t6\nResult: 2.0\n"
+    )
+    output = StringIO()
+    run_batch(["sweep multiply 1:2 1:3"], output, fmt="json")
+    assert json.loads(output.getvalue())["result"] == "sweep multiplication 1:2 x 1:3 (6 cells)"
+
+def test_main_batch_file(tmpdir, capsys):
+    """Test the '--batch' command line option with an output file and summary."""
+    script = tmpdir.join("script.txt")
+    script.write("add 1 2\nmultiply 2 2\n")
+    results = tmpdir.join("results.tsv")
+    main(["--batch", str(script), "--output", str(results), "--format", "tsv"])
+    assert results.read() == "1\tadd\t3.0\n2\tmultiply\t4.0\n"
+    assert "Processed 2 commands (0 errors)" in capsys.readouterr().err
+
+def test_format_summary():
+    """Test the throughput summary line."""
+    assert format_summary({"commands": 1000, "errors": 1, "seconds": 0.5}) == \
+        "Processed 1000 commands (1 errors) in 0.500s, 2,000 commands/s"
+
+def test_page_lines():
+    """Test that long output is written a screen at a time and stops when asked."""
+    written, prompts = [], []
+    answers = iter(["", "q"])
+    def prompt(text):
+        prompts.append(text)
+        return next(answers)
+    lines = (f"line {i}" for i in range(1_000_000))
+    assert page_lines(lines, page_size=3, write=written.append, prompt=prompt) == 6
+    assert [chunk.split() for chunk in written] == [["line", "0", "line", "1", "line", "2"],
+                                                     ["line", "3", "line", "4", "line", "5"]]
+    assert prompts == [MORE_PROMPT, MORE_PROMPT] and next(lines) == "line 7"  # Only one line read ahead
+    written.clear()
+    assert page_lines(["a", "b"], page_size=2, write=written.append, prompt=prompt) == 2 and len(written) == 1
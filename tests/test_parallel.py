@@ -0,0 +1,31 @@
+"""Tests for the process-pool parallel evaluation engine."""
+from app.calculator import Calculator
+from app.parallel import ParallelEngine, chunked, evaluate_chunk
+
+JOBS = [("add", 1, 2), ("divide", 1, 0), ("multiply", 2.5, 2), ("power", 2, 3), ("subtract", 9, 4),
+        ("add", "x", 1), ("divide", 9, 3)]
+
+EXPECTED = [3, "Error: Division by zero is undefined.", 5.0, "Error: Unknown command.", 5,
+            "Error: Invalid input types: operand1 is str, operand2 is int. Expected int or float.", 3.0]
+
+def test_evaluate_chunk():
+    """Test in-process evaluation with per-item errors."""
+    assert evaluate_chunk(JOBS) == EXPECTED
+
+def test_chunked():
+    """Test splitting a stream of jobs into chunks."""
+    assert [len(chunk) for chunk in chunked(iter(JOBS), 3)] == [3, 3, 1]
+
+def test_parallel_engine_preserves_order():
+    """Test that outcomes from several workers come back in input order."""
+    engine = ParallelEngine(workers=2, chunk_size=2, max_pending=2)
+    assert engine.run(iter(JOBS)) == EXPECTED
+    jobs = [("add", i, i) for i in range(1000)]
+    assert engine.run(jobs) == [2 * i for i in range(1000)]
+
+def test_execute_parallel_merges_history():
+    """Test that successful parallel calculations are merged into history in input order."""
+    calculator = Calculator()
+    assert calculator.execute_parallel(JOBS, workers=2, chunk_size=3) == EXPECTED
+    assert [str(calc) for calc in calculator.read_history()] == [
+        "1 addition 2 = 3", "2.5 multiplication 2 = 5.0", "9 subtraction 4 = 5", "9 division 3 = 3.0"]
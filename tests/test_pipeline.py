@@ -0,0 +1,98 @@
+"""Tests for the bulk numeric file pipeline."""
+import runpy
+import struct
+import sys
+from array import array
+import pytest
+from app import pipeline
+from app.pipeline import __main__ as pipeline_main
+from app.calculator import Calculator
+from app.operations.builtin import OPERATIONS
+
+def write_npy(path, rows, fortran_order=False, byte_order="<"):
+    """Write a 2-D float64 .npy file the way numpy.save would, without numpy."""
+    width = len(rows[0])
+    data = array("d", [row[c] for c in range(width) for row in rows] if fortran_order else
+                 [value for row in rows for value in row])
+    if byte_order != ("<" if struct.pack("=H", 1) == b"\x01\x00" else ">"):
+        data.byteswap()
+    header = f"{{'descr': '{byte_order}f8', 'fortran_order': {fortran_order}, 'shape': ({len(rows)}, {width}), }}"
+    header = header.ljust(117) + "\n"
+    with open(path, "wb") as file:
+        file.write(b"\x93NUMPY\x01\x00" + struct.pack("<H", len(header)) + header.encode() + data.tobytes())
+
+def read_result(path):
+    """Read every value of a one-column result file."""
+    return [value for chunk, in pipeline.read_columns(str(path), (0,)) for value in chunk]
+
+@pytest.mark.parametrize("fortran_order", [False, True])
+@pytest.mark.parametrize("byte_order", ["<", ">"])
+def test_npy_round_trip(tmpdir, fortran_order, byte_order):
+    """Test .npy inputs in either layout and byte order, read in several chunks, to a .npy result."""
+    rows = [(float(i), float(i % 5 + 1), 3.0) for i in range(1000)]
+    source, output = tmpdir.join("in.npy"), tmpdir.join("out.npy")
+    write_npy(str(source), rows, fortran_order, byte_order)
+    assert pipeline.run(OPERATIONS["multiply"], str(source), str(output), columns=(0, 2), chunk_rows=333) == 1000
+    assert read_result(output) == [row[0] * 3 for row in rows]
+
+def test_csv_and_raw_files(tmpdir):
+    """Test a CSV input with a header, two raw single-column inputs, and a row count mismatch."""
+    source = tmpdir.join("in.csv")
+    source.write("a,b\n" + "".join(f"{i},{i % 4}\n" for i in range(100)))
+    output = tmpdir.join("out.csv")
+    count = pipeline.run(OPERATIONS["divide"], str(source), str(output), chunk_rows=30, zero_policy="nan")
+    results = read_result(output)
+    assert count == 100 and results[1:4] == [1.0, 1.0, 1.0] and results[0] != results[0]
+    first, second = str(tmpdir.join("x.f64")), str(tmpdir.join("y.raw"))
+    array("d", range(10)).tofile(open(first, "wb"))
+    array("d", [1.0] * 10).tofile(open(second, "wb"))
+    output = tmpdir.join("out.raw")
+    assert pipeline.run(OPERATIONS["add"], first, str(output), path2=second) == 10
+    assert read_result(output) == [float(i + 1) for i in range(10)]
+    array("d", [1.0] * 11).tofile(open(second, "wb"))
+    with pytest.raises(ValueError, match="different numbers of rows"):
+        pipeline.run(OPERATIONS["add"], first, str(output), path2=second)
+
+def test_csv_ragged_rows_and_header(tmpdir):
+    """Test that ragged rows are rejected rather than shifted, and that only a non-numeric first row is a header."""
+    source = tmpdir.join("ragged.csv")
+    for text, line in [("1,2,3\n4\n", 2), ("1,2\n3,4,5\n", 2), ("a,b\n1,2\n\n3,4,5\n", 4), ("1,x\n3,4\n", 1)]:
+        source.write(text)
+        with pytest.raises(ValueError, match=f"^Invalid CSV row at line {line}.$"):
+            list(pipeline.read_columns(str(source)))
+    source.write("1,2\n" * 5 + "3,4,5\n" + "1,2\n" * 5)
+    with pytest.raises(ValueError, match="line 6"):
+        list(pipeline.read_columns(str(source), chunk_rows=2))
+    source.write("1,secret\n3,4\n")
+    with pytest.raises(ValueError) as error:
+        list(pipeline.read_columns(str(source)))
+    assert "secret" not in str(error.value)
+    source.write("x,y\n3,4\n")
+    assert [list(column) for column in next(pipeline.read_columns(str(source)))] == [[3.0], [4.0]]
+
+def test_pipeline_command(tmpdir):
+    """Test the 'pipeline' command, which writes results to a file instead of history."""
+    calculator = Calculator()
+    source, output = tmpdir.join("in.csv"), tmpdir.join("out.npy")
+    source.write("1,2\n3,4\n")
+    assert calculator.execute_command("pipeline", f"add {source} {output}") == f"Pipeline wrote 2 results to {output}."
+    assert read_result(output) == [3.0, 7.0]
+    assert calculator.execute_command("pipeline", f"add {source}").startswith("Error: Usage:")
+    assert calculator.execute_command("pipeline", f"power {source} {output}") == "Error: Unknown operation 'power'."
+    assert calculator.execute_command("pipeline", f"add {source} {output} columns=0,5").startswith("Error:")
+    assert len(calculator.history.get_history()) == 0
+
+def test_main(tmpdir, capsys, monkeypatch):
+    """Test the command line entry point, with a second input file and a zero policy."""
+    first, second, output = str(tmpdir.join("a.f64")), str(tmpdir.join("b.f64")), str(tmpdir.join("out.csv"))
+    array("d", [1.0, 2.0, 3.0]).tofile(open(first, "wb"))
+    array("d", [2.0, 0.0, 1.0]).tofile(open(second, "wb"))
+    pipeline_main.main(["divide", first, output, "--input2", second, "--chunk-rows", "2", "--zero-policy", "nan"])
+    results = read_result(tmpdir.join("out.csv"))
+    assert results[0] == 0.5 and results[1] != results[1] and results[2] == 3.0
+    assert "3 rows in" in capsys.readouterr().err
+    source = tmpdir.join("in.csv")
+    source.write("1,5,2\n")
+    monkeypatch.setattr(sys, "argv", ["app.pipeline", "multiply", str(source), output, "--columns", "1,2"])
+    runpy.run_path(pipeline_main.__file__, run_name="__main__")
+    assert read_result(tmpdir.join("out.csv")) == [10.0]
@@ -0,0 +1,62 @@
+"""Tests for the streaming reductions."""
+import io
+import math
+import statistics
+import pytest
+from app.reduction import REDUCTIONS, Maximum, Mean, Minimum, Product, Reduction, Sum, Variance, read_values
+
+def test_sum_is_compensated():
+    """Test that the sum keeps the low-order bits a naive float sum loses."""
+    values = [1e16, 1.0, -1e16] * 1000 + [0.1] * 10
+    assert Sum().update(iter(values)).result() == math.fsum(values)
+    assert sum(values) != math.fsum(values)
+    assert Sum().update([1, 2, 3]).result() == 6 and isinstance(Sum().update([1, 2]).result(), int)
+
+def test_sum_of_infinities_and_overflow():
+    """Test that infinite values and overflow give an infinite sum or mean rather than NaN."""
+    assert Sum().update([1, math.inf]).result() == math.inf
+    assert Sum().update([math.inf]).result() == math.inf
+    assert Sum().update([-math.inf, 2.0]).result() == -math.inf
+    assert Mean().update([1, math.inf]).result() == math.inf
+    assert Sum().update([1e308, 1e308, -1e308]).result() == math.inf
+    assert Mean().update([-1e308, -1e308]).result() == -math.inf
+    assert math.isnan(Sum().update([math.inf, -math.inf]).result())
+
+def test_variance_is_stable():
+    """Test Welford's variance on values with a large offset, where the textbook formula fails."""
+    values = [1e9 + value for value in (4.0, 7.0, 13.0, 16.0)] * 250
+    assert Variance().update(iter(values)).result() == pytest.approx(statistics.variance(values), rel=1e-9)
+    assert Mean().update(iter(values)).result() == statistics.fmean(values)
+
+def test_reductions_stream_in_one_pass():
+    """Test every reduction on a generator, fed in two parts, against the stdlib."""
+    values = [float(value % 97) - 40.5 for value in range(10_000)]
+    expected = {"sum": math.fsum(values), "product": math.prod(values[:50]), "mean": statistics.fmean(values),
+                "variance": statistics.variance(values), "min": min(values), "max": max(values)}
+    for name, reduction_type in REDUCTIONS.items():
+        data = values[:50] if name == "product" else values
+        reduction = reduction_type().update(value for value in data[:100]).update(value for value in data[100:])
+        assert reduction.count == len(data)
+        assert reduction.result() == pytest.approx(expected[name], rel=1e-12)
+
+def test_reduction_errors():
+    """Test empty inputs, invalid values, and NaN propagation."""
+    assert Sum().result() == 0 and Product().result() == 1
+    with pytest.raises(ValueError, match="mean requires at least 1 value."):
+        Mean().result()
+    with pytest.raises(ValueError, match="variance requires at least 2 values."):
+        Variance().update([1.0]).result()
+    with pytest.raises(TypeError, match="Invalid input type: str"):
+        Minimum().update([1, "2"])
+    for reduction in REDUCTIONS.values():
+        with pytest.raises(TypeError, match="Invalid input type: bool"):
+            reduction().update([1, True])
+    with pytest.raises(TypeError):
+        Reduction()  # pylint: disable=abstract-class-instantiated
+    assert math.isnan(Maximum().update([1.0, math.nan, 2.0]).result())
+
+def test_read_values():
+    """Test lazy parsing of whitespace, comma, and newline separated numbers."""
+    assert list(read_values(io.StringIO("1 2,3\n\n4.5, -6e2\n"))) == [1.0, 2.0, 3.0, 4.5, -600.0]
+    with pytest.raises(ValueError, match="Value 2 is not a number."):
+        list(read_values(["1 x"]))
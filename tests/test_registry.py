@@ -0,0 +1,83 @@
+"""Tests for the lazy operation registry and plugin operations."""
+import operator
+import os
+import subprocess
+import sys
+import pytest
+from app.calculator import Calculator
+from app.history import History
+from app.operations import Operation
+from app.operations.builtin import OPERATIONS
+from app.operations.registry import ENTRY_POINT_GROUP, OperationRegistry
+from benchmarks.suite import _plugin_distribution
+
+class Power(Operation):
+    """Raises the first number to the power of the second."""
+
+    _operator = staticmethod(operator.pow)
+
+    def calculate(self, a, b):
+        """Return a to the power of b."""
+        self._validate_inputs(a, b)
+        return a ** b
+
+def test_string_targets_are_imported_on_first_use():
+    """Test that registering a 'module:Class' target does not import it until it is looked up."""
+    registry = OperationRegistry(entry_point_group=None)
+    registry.register('missing', 'app.operations.no_such_module:Missing')
+    registry.register('add', 'app.operations.addition:Addition')
+    assert 'missing' in registry and list(registry) == ['missing', 'add']
+    assert registry['add'] is registry['add']
+    assert registry.find('Addition') is registry['add']
+    with pytest.raises(ModuleNotFoundError):
+        registry['missing']
+    with pytest.raises(KeyError):
+        registry['nothing']
+
+def test_entry_points_are_discovered_lazily(tmpdir, monkeypatch):
+    """Test that entry point operations are listed without importing their (absent) modules."""
+    _plugin_distribution(str(tmpdir), 3)
+    monkeypatch.syspath_prepend(str(tmpdir))
+    registry = OperationRegistry()
+    registry.register('plugin0', Power)  # Explicit registrations take precedence
+    assert 'plugin2' in registry
+    assert sorted(registry) == ['plugin0', 'plugin1', 'plugin2']
+    assert registry['plugin0'].calculate(2, 3) == 8
+    assert not any(name.startswith("calculator_plugins") for name in sys.modules)
+    assert ENTRY_POINT_GROUP == "calculator.operations"
+
+def test_builtin_operations_are_imported_on_first_use():
+    """Test that importing the calculator and its history imports no built-in operation module."""
+    code = ("import sys, app.calculator; from app.calculator import Calculator; "
+            "loaded = lambda: sorted(name for name in sys.modules if name.startswith('app.operations.')); "
+            "print(loaded()); Calculator().execute_command('add', 1, 2); print(loaded())")
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    environment = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [root, os.environ.get("PYTHONPATH")])))
+    before, after = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                                   env=environment).stdout.splitlines()
+    assert before == "['app.operations.builtin', 'app.operations.registry']"
+    assert after == "['app.operations.addition', 'app.operations.builtin', 'app.operations.registry']"
+
+def test_same_named_class_is_not_a_builtin():
+    """Test that an operation class named like a built-in is kept as an object, not encoded as the built-in."""
+    class Addition(Power):  # pylint: disable=redefined-outer-name
+        """A plugin class that shares the built-in's name."""
+    history = History()
+    history.add_result(Addition(), 2, 3, 8)
+    assert type(history.get_history()[0].operation) is Addition
+
+def test_plugin_operation_commands_and_history(tmpdir):
+    """Test a decorator-registered operation as a command, in help, and through save/load."""
+    OPERATIONS.register('power')(Power)
+    try:
+        calculator = Calculator()
+        assert calculator.execute_command('power', 2, 10) == 1024
+        assert "- Also: power\n" in calculator.execute_command('help')
+        filename = os.path.join(str(tmpdir), "history.json")
+        calculator.history.save(filename)
+        restored = History()
+        assert restored.load(filename) == f"History loaded from {filename}."
+        assert str(restored.get_history()[0]) == "2 power 10 = 1024"
+    finally:
+        OPERATIONS.unregister('power')
+    assert 'power' not in OPERATIONS
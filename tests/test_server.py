@@ -0,0 +1,125 @@
+"""Tests for the asyncio calculator server, using an in-process client."""
+import asyncio
+import json
+import os
+import runpy
+import sys
+from unittest.mock import patch
+from app.calculator import Calculator
+from app.server import __main__ as server_main
+from app.server import MAX_LINE_BYTES, CalculatorClient, CalculatorServer, execute_line, format_response
+
+def run_with_server(scenario, **options):
+    """Start a server on a free port, run an async scenario against it, and shut the server down."""
+    async def runner():
+        server = CalculatorServer(port=0, **options)
+        port = await server.start()
+        try:
+            return await scenario(server, port)
+        finally:
+            await server.close()
+    return asyncio.run(runner())
+
+def test_line_protocol_sessions():
+    """Test pipelined requests and that each connection has its own history."""
+    async def scenario(_, port):
+        first = await CalculatorClient.connect(port=port)
+        second = await CalculatorClient.connect(port=port)
+        responses = await first.pipeline(["add 1 2", "divide 1 0", "multiply x 2", "history"])
+        other_history = await second.request("history")
+        await first.close()
+        await second.close()
+        return responses, other_history
+
+    responses, other_history = run_with_server(scenario)
+    assert responses[:3] == ["3.0", "Error: Division by zero is undefined.",
+                             "Error: Invalid input. Please ensure all arguments are numbers."]
+    assert responses[3] == "1.0 addition 2.0 = 3.0"
+    assert other_history == ""
+
+def test_exit_and_connection_limit():
+    """Test that 'exit' ends a session and extra connections are refused."""
+    async def scenario(server, port):
+        client = await CalculatorClient.connect(port=port)
+        await client.request("add 1 1")
+        refused = await CalculatorClient.connect(port=port)
+        busy = await refused._reader.readline()  # pylint: disable=protected-access
+        goodbye = await client.request("exit")
+        closed = await client._reader.read()  # pylint: disable=protected-access
+        return busy, goodbye, closed, server.requests_served
+
+    busy, goodbye, closed, served = run_with_server(scenario, max_connections=1)
+    assert busy == b"Error: Server busy.\n"
+    assert goodbye == "Exiting the calculator. Goodbye!"
+    assert closed == b""
+    assert served == 2
+
+def test_http_protocol():
+    """Test keep-alive HTTP/JSON requests on one connection."""
+    async def scenario(_, port):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        bodies = [json.dumps({"command": "add", "args": [2, 3]}), json.dumps({"command": "divide", "args": [1, 0]}),
+                  "not json"]
+        for body in bodies:
+            writer.write(f"POST / HTTP/1.1\r\nContent-Length: {len(body)}\r\n\r\n{body}".encode())
+        writer.write(b"GET /health HTTP/1.1\r\nConnection: close\r\n\r\n")
+        await writer.drain()
+        data = await reader.read()
+        writer.close()
+        return data.decode()
+
+    data = run_with_server(scenario)
+    payloads = [json.loads(part.split("\r\n\r\n", 1)[1]) for part in data.split("HTTP/1.1 ")[1:]]
+    assert payloads == [{"result": 5}, {"error": "Error: Division by zero is undefined."},
+                        {"error": "Error: Invalid request."}, {"status": "ok"}]
+    assert "400 Bad Request" in data
+
+def test_http_content_length_limits():
+    """Test that oversized and invalid Content-Length values are refused before the body is read."""
+    async def scenario(_, port):
+        responses = []
+        for length in [MAX_LINE_BYTES + 1, -5, "abc"]:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(f"POST / HTTP/1.1\r\nContent-Length: {length}\r\n\r\n{{}}".encode())
+            await writer.drain()
+            responses.append((await reader.read()).decode())
+            writer.close()
+        return responses
+
+    too_large, negative, invalid = run_with_server(scenario)
+    assert too_large.startswith("HTTP/1.1 413 Payload Too Large")
+    assert json.loads(too_large.split("\r\n\r\n", 1)[1]) == {"error": "Error: Request body too large."}
+    assert negative.startswith("HTTP/1.1 400 Bad Request") and invalid.startswith("HTTP/1.1 400 Bad Request")
+
+def test_file_commands_refused(tmpdir):
+    """Test that network clients cannot run commands that read or write the server's files."""
+    secret = tmpdir.join("secret.txt")
+    secret.write("hunter2")
+    calculator = Calculator()
+    for line in ["save", "load", f"pipeline add {secret} {tmpdir.join('o.csv')}"]:
+        assert execute_line(calculator, line).endswith("is not available over the network.")
+    assert execute_line(calculator, f"sum @{secret}") == "Error: '@file' arguments are not available over the network."
+    status, payload = CalculatorServer._http_response(  # pylint: disable=protected-access
+        calculator, "POST / HTTP/1.1", json.dumps({"command": "max", "args": [f" @{secret}"]}).encode())
+    assert status == "200 OK" and "hunter2" not in payload["error"]
+    assert execute_line(calculator, "sum 1 2 3") == 6
+    assert not tmpdir.join("o.csv").exists()
+
+def test_format_response():
+    """Test that multi-line outputs are framed as a single line."""
+    assert format_response("a\nb") == "a b"
+    assert format_response(["x", "y"]) == "x\ty"
+
+def test_main(tmpdir, monkeypatch):
+    """Test the command line entry point until it is interrupted, with and without recording."""
+    started = []
+    async def interrupted(server):
+        started.append((server.max_connections, server.recorder))
+        raise KeyboardInterrupt
+    recording = str(tmpdir.join("requests.jsonl"))
+    with patch.object(CalculatorServer, "serve_forever", interrupted):
+        server_main.main(["--port", "0", "--max-connections", "3", "--record", recording])
+        monkeypatch.setattr(sys, "argv", ["app.server", "--port", "0"])
+        runpy.run_path(server_main.__file__, run_name="__main__")
+    assert started[0][0] == 3 and started[0][1] is not None and started[1][1] is None
+    assert os.path.exists(recording)
@@ -0,0 +1,62 @@
+"""Tests for the multi-session manager and calculator serialization."""
+import gc
+import tracemalloc
+import pytest
+from app.calculator import Calculator, parse_command
+from app.session import SessionManager
+
+def run(manager, session_id, line):
+    """Execute one command line in a session."""
+    command, args = parse_command(line)
+    return manager.execute(session_id, command, *args)
+
+def test_eviction_and_revival():
+    """Test that least recently used sessions are evicted and revived with their history and variables."""
+    manager = SessionManager(max_active=2)
+    first, second, third = manager.open(), manager.open(), manager.open()
+    assert manager.active == 0 and len(manager) == 3
+    run(manager, first, "add 1 2")
+    run(manager, first, "let x = 5")
+    run(manager, first, "let y = $x * ans")
+    run(manager, second, "multiply 2 3")
+    run(manager, third, "eval 1 + 1")
+    assert manager.active == 2 and manager.evictions == 1  # first was least recently used
+    assert run(manager, first, "let x = 2") == 2 and manager.revivals == 1
+    assert run(manager, first, "let") == "x = 2\ny = 10"
+    assert [str(entry) for entry in run(manager, first, "history")] == [
+        "1.0 addition 2.0 = 3.0", "5 = 5", "$x * ans [ans=5, $x=5] = 25", "2 = 2"]
+    assert manager.evict_idle(0) == 2 and manager.active == 0
+    assert run(manager, second, "undo") == "Undone: 2.0 multiplication 3.0 = 6.0"
+    manager.close(second)
+    assert second not in manager and len(manager) == 2
+    with pytest.raises(KeyError):
+        manager.get(second)
+
+def test_calculator_round_trip():
+    """Test that serialization keeps settings and batch/reduction entries."""
+    calculator = Calculator(cache_size=8)
+    calculator.execute_batch('add', [1.0, 2.0], [3.0, 4.0])
+    calculator.execute_command('sum', "1 2 3")
+    revived = Calculator.from_bytes(calculator.to_bytes())
+    assert revived.cache.max_size == 8 and revived.record_history
+    assert [str(entry) for entry in revived.history.get_history()] == ["batch addition x 2", "sum of 3 values = 6.0"]
+
+def test_idle_session_memory_budget():
+    """Test the memory budget of idle sessions holding 20 calculations each: live and evicted."""
+    manager = SessionManager(max_active=1000)
+    session_ids = [manager.open() for _ in range(1000)]
+    gc.collect()
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        for session_id in session_ids:
+            for i in range(20):
+                manager.execute(session_id, 'add', float(i), 1.0)
+        active = (tracemalloc.get_traced_memory()[0] - baseline) / len(session_ids)
+        for session_id in session_ids:
+            manager.evict(session_id)
+        evicted = (tracemalloc.get_traced_memory()[0] - baseline) / len(session_ids)
+    finally:
+        tracemalloc.stop()
+    assert active < 2048
+    assert evicted < 512
@@ -0,0 +1,34 @@
+"""Tests for the latency histogram and instrumentation snapshots."""
+import json
+import time
+from app.stats import Instrumentation, LatencyHistogram, bucket_index, bucket_upper_bound
+
+def test_bucket_bounds():
+    """Test that every value falls in a bucket whose bounds contain it."""
+    for value in list(range(5000)) + [10 ** 6, 123_456_789]:
+        index = bucket_index(value)
+        assert bucket_upper_bound(index) >= value
+        assert index == 0 or bucket_upper_bound(index - 1) < value
+
+def test_percentiles_within_relative_error():
+    """Test that percentiles are reported within the bucket resolution."""
+    histogram = LatencyHistogram()
+    for value in range(1, 10_001):
+        histogram.record(value * 1000)
+    for percent, exact in ((50, 5_000_000), (95, 9_500_000), (99, 9_900_000)):
+        assert exact <= histogram.percentile(percent) <= exact * 1.07
+    assert histogram.percentile(100) == histogram.max == 10_000_000
+    assert LatencyHistogram().percentile(50) == 0
+
+def test_periodic_dump(tmpdir):
+    """Test that the background thread writes JSON snapshots."""
+    instrumentation = Instrumentation()
+    instrumentation.record("add", 1500, False)
+    filename = str(tmpdir.join("stats.json"))
+    instrumentation.start_periodic_dump(filename, interval=0.01)
+    deadline = time.time() + 5
+    while not tmpdir.join("stats.json").exists() and time.time() < deadline:
+        time.sleep(0.01)
+    instrumentation.stop_periodic_dump()
+    with open(filename, encoding="utf-8") as file:
+        assert json.load(file)["commands"]["add"]["count"] == 1